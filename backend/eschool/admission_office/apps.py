@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AdmissionOfficeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'admission_office'
+    
+    def ready(self):
+        import admission_office.signals
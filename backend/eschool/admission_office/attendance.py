@@ -0,0 +1,111 @@
+"""
+Bulk attendance recording.
+
+``record_bulk_attendance`` writes the attendance of many students for one
+date and subject: rows are validated in memory, students and existing
+records are resolved with one query each, and the writes go out as one
+``bulk_create`` and one ``bulk_update``. The bulk endpoint calls it in the
+request, and the ``admission_office.bulk_attendance`` job in a worker.
+"""
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.relations import PrimaryKeyRelatedField
+
+from student.models import Student
+from subject.models import Subject
+
+from .models import Attendance
+from .serializers import AttendanceSerializer, BulkAttendanceRecordSerializer
+
+
+def record_bulk_attendance(attendance_date, subject, attendance_records):
+    """
+    Create or update the attendance of ``attendance_records`` on one date and subject.
+
+    Returns the written records and the per-row errors; rows with errors
+    are skipped and the others are still written.
+    """
+    does_not_exist = PrimaryKeyRelatedField.default_error_messages['does_not_exist']
+    subject_error = None
+    if subject and not Subject.objects.filter(pk=subject).exists():
+        subject_error = [does_not_exist.format(pk_value=subject)]
+
+    errors = []
+
+    # Validate every row in memory first
+    valid_rows = {}
+    for record_data in attendance_records:
+        row = BulkAttendanceRecordSerializer(data=record_data)
+        if subject_error:
+            errors.append({'student': record_data.get('student'), 'errors': {'subject': subject_error}})
+        elif not row.is_valid():
+            errors.append({'student': record_data.get('student'), 'errors': row.errors})
+        else:
+            # A student listed twice keeps the last row, as sequential saves would
+            valid_rows[row.validated_data['student']] = (record_data, row.validated_data)
+
+    # Resolve students and existing (student, subject, date) rows in one query each
+    known_students = set(
+        Student.objects.filter(s_id__in=valid_rows.keys()).values_list('s_id', flat=True)
+    )
+    for student_id in [sid for sid in valid_rows if sid not in known_students]:
+        record_data, _ = valid_rows.pop(student_id)
+        errors.append({
+            'student': record_data.get('student'),
+            'errors': {'student': [does_not_exist.format(pk_value=student_id)]}
+        })
+
+    existing = {
+        record.student_id: record
+        for record in Attendance.objects.filter(
+            date=attendance_date, subject_id=subject, student_id__in=valid_rows.keys()
+        )
+    }
+
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    for student_id, (_, values) in valid_rows.items():
+        values = {key: value for key, value in values.items() if key != 'student'}
+        record = existing.get(student_id)
+        if record is None:
+            to_create.append(Attendance(
+                student_id=student_id,
+                subject_id=subject,
+                date=attendance_date,
+                **values
+            ))
+            continue
+        # Existing rows keep their current value for fields omitted from the payload
+        for field in ('status', 'check_in_time', 'check_out_time', 'notes'):
+            if values.get(field) is not None:
+                setattr(record, field, values[field])
+        record.updated_at = now
+        to_update.append(record)
+
+    with transaction.atomic():
+        if to_create:
+            Attendance.objects.bulk_create(to_create)
+        if to_update:
+            Attendance.objects.bulk_update(
+                to_update, ['status', 'check_in_time', 'check_out_time', 'notes', 'updated_at']
+            )
+
+    # Re-read the written rows so ids are present on backends without RETURNING
+    written = {
+        record.student_id: record
+        for record in Attendance.objects.filter(
+            date=attendance_date, subject_id=subject, student_id__in=valid_rows.keys()
+        ).select_related('student', 'subject', 'class_room', 'teacher')
+    }
+    created_records = AttendanceSerializer(
+        [written[sid] for sid in valid_rows if sid in written], many=True
+    ).data
+
+    return {
+        'created_records': created_records,
+        'total_created': len(created_records),
+        'errors': errors,
+        'total_errors': len(errors)
+    }
+
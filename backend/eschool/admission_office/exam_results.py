@@ -0,0 +1,112 @@
+"""
+Bulk marksheet recording.
+
+``record_bulk_results`` writes the results of many students for one exam:
+rows are validated in memory, students and existing results are resolved
+with one query each, every row is graded against the exam already loaded,
+and the writes go out as one ``bulk_create`` and one ``bulk_update``
+followed by a single statistics refresh.
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from eschool.cache import invalidate
+from student.models import Student
+
+from .exam_statistics import refresh_exam_statistics
+from .models import ExamResult
+from .serializers import BulkExamResultRowSerializer
+
+
+def record_bulk_results(exam, rows, graded_by=None):
+    """
+    Create or update the results of ``rows`` for ``exam``.
+
+    Returns the write counts and the per-row errors, numbered from 1; rows
+    with errors are skipped and the others are still written.
+    """
+    errors = []
+
+    # Validate every row in memory first
+    valid_rows = []
+    for index, row_data in enumerate(rows, start=1):
+        row = BulkExamResultRowSerializer(data=row_data, context={'exam': exam})
+        if row.is_valid():
+            valid_rows.append((index, row.validated_data))
+        else:
+            errors.append({'row': index, 'errors': row.errors})
+
+    # Resolve student ids and numbers to primary keys in one query
+    ids = {values['student'] for _, values in valid_rows if values.get('student')}
+    numbers = {values['student_number'] for _, values in valid_rows if values.get('student_number')}
+    known_ids = set()
+    pk_by_number = {}
+    for s_id, student_number in Student.objects.filter(
+        Q(s_id__in=ids) | Q(student_number__in=numbers)
+    ).order_by().values_list('s_id', 'student_number'):
+        known_ids.add(s_id)
+        pk_by_number[student_number] = s_id
+
+    # A student listed twice keeps the last row, as sequential saves would
+    marks = {}
+    for index, values in valid_rows:
+        student_id = values.get('student') or pk_by_number.get(values.get('student_number'))
+        if student_id not in known_ids:
+            errors.append({
+                'row': index,
+                'errors': {'student': [f"Student {values.get('student') or values.get('student_number')} does not exist."]}
+            })
+            continue
+        marks[student_id] = values
+
+    existing = {
+        result.student_id: result
+        for result in ExamResult.objects.filter(exam=exam, student_id__in=marks.keys()).order_by()
+    }
+
+    # Grade every row in one pass against the exam loaded by the caller
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    for student_id, values in marks.items():
+        result = existing.get(student_id) or ExamResult(exam=exam, student_id=student_id)
+        result.marks_obtained = values['marks_obtained']
+        if 'remarks' in values:
+            result.remarks = values['remarks']
+        if 'submitted_at' in values:
+            result.submitted_at = values['submitted_at']
+        if graded_by:
+            result.graded_by = graded_by
+        result.graded_at = now
+        result.apply_grade(exam)
+        if result.pk is None:
+            to_create.append(result)
+        else:
+            result.updated_at = now
+            to_update.append(result)
+
+    with transaction.atomic():
+        if to_create:
+            ExamResult.objects.bulk_create(to_create)
+        if to_update:
+            ExamResult.objects.bulk_update(to_update, [
+                'marks_obtained', 'grade', 'is_passed', 'remarks', 'submitted_at',
+                'graded_by', 'graded_at', 'updated_at'
+            ])
+        # bulk_create/bulk_update send no signals, so refresh once for the whole sheet
+        if to_create or to_update:
+            refresh_exam_statistics(exam)
+    if to_create or to_update:
+        invalidate(ExamResult)
+
+    written = to_create + to_update
+    passed = sum(1 for result in written if result.is_passed)
+    return {
+        'total_created': len(to_create),
+        'total_updated': len(to_update),
+        'passed': passed,
+        'failed': len(written) - passed,
+        'errors': sorted(errors, key=lambda error: error['row']),
+        'total_errors': len(errors)
+    }
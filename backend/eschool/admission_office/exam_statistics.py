@@ -0,0 +1,130 @@
+"""
+Per-exam score statistics and ranks.
+
+``refresh_exam_statistics`` reads the marks of one exam in a single
+query, computes the distribution in Python and stores it in the exam's
+``ExamStatistics`` row. It also writes the dense rank of every result
+back to ``ExamResult.rank``. Distribution reads, rank lookups and the top
+performers of an exam then touch one row or one index range instead of
+re-aggregating ``exam_results``. The result signals queue a refresh for
+when the saving transaction commits, once per exam however many of its
+results changed; bulk writers call ``refresh_exam_statistics`` once
+after writing.
+"""
+import statistics
+import threading
+
+from django.db import transaction
+
+from .models import Exam, ExamResult, ExamStatistics
+
+
+PERCENTILES = [10, 25, 50, 75, 90]
+
+# The histogram splits the total marks into this many equal bands
+HISTOGRAM_BANDS = 10
+
+# Exams with a refresh queued on this thread's connection
+_pending = threading.local()
+
+
+def dense_ranks(marks):
+    """Map each distinct mark to its dense rank, highest mark first"""
+    return {mark: rank for rank, mark in enumerate(sorted(set(marks), reverse=True), start=1)}
+
+
+def compute_statistics(marks, grades, passed_count, total_marks):
+    """Return the ``ExamStatistics`` field values for one exam's marks"""
+    grade_counts = {grade: 0 for grade, _ in ExamResult.GRADE_CHOICES}
+    for grade in grades:
+        grade_counts[grade] = grade_counts.get(grade, 0) + 1
+
+    histogram = [
+        {
+            'from': band * 100 // HISTOGRAM_BANDS,
+            'to': (band + 1) * 100 // HISTOGRAM_BANDS,
+            'count': 0,
+        }
+        for band in range(HISTOGRAM_BANDS)
+    ]
+    for mark in marks:
+        # Full marks belong to the top band rather than one of their own
+        band = min(mark * HISTOGRAM_BANDS // total_marks, HISTOGRAM_BANDS - 1) if total_marks else 0
+        histogram[band]['count'] += 1
+
+    values = {
+        'result_count': len(marks),
+        'passed_count': passed_count,
+        'mean': None,
+        'median': None,
+        'std_dev': None,
+        'min_marks': None,
+        'max_marks': None,
+        'percentiles': {},
+        'histogram': histogram,
+        'grade_counts': grade_counts,
+        'rank_count': len(set(marks)),
+    }
+    if not marks:
+        return values
+
+    if len(marks) > 1:
+        cuts = statistics.quantiles(marks, n=100, method='inclusive')
+        percentiles = {str(p): round(cuts[p - 1], 2) for p in PERCENTILES}
+    else:
+        percentiles = {str(p): float(marks[0]) for p in PERCENTILES}
+    values.update(
+        mean=round(statistics.fmean(marks), 2),
+        median=float(statistics.median(marks)),
+        std_dev=round(statistics.pstdev(marks), 2),
+        min_marks=min(marks),
+        max_marks=max(marks),
+        percentiles=percentiles,
+    )
+    return values
+
+
+def refresh_exam_statistics(exam):
+    """Recompute the statistics and result ranks of ``exam`` (an Exam or its pk)"""
+    if not isinstance(exam, Exam):
+        exam = Exam.objects.only('total_marks').get(pk=exam)
+
+    rows = list(
+        ExamResult.objects.filter(exam=exam).order_by()
+        .values_list('pk', 'marks_obtained', 'grade', 'is_passed', 'rank')
+    )
+    marks = [row[1] for row in rows]
+    values = compute_statistics(
+        marks, [row[2] for row in rows], sum(1 for row in rows if row[3]), exam.total_marks
+    )
+    ranks = dense_ranks(marks)
+
+    # Only results whose rank moved are written
+    moved = [
+        ExamResult(pk=pk, rank=ranks[mark])
+        for pk, mark, grade, is_passed, rank in rows if rank != ranks[mark]
+    ]
+    with transaction.atomic():
+        stored, _ = ExamStatistics.objects.update_or_create(exam=exam, defaults=values)
+        if moved:
+            ExamResult.objects.bulk_update(moved, ['rank'], batch_size=500)
+    return stored
+
+
+def refresh_on_commit(exam_id):
+    """Refresh ``exam_id`` once the current transaction commits"""
+    pending = getattr(_pending, 'exams', None)
+    if pending is None:
+        pending = _pending.exams = set()
+    pending.add(exam_id)
+
+    def refresh():
+        # The first callback for an exam does the work; later ones find it done
+        if exam_id not in pending:
+            return
+        pending.discard(exam_id)
+        exam = Exam.objects.only('total_marks').filter(pk=exam_id).first()
+        if exam is not None:
+            refresh_exam_statistics(exam)
+
+    transaction.on_commit(refresh)
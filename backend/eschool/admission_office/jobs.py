@@ -0,0 +1,13 @@
+import datetime
+
+from jobs.queue import register
+
+from .attendance import record_bulk_attendance
+
+
+@register('admission_office.bulk_attendance')
+def bulk_attendance(attendance_date, attendance_records, subject=None):
+    """Record a whole school's attendance for one date outside the request"""
+    return record_bulk_attendance(
+        datetime.date.fromisoformat(attendance_date), subject, attendance_records
+    )
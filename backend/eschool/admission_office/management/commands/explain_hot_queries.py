@@ -0,0 +1,120 @@
+import json
+import re
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Q, Sum
+
+from admission_office.models import Attendance
+from employee.models import EmployeeAttendance, EmployeeSalary
+from parent.models import Payment
+
+
+def _sample(model, field_name):
+    """Return a real value of a key column, or a well-typed stand-in on an empty table"""
+    value = model.objects.values_list(field_name, flat=True).first()
+    if value is None:
+        field = model._meta.get_field(field_name)
+        value = (field.target_field if field.is_relation else field).get_default()
+    return value
+
+
+def hot_queries():
+    """Return ``(name, queryset)`` pairs mirroring the filters of the busiest endpoints"""
+    today = date.today()
+    month_start = today.replace(day=1)
+    month_end = (month_start + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+    last_30_days = Q(date__gte=today - timedelta(days=30), date__lte=today)
+    # Real key values where there are any, so the planner sees realistic selectivity
+    student = _sample(Attendance, 'student')
+    subject = _sample(Attendance, 'subject')
+    payer = _sample(Payment, 'student')
+    salary_month = _sample(EmployeeSalary, 'month')
+
+    return [
+        ('attendance today', Attendance.objects.filter(date=today)),
+        ('attendance by_student', Attendance.objects.filter(student=student).order_by('-date')),
+        ('attendance by_subject', Attendance.objects.filter(subject=subject).order_by('-date')),
+        ('attendance statistics', Attendance.objects.filter(last_30_days).order_by().values('date').annotate(
+            total=Count('pk'),
+            present=Count('pk', filter=Q(status='present')),
+            students=Count('student', distinct=True),
+        )),
+        ('attendance statistics ?level', Attendance.objects.filter(
+            last_30_days, student__level__level_no=1
+        ).order_by().values('date').annotate(total=Count('pk'))),
+        ('attendance statistics ?subject', Attendance.objects.filter(
+            last_30_days, subject=subject
+        ).order_by().values('date').annotate(total=Count('pk'))),
+        ('payments overdue', Payment.objects.filter(status='overdue')),
+        ('payments pending', Payment.objects.filter(status='pending')),
+        ('payments monthly', Payment.objects.filter(
+            student=payer, due_date__gte=month_start, due_date__lte=month_end
+        )),
+        ('employee-salaries pending', EmployeeSalary.objects.filter(status='pending')),
+        ('employee-salaries overdue', EmployeeSalary.objects.filter(status='overdue')),
+        ('employee-salaries monthly_summary', EmployeeSalary.objects.filter(
+            month=salary_month
+        ).order_by().values('status').annotate(count=Count('pk'), total=Sum('amount'))),
+        ('employee-attendance today', EmployeeAttendance.objects.filter(date=today, status='present')),
+    ]
+
+
+def full_scans(plan, vendor):
+    """Return the tables a query plan reads in full, without using an index"""
+    if vendor == 'mysql':
+        tables = []
+
+        def walk(node):
+            if isinstance(node, dict):
+                if node.get('access_type') == 'ALL':
+                    tables.append(node.get('table_name'))
+                for value in node.values():
+                    walk(value)
+            elif isinstance(node, list):
+                for value in node:
+                    walk(value)
+
+        walk(json.loads(plan))
+        return tables
+    if vendor == 'postgresql':
+        return re.findall(r'Seq Scan on (\w+)', plan)
+    if vendor == 'sqlite':
+        # "SCAN attendance" is a table scan, "SCAN attendance USING INDEX ..." walks an index
+        return [
+            match.group(1) for match in re.finditer(r'\bSCAN (?:TABLE )?(\w+)(.*)', plan)
+            if 'USING' not in match.group(2) and match.group(1) != 'CONSTANT'
+        ]
+    return []
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the queries of the busiest endpoints and flag full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fail-on-scan', action='store_true',
+            help='Exit with an error if any query scans a whole table'
+        )
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        flagged = []
+        for name, queryset in hot_queries():
+            plan = queryset.explain(format='json') if vendor == 'mysql' else queryset.explain()
+            scans = full_scans(plan, vendor)
+            if scans:
+                flagged.append(name)
+                self.stdout.write(self.style.WARNING(f'{name}: full scan of {", ".join(scans)}'))
+            else:
+                self.stdout.write(f'{name}: ok')
+            if options['verbosity'] > 1:
+                self.stdout.write(plan)
+
+        if flagged and options['fail_on_scan']:
+            raise CommandError(f'{len(flagged)} queries scan a whole table: {", ".join(flagged)}')
+        if flagged:
+            self.stdout.write(self.style.WARNING(f'{len(flagged)} queries scan a whole table'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No full table scans'))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from admission_office.exam_statistics import refresh_exam_statistics
+from admission_office.models import Exam
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored score statistics and result ranks of exams'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, help='Only refresh this exam')
+
+    def handle(self, *args, **options):
+        exams = Exam.objects.only('total_marks').order_by('pk')
+        if options['exam'] is not None:
+            exams = exams.filter(pk=options['exam'])
+            if not exams.exists():
+                raise CommandError(f"Exam {options['exam']} does not exist")
+
+        started = time.perf_counter()
+        refreshed = 0
+        for exam in exams.iterator():
+            refresh_exam_statistics(exam)
+            refreshed += 1
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Refreshed statistics for {refreshed} exams in {elapsed:.2f}s')
+        )
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admission_office', '0004_alter_attendance_subject'),
+        ('classroom', '0003_initial'),
+        ('employee', '0003_employeeattendance_emp_attendance_keyset_idx'),
+        ('student', '0001_initial'),
+        ('subject', '0006_remove_subject_level_remove_subject_sections_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['-date', 'student', 'id'], name='attendance_keyset_idx'),
+        ),
+    ]
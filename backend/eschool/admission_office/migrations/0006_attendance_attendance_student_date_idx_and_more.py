@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admission_office', '0005_attendance_attendance_keyset_idx'),
+        ('classroom', '0003_initial'),
+        ('employee', '0004_employeeattendance_emp_attendance_date_status_idx_and_more'),
+        ('student', '0001_initial'),
+        ('subject', '0006_remove_subject_level_remove_subject_sections_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['student', 'date'], name='attendance_student_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'status', 'student'], name='attendance_date_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['subject', 'date'], name='attendance_subject_date_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admission_office', '0006_attendance_attendance_student_date_idx_and_more'),
+        ('employee', '0004_employeeattendance_emp_attendance_date_status_idx_and_more'),
+        ('student', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamStatistics',
+            fields=[
+                ('exam', models.OneToOneField(help_text='Exam these statistics describe', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistics', serialize=False, to='admission_office.exam')),
+                ('result_count', models.PositiveIntegerField(default=0)),
+                ('passed_count', models.PositiveIntegerField(default=0)),
+                ('mean', models.FloatField(blank=True, null=True)),
+                ('median', models.FloatField(blank=True, null=True)),
+                ('std_dev', models.FloatField(blank=True, help_text='Population standard deviation of the marks', null=True)),
+                ('min_marks', models.PositiveIntegerField(blank=True, null=True)),
+                ('max_marks', models.PositiveIntegerField(blank=True, null=True)),
+                ('percentiles', models.JSONField(default=dict, help_text='Marks at the 10th, 25th, 50th, 75th and 90th percentiles')),
+                ('histogram', models.JSONField(default=list, help_text='Result counts per 10% band of the total marks')),
+                ('grade_counts', models.JSONField(default=dict, help_text='Result counts per grade')),
+                ('rank_count', models.PositiveIntegerField(default=0, help_text='Number of distinct ranks (distinct marks)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Exam Statistics',
+                'verbose_name_plural': 'Exam Statistics',
+                'db_table': 'exam_statistics',
+            },
+        ),
+        migrations.AddField(
+            model_name='examresult',
+            name='rank',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Dense rank by marks within the exam, maintained with the exam statistics', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='examresult',
+            index=models.Index(fields=['exam', 'rank'], name='exam_results_rank_idx'),
+        ),
+    ]
@@ -1,6 +1,20 @@
+from bisect import bisect_right
+
 from django.db import models
 from django.core.validators import MinLengthValidator
 
+from eschool.annotations import related_count
+
+
+class ExamQuerySet(models.QuerySet):
+    """Queryset for Exam with annotated counts"""
+
+    def with_counts(self):
+        """Annotate the values read by ``participant_count``"""
+        return self.annotate(
+            _participant_count=related_count(self.model, 'exam_results'),
+        )
+
 
 class Exam(models.Model):
     """Exam model for managing examinations"""
@@ -113,6 +127,8 @@ class Exam(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ExamQuerySet.as_manager()
+    
     class Meta:
         db_table = 'exams'
         ordering = ['exam_date', 'start_time']
@@ -136,9 +152,25 @@ class Exam(models.Model):
     @property
     def participant_count(self):
         """Return number of students taking this exam"""
+        if hasattr(self, '_participant_count'):
+            return self._participant_count
         return self.exam_results.count()
 
 
+# Lowest percentage that earns each grade above F, in ascending order
+GRADE_BOUNDARIES = [
+    (65, 'D'), (67, 'D+'), (70, 'C-'), (73, 'C'), (77, 'C+'), (80, 'B-'),
+    (83, 'B'), (87, 'B+'), (90, 'A-'), (93, 'A'), (97, 'A+'),
+]
+_GRADE_THRESHOLDS = [threshold for threshold, grade in GRADE_BOUNDARIES]
+
+
+def grade_for_percentage(percentage):
+    """Return the letter grade for a percentage with a binary search of the boundaries"""
+    index = bisect_right(_GRADE_THRESHOLDS, percentage)
+    return GRADE_BOUNDARIES[index - 1][1] if index else 'F'
+
+
 class ExamResult(models.Model):
     """Exam results for students"""
     
@@ -202,6 +234,12 @@ class ExamResult(models.Model):
         blank=True,
         help_text="When the exam was graded"
     )
+    rank = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Dense rank by marks within the exam, maintained with the exam statistics"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -211,46 +249,81 @@ class ExamResult(models.Model):
         ordering = ['-marks_obtained']
         verbose_name = 'Exam Result'
         verbose_name_plural = 'Exam Results'
+        indexes = [
+            # Top performers of one exam
+            models.Index(fields=['exam', 'rank'], name='exam_results_rank_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student.name} - {self.exam.exam_name} ({self.marks_obtained}/{self.exam.total_marks})"
     
+    def apply_grade(self, exam):
+        """Set grade and pass status from the marks and ``exam``'s total and passing marks"""
+        percentage = (self.marks_obtained / exam.total_marks) * 100
+        self.grade = grade_for_percentage(percentage)
+        self.is_passed = self.marks_obtained >= exam.passing_marks
+    
     def save(self, *args, **kwargs):
         """Calculate grade and pass status before saving"""
-        percentage = (self.marks_obtained / self.exam.total_marks) * 100
-        
-        # Grade calculation
-        if percentage >= 97:
-            self.grade = 'A+'
-        elif percentage >= 93:
-            self.grade = 'A'
-        elif percentage >= 90:
-            self.grade = 'A-'
-        elif percentage >= 87:
-            self.grade = 'B+'
-        elif percentage >= 83:
-            self.grade = 'B'
-        elif percentage >= 80:
-            self.grade = 'B-'
-        elif percentage >= 77:
-            self.grade = 'C+'
-        elif percentage >= 73:
-            self.grade = 'C'
-        elif percentage >= 70:
-            self.grade = 'C-'
-        elif percentage >= 67:
-            self.grade = 'D+'
-        elif percentage >= 65:
-            self.grade = 'D'
-        else:
-            self.grade = 'F'
-        
-        # Pass status
-        self.is_passed = self.marks_obtained >= self.exam.passing_marks
-        
+        self.apply_grade(self.exam)
         super().save(*args, **kwargs)
 
 
+class ExamStatistics(models.Model):
+    """Score distribution of one exam, recomputed whenever its results change"""
+    
+    exam = models.OneToOneField(
+        Exam,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='statistics',
+        help_text="Exam these statistics describe"
+    )
+    result_count = models.PositiveIntegerField(default=0)
+    passed_count = models.PositiveIntegerField(default=0)
+    mean = models.FloatField(null=True, blank=True)
+    median = models.FloatField(null=True, blank=True)
+    std_dev = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Population standard deviation of the marks"
+    )
+    min_marks = models.PositiveIntegerField(null=True, blank=True)
+    max_marks = models.PositiveIntegerField(null=True, blank=True)
+    percentiles = models.JSONField(
+        default=dict,
+        help_text="Marks at the 10th, 25th, 50th, 75th and 90th percentiles"
+    )
+    histogram = models.JSONField(
+        default=list,
+        help_text="Result counts per 10% band of the total marks"
+    )
+    grade_counts = models.JSONField(
+        default=dict,
+        help_text="Result counts per grade"
+    )
+    rank_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of distinct ranks (distinct marks)"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'exam_statistics'
+        verbose_name = 'Exam Statistics'
+        verbose_name_plural = 'Exam Statistics'
+    
+    def __str__(self):
+        return f"Statistics for {self.exam_id}"
+    
+    @property
+    def pass_rate(self):
+        """Percentage of results that passed"""
+        if self.result_count:
+            return round(self.passed_count / self.result_count * 100, 2)
+        return 0
+
+
 class Attendance(models.Model):
     """Student attendance tracking"""
     
@@ -262,6 +335,9 @@ class Attendance(models.Model):
         ('half_day', 'Half Day'),
     ]
     
+    # Statuses that count as attending the class
+    PRESENT_STATUSES = ['present', 'late', 'half_day']
+    
     student = models.ForeignKey(
         'student.Student',
         on_delete=models.CASCADE,
@@ -323,6 +399,16 @@ class Attendance(models.Model):
         ordering = ['-date', 'student']
         verbose_name = 'Attendance'
         verbose_name_plural = 'Attendance Records'
+        indexes = [
+            # Keyset pagination over the default ordering (-date, student, pk)
+            models.Index(fields=['-date', 'student', 'id'], name='attendance_keyset_idx'),
+            # by_student and the level/section joins of statistics
+            models.Index(fields=['student', 'date'], name='attendance_student_date_idx'),
+            # today and statistics; covers the status and distinct-student counts
+            models.Index(fields=['date', 'status', 'student'], name='attendance_date_status_idx'),
+            # by_subject and the subject filter of statistics
+            models.Index(fields=['subject', 'date'], name='attendance_subject_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student.name} - {self.subject.s_name} ({self.date}) - {self.status}"
@@ -330,7 +416,7 @@ class Attendance(models.Model):
     @property
     def is_present(self):
         """Check if student was present"""
-        return self.status in ['present', 'late', 'half_day']
+        return self.status in self.PRESENT_STATUSES
     
     @property
     def working_hours(self):
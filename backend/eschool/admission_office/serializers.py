@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Exam, ExamResult, Attendance, Admission
+from .models import Exam, ExamResult, ExamStatistics, Attendance, Admission
+from employee.models import Employee
 from subject.models import Subject
 
 
@@ -55,10 +56,10 @@ class ExamResultSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'exam', 'exam_name', 'subject_name', 'student', 'student_name',
             'student_number', 'marks_obtained', 'total_marks', 'grade',
-            'is_passed', 'remarks', 'submitted_at', 'graded_by', 'graded_by_name',
+            'is_passed', 'rank', 'remarks', 'submitted_at', 'graded_by', 'graded_by_name',
             'graded_at', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'grade', 'is_passed', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'grade', 'is_passed', 'rank', 'created_at', 'updated_at']
     
     def validate_marks_obtained(self, value):
         """Validate marks obtained"""
@@ -67,6 +68,20 @@ class ExamResultSerializer(serializers.ModelSerializer):
         return value
 
 
+class ExamStatisticsSerializer(serializers.ModelSerializer):
+    """Serializer for the stored score distribution of an exam"""
+    
+    pass_rate = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = ExamStatistics
+        fields = [
+            'exam', 'result_count', 'passed_count', 'pass_rate', 'mean', 'median',
+            'std_dev', 'min_marks', 'max_marks', 'percentiles', 'histogram',
+            'grade_counts', 'rank_count', 'updated_at'
+        ]
+
+
 class AttendanceSerializer(serializers.ModelSerializer):
     """Serializer for Attendance model"""
     
@@ -100,6 +115,7 @@ class AttendanceSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'is_present', 'working_hours', 'created_at', 'updated_at']
+        related_paths = ['subject']
     
     def validate(self, data):
         """Validate attendance data"""
@@ -109,6 +125,55 @@ class AttendanceSerializer(serializers.ModelSerializer):
         return data
 
 
+class BulkAttendanceRecordSerializer(serializers.Serializer):
+    """Validates one row of a bulk attendance payload without touching the database"""
+
+    student = serializers.UUIDField()
+    status = serializers.ChoiceField(choices=Attendance.ATTENDANCE_STATUS, default='present')
+    check_in_time = serializers.TimeField(required=False, allow_null=True)
+    check_out_time = serializers.TimeField(required=False, allow_null=True)
+    notes = serializers.CharField(required=False, allow_blank=True, allow_null=True, default='')
+
+    def validate(self, data):
+        """Validate attendance data"""
+        if data.get('check_in_time') and data.get('check_out_time'):
+            if data['check_in_time'] >= data['check_out_time']:
+                raise serializers.ValidationError("Check-out time must be after check-in time.")
+        return data
+
+
+class BulkExamResultRowSerializer(serializers.Serializer):
+    """Validates one row of a bulk marksheet without touching the database"""
+
+    student = serializers.UUIDField(required=False)
+    student_number = serializers.CharField(required=False)
+    marks_obtained = serializers.IntegerField(min_value=0)
+    remarks = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    submitted_at = serializers.DateTimeField(required=False, allow_null=True)
+
+    def validate_marks_obtained(self, value):
+        """Validate marks against the exam's total"""
+        exam = self.context['exam']
+        if value > exam.total_marks:
+            raise serializers.ValidationError(f"Marks obtained cannot exceed {exam.total_marks}.")
+        return value
+
+    def validate(self, data):
+        """Require a student id or student number"""
+        if not data.get('student') and not data.get('student_number'):
+            raise serializers.ValidationError("Either student or student_number is required.")
+        return data
+
+
+class BulkExamResultSerializer(serializers.Serializer):
+    """Validates a bulk marksheet payload; each row is checked by ``BulkExamResultRowSerializer``"""
+
+    results = serializers.ListField(allow_empty=False)
+    graded_by = serializers.PrimaryKeyRelatedField(
+        queryset=Employee.objects.all(), required=False, allow_null=True
+    )
+
+
 class AdmissionSerializer(serializers.ModelSerializer):
     """Serializer for Admission model"""
     
@@ -182,6 +247,7 @@ class AttendanceListSerializer(serializers.ModelSerializer):
             'id', 'student_name', 'student_number', 'subject_name', 'date', 
             'status', 'check_in_time', 'check_out_time', 'notes', 'is_present'
         ]
+        related_paths = ['subject']
 
 
 
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Exam, ExamResult
+from .exam_statistics import refresh_on_commit
+
+
+@receiver(post_save, sender=ExamResult)
+@receiver(post_delete, sender=ExamResult)
+def refresh_statistics_on_result_change(sender, instance, **kwargs):
+    """Keep the exam's statistics and ranks in step with its results"""
+    if kwargs.get('raw'):
+        return
+    # Deleting the exam itself cascades here; its statistics go with it
+    origin = kwargs.get('origin')
+    if isinstance(origin, Exam) or getattr(origin, 'model', None) is Exam:
+        return
+    refresh_on_commit(instance.exam_id)
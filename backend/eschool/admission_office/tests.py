@@ -1,3 +1,447 @@
-from django.test import TestCase
+import datetime
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from eschool.pagination import SchoolPagination
+from eschool.testing import SchoolQueryBudgetTestCase
+
+
+class AdmissionOfficeListQueryTests(SchoolQueryBudgetTestCase):
+    """List and detail endpoints load related rows up-front"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from admission_office.models import Exam, ExamResult, Attendance, Admission
+
+        cls.exam = Exam.objects.create(
+            exam_name='Final', exam_type='final', subject=cls.subjects[0], level=cls.level,
+            section=cls.sections[0], duration=datetime.timedelta(hours=1), total_marks=100,
+            passing_marks=40, exam_date=datetime.date(2025, 3, 1), start_time=datetime.time(9),
+            end_time=datetime.time(10), class_room=cls.rooms[0], invigilator=cls.employees[0],
+            academic_year='2025',
+        )
+        for i, student in enumerate(cls.students):
+            ExamResult.objects.create(
+                exam=cls.exam, student=student, marks_obtained=50 + i, graded_by=cls.employees[i]
+            )
+            Attendance.objects.create(
+                student=student, subject=cls.subjects[i], class_room=cls.rooms[i],
+                date=datetime.date(2025, 1, 2), teacher=cls.employees[i],
+            )
+            Admission.objects.create(
+                student_name=f'Applicant {i}', date_of_birth=datetime.date(2015, 1, 1),
+                gender='male', parent_name='Parent', parent_email='parent@example.com',
+                parent_phone='0100', address='Street', level_applying_for=cls.level,
+                processed_by=cls.employees[i],
+            )
+
+    def test_exam_detail_query_budget(self):
+        self.assertQueryBudget(f'/api/exams/{self.exam.pk}/', 4)
+
+    def test_exam_list_query_budget(self):
+        self.assertQueryBudget('/api/exams/', 2)
+
+    def test_exam_result_list_query_budget(self):
+        self.assertQueryBudget('/api/exam-results/', 2)
+
+    def test_attendance_list_query_budget(self):
+        self.assertQueryBudget('/api/attendance/', 2)
+
+    def test_admission_list_query_budget(self):
+        self.assertQueryBudget('/api/admissions/', 2)
+
+
+class AttendanceKeysetPaginationTests(SchoolQueryBudgetTestCase):
+    """Cursor pages follow (-date, student, pk) without COUNT or OFFSET"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from admission_office.models import Attendance
+
+        for day in range(1, 4):
+            for i, student in enumerate(cls.students):
+                Attendance.objects.create(
+                    student=student, subject=cls.subjects[i], class_room=cls.rooms[i],
+                    date=datetime.date(2025, 1, day), teacher=cls.employees[i],
+                )
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(SchoolPagination, 'page_size', 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pages_cover_the_ordering_in_one_query_each(self):
+        from admission_office.models import Attendance
+
+        expected = list(
+            Attendance.objects.order_by('-date', 'student_id', 'id').values_list('id', flat=True)
+        )
+        seen = []
+        pages = []
+        url = '/api/attendance/?pagination=cursor'
+        while url:
+            response = self.assertQueryBudget(url, 1)
+            self.assertNotIn('count', response.data)
+            pages.append(response.data)
+            seen += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, expected)
+        self.assertIsNone(pages[0]['previous'])
+
+        previous = self.client.get(pages[-1]['previous']).data
+        self.assertEqual(previous['results'], pages[-2]['results'])
+
+    def test_filters_apply_to_cursor_pages(self):
+        response = self.client.get(
+            f'/api/attendance/?pagination=cursor&student={self.students[0].pk}'
+        )
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get('/api/attendance/?cursor=bm90LWEtY3Vyc29y')
+        self.assertEqual(response.status_code, 404)
+
+    def test_nullable_ordering_is_rejected(self):
+        response = self.client.get('/api/attendance/?pagination=cursor&ordering=check_in_time')
+        self.assertEqual(response.status_code, 400)
+
+
+class ExplainHotQueriesTests(SchoolQueryBudgetTestCase):
+    """The hot endpoint queries are answered from indexes"""
+
+    def test_no_hot_query_scans_a_whole_table(self):
+        out = StringIO()
+        call_command('explain_hot_queries', '--fail-on-scan', stdout=out)
+        self.assertIn('No full table scans', out.getvalue())
+
+
+class FullScanDetectionTests(SimpleTestCase):
+    """Plans are parsed per database vendor"""
+
+    def test_sqlite_table_scan_is_flagged_but_index_scan_is_not(self):
+        from admission_office.management.commands.explain_hot_queries import full_scans
+
+        plan = '2 0 0 SCAN payments\n5 0 0 SCAN attendance USING INDEX attendance_keyset_idx'
+        self.assertEqual(full_scans(plan, 'sqlite'), ['payments'])
+
+    def test_mysql_access_type_all_is_flagged(self):
+        from admission_office.management.commands.explain_hot_queries import full_scans
+
+        plan = '{"query_block": {"nested_loop": [{"table": {"table_name": "payments", "access_type": "ALL"}},' \
+               ' {"table": {"table_name": "students", "access_type": "eq_ref"}}]}}'
+        self.assertEqual(full_scans(plan, 'mysql'), ['payments'])
+
+
+class AttendanceExportTests(SchoolQueryBudgetTestCase):
+    """Exports stream every filtered row in keyset batches"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from admission_office.models import Attendance
+
+        for day in range(1, 4):
+            for i, student in enumerate(cls.students):
+                Attendance.objects.create(
+                    student=student, subject=cls.subjects[i], class_room=cls.rooms[i],
+                    date=datetime.date(2025, 1, day), teacher=cls.employees[i],
+                    status='present' if i else 'absent',
+                )
+
+    def export(self, url):
+        from admission_office.views import AttendanceViewSet
+
+        with mock.patch.object(AttendanceViewSet, 'export_batch_size', 2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_export_covers_every_row_in_order(self):
+        from admission_office.models import Attendance
+
+        response, body = self.export('/api/attendance/export/')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = body.splitlines()
+        self.assertTrue(lines[0].startswith('id,date,student_id'))
+        expected = Attendance.objects.order_by('-date', 'student_id', 'id').values_list('id', flat=True)
+        self.assertEqual([int(line.split(',')[0]) for line in lines[1:]], list(expected))
+
+    def test_ndjson_export_honours_filters(self):
+        import json
+
+        response, body = self.export('/api/attendance/export/?export_format=ndjson&status=present')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual({row['status'] for row in rows}, {'present'})
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get('/api/attendance/export/?export_format=xml')
+        self.assertEqual(response.status_code, 400)
+
+
+class BulkAttendanceTests(SchoolQueryBudgetTestCase):
+    """Bulk attendance upserts a class in a fixed number of queries and reports bad rows"""
+
+    rows = 6
+    url = '/api/attendance/bulk/'
+
+    def post(self, day, records):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {
+                'date': f'2025-02-{day:02}', 'subject': self.subjects[0].pk, 'attendance_records': records,
+            }, format='json')
+        return response, len(queries.captured_queries)
+
+    def test_query_count_does_not_grow_with_the_class(self):
+        one, one_queries = self.post(3, [{'student': str(self.students[0].pk), 'status': 'present'}])
+        everyone, everyone_queries = self.post(4, [
+            {'student': str(student.pk), 'status': 'present'} for student in self.students
+        ])
+        self.assertEqual((one.status_code, everyone.status_code), (201, 201))
+        self.assertEqual(everyone.data['total_created'], len(self.students))
+        self.assertEqual(everyone_queries, one_queries)
+
+    def test_existing_rows_are_updated(self):
+        from admission_office.models import Attendance
+
+        Attendance.objects.create(
+            student=self.students[0], subject=self.subjects[0], date=datetime.date(2025, 2, 3),
+            status='absent', check_in_time=datetime.time(8, 5),
+        )
+        response, queries = self.post(3, [
+            {'student': str(self.students[0].pk), 'status': 'late'},
+            {'student': str(self.students[1].pk), 'status': 'present'},
+        ])
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['total_created'], 2)
+        rows = Attendance.objects.filter(date=datetime.date(2025, 2, 3))
+        self.assertEqual(rows.count(), 2)
+        updated = rows.get(student=self.students[0])
+        # Times left out of the payload keep their value
+        self.assertEqual((updated.status, updated.check_in_time), ('late', datetime.time(8, 5)))
+
+    def test_row_errors_answer_207(self):
+        import uuid
+        from admission_office.models import Attendance
+
+        response, queries = self.post(3, [
+            {'student': str(self.students[0].pk), 'status': 'present'},
+            {'student': str(self.students[1].pk), 'status': 'asleep'},
+            {'student': str(uuid.uuid4()), 'status': 'present'},
+        ])
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual((response.data['total_created'], response.data['total_errors']), (1, 2))
+        self.assertEqual(list(response.data['errors'][0]['errors']), ['status'])
+        self.assertEqual(list(response.data['errors'][1]['errors']), ['student'])
+        self.assertEqual(Attendance.objects.filter(date=datetime.date(2025, 2, 3)).count(), 1)
+
+
+class ExamResultBulkTests(SchoolQueryBudgetTestCase):
+    """A whole marksheet is graded and written with a fixed number of queries"""
+
+    rows = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from admission_office.models import Exam
+        from student.models import Student
+
+        cls.exam = Exam.objects.create(
+            exam_name='Midterm', exam_type='midterm', subject=cls.subjects[0], level=cls.level,
+            duration=datetime.timedelta(hours=1), total_marks=50, passing_marks=20,
+            exam_date=datetime.date(2025, 3, 1), start_time=datetime.time(9),
+            end_time=datetime.time(10), academic_year='2025',
+        )
+        cls.students += [
+            Student.objects.create(
+                student_number=f'BULK{i:03}', name=f'Bulk {i}', email=f'bulk{i}@example.com',
+                gender='female', date_of_birth=datetime.date(2015, 1, 1),
+                enroll_date=datetime.date(2025, 1, 1), address='Street', level=cls.level,
+                department=cls.department, emergency_contact_name='Guardian',
+                emergency_contact_phone='0100',
+            )
+            for i in range(30)
+        ]
+        cls.url = f'/api/exams/{cls.exam.pk}/results/bulk/'
+
+    def test_json_marksheet_is_graded_like_single_saves(self):
+        from admission_office.models import ExamResult
+
+        marksheet = [
+            {'student': str(student.pk), 'marks_obtained': (i * 7) % 51}
+            for i, student in enumerate(self.students)
+        ]
+        # Lookups, the insert and the statistics refresh; independent of the sheet size
+        response = self.assertQueryBudget(
+            self.url, 17, method='post', data={'results': marksheet, 'graded_by': self.employees[0].pk}
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['total_created'], len(self.students))
+
+        for result in ExamResult.objects.filter(exam=self.exam).select_related('exam'):
+            grade, is_passed = result.grade, result.is_passed
+            result.apply_grade(result.exam)
+            self.assertEqual((grade, is_passed), (result.grade, result.is_passed))
+            self.assertEqual(result.graded_by_id, self.employees[0].pk)
+
+    def test_resubmitted_rows_update_existing_results(self):
+        from admission_office.models import ExamResult
+
+        student = self.students[0]
+        self.client.post(self.url, [{'student': str(student.pk), 'marks_obtained': 10}], format='json')
+        response = self.client.post(
+            self.url, [{'student_number': student.student_number, 'marks_obtained': 49}], format='json'
+        )
+        self.assertEqual((response.data['total_created'], response.data['total_updated']), (0, 1))
+        result = ExamResult.objects.get(exam=self.exam, student=student)
+        self.assertEqual((result.marks_obtained, result.grade, result.is_passed), (49, 'A+', True))
+
+    def test_csv_marksheet_reports_row_errors(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        csv_file = SimpleUploadedFile('marks.csv', (
+            'student_number,marks_obtained,remarks\n'
+            'STU000,45,Good\n'
+            'STU001,60,\n'
+            'NOPE,30,\n'
+        ).encode(), content_type='text/csv')
+        response = self.client.post(self.url, {'file': csv_file}, format='multipart')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['total_created'], 1)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3])
+
+    def test_marksheet_is_recorded_without_a_request(self):
+        from admission_office.exam_results import record_bulk_results
+        from admission_office.models import ExamResult
+
+        student = self.students[0]
+        ExamResult.objects.create(exam=self.exam, student=student, marks_obtained=10)
+        with self.captureOnCommitCallbacks(execute=True):
+            summary = record_bulk_results(self.exam, [
+                {'student': str(student.pk), 'marks_obtained': 45},
+                {'student_number': self.students[1].student_number, 'marks_obtained': 5},
+                {'student_number': 'NOPE', 'marks_obtained': 30},
+            ], graded_by=self.employees[0])
+        self.assertEqual(
+            {key: summary[key] for key in ('total_created', 'total_updated', 'passed', 'failed', 'total_errors')},
+            {'total_created': 1, 'total_updated': 1, 'passed': 1, 'failed': 1, 'total_errors': 1},
+        )
+        self.assertEqual(summary['errors'][0]['row'], 3)
+        result = ExamResult.objects.get(exam=self.exam, student=student)
+        self.assertEqual((result.marks_obtained, result.graded_by_id), (45, self.employees[0].pk))
+
+    def test_bad_payload_answers_400(self):
+        empty = self.client.post(self.url, {'results': []}, format='json')
+        unknown_grader = self.client.post(self.url, {
+            'results': [{'student': str(self.students[0].pk), 'marks_obtained': 10}], 'graded_by': 999999,
+        }, format='json')
+        self.assertEqual((empty.status_code, unknown_grader.status_code), (400, 400))
+        self.assertIn('results', empty.data)
+        self.assertIn('graded_by', unknown_grader.data)
+
+
+class ExamStatisticsStoreTests(SchoolQueryBudgetTestCase):
+    """Exam statistics and ranks follow result changes and are read from the store"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from admission_office.models import Exam, ExamResult
+
+        cls.exam = Exam.objects.create(
+            exam_name='Quiz', exam_type='quiz', subject=cls.subjects[0], level=cls.level,
+            duration=datetime.timedelta(hours=1), total_marks=100, passing_marks=40,
+            exam_date=datetime.date(2025, 3, 1), start_time=datetime.time(9),
+            end_time=datetime.time(10), academic_year='2025',
+        )
+        with cls.captureOnCommitCallbacks(execute=True):
+            for student, marks in zip(cls.students, [90, 60, 90]):
+                ExamResult.objects.create(exam=cls.exam, student=student, marks_obtained=marks)
+
+    def test_saving_results_refreshes_distribution_and_ranks(self):
+        response = self.assertQueryBudget(f'/api/exams/{self.exam.pk}/distribution/', 1)
+        self.assertEqual(response.data['result_count'], 3)
+        self.assertEqual(response.data['mean'], 80.0)
+        self.assertEqual(response.data['median'], 90.0)
+        self.assertEqual(response.data['rank_count'], 2)
+        self.assertEqual(response.data['grade_counts']['A-'], 2)
+        self.assertEqual(response.data['histogram'][9]['count'], 2)
+
+        response = self.assertQueryBudget(
+            f'/api/exams/{self.exam.pk}/rank/?student={self.students[1].pk}', 1
+        )
+        self.assertEqual((response.data['rank'], response.data['rank_count']), (2, 2))
+
+        from admission_office.models import ExamResult
+        with self.captureOnCommitCallbacks(execute=True):
+            ExamResult.objects.get(exam=self.exam, student=self.students[0]).delete()
+        response = self.client.get(f'/api/exams/{self.exam.pk}/rank/?student={self.students[1].pk}')
+        self.assertEqual(response.data['result_count'], 2)
+
+    def test_saves_in_one_transaction_refresh_once(self):
+        from admission_office.models import ExamResult
+
+        results = list(ExamResult.objects.filter(exam=self.exam))
+        with self.captureOnCommitCallbacks() as callbacks:
+            for result in results:
+                result.marks_obtained = 70
+                result.save()
+        with mock.patch('admission_office.exam_statistics.refresh_exam_statistics') as refresh:
+            for callback in callbacks:
+                callback()
+        self.assertEqual(refresh.call_count, 1)
+
+    def test_invalid_scope_parameters_answer_400(self):
+        for url in (
+            '/api/exam-results/statistics/?exam=abc',
+            '/api/exam-results/by_grade/?exam=abc',
+            '/api/exam-results/top_performers/?exam=abc',
+            '/api/exam-results/top_performers/?level=abc',
+            '/api/exam-results/top_performers/?section=abc',
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 400)
+
+    def test_bulk_marksheet_refreshes_ranks(self):
+        self.client.post(
+            f'/api/exams/{self.exam.pk}/results/bulk/',
+            [{'student': str(self.students[1].pk), 'marks_obtained': 95}], format='json'
+        )
+        response = self.client.get(f'/api/exams/{self.exam.pk}/rank/?student={self.students[1].pk}')
+        self.assertEqual(response.data['rank'], 1)
+
+    def test_top_performers_scoped_to_an_exam(self):
+        response = self.assertQueryBudget(f'/api/exam-results/top_performers/?exam={self.exam.pk}&limit=2', 1)
+        self.assertEqual([row['rank'] for row in response.data], [1, 1])
+
+        response = self.client.get(f'/api/exam-results/top_performers/?section={self.sections[1].pk}')
+        self.assertEqual([row['student'] for row in response.data], [self.students[1].pk])
+
+    def test_result_statistics_for_one_exam_read_the_store(self):
+        response = self.assertQueryBudget(f'/api/exam-results/statistics/?exam={self.exam.pk}', 1)
+        self.assertEqual((response.data['total_results'], response.data['passed_count']), (3, 3))
+
+    def test_result_statistics_round_the_average_in_both_scopes(self):
+        from admission_office.models import ExamResult
+
+        result = ExamResult.objects.get(exam=self.exam, student=self.students[1])
+        result.marks_obtained = 61
+        with self.captureOnCommitCallbacks(execute=True):
+            result.save()
+        one_exam = self.client.get(f'/api/exam-results/statistics/?exam={self.exam.pk}').data
+        every_exam = self.client.get('/api/exam-results/statistics/').data
+        self.assertEqual(one_exam['average_marks'], 80.33)
+        self.assertEqual(every_exam['average_marks'], 80.33)
@@ -1,21 +1,28 @@
-from rest_framework import viewsets, filters, status
+from rest_framework import viewsets, filters, status, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
 
-from .models import Exam, ExamResult, Attendance, Admission
+from eschool.mixins import ExportMixin, RelatedFieldsMixin
+from eschool.cache import cached_response
+from eschool.statistics import StatisticsBuilder
+from jobs.views import async_requested, job_accepted
+from .attendance import record_bulk_attendance
+from .exam_results import record_bulk_results
+from .exam_statistics import refresh_exam_statistics
+from .models import Exam, ExamResult, ExamStatistics, Attendance, Admission
 from .serializers import (
     ExamSerializer, ExamDetailSerializer, ExamListSerializer,
-    ExamResultSerializer, AttendanceSerializer, AttendanceListSerializer,
-    AdmissionSerializer
+    ExamResultSerializer, ExamStatisticsSerializer, AttendanceSerializer, AttendanceListSerializer,
+    BulkExamResultSerializer, AdmissionSerializer
 )
 
 
-class ExamViewSet(viewsets.ModelViewSet):
+class ExamViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for Exam model"""
     
-    queryset = Exam.objects.all()
+    queryset = Exam.objects.with_counts()
     serializer_class = ExamSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['exam_type', 'subject', 'level', 'section', 'status', 'academic_year']
@@ -49,12 +56,92 @@ class ExamViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=True, methods=['post'], url_path='results/bulk')
+    def bulk_results(self, request, pk=None):
+        """Create or update the results of a whole marksheet (JSON rows or a CSV file)"""
+        import csv
+        import io
+        
+        exam = self.get_object()
+        
+        if 'file' in request.FILES:
+            try:
+                text = request.FILES['file'].read().decode('utf-8-sig')
+            except UnicodeDecodeError:
+                return Response({'error': 'CSV file must be UTF-8 encoded'}, status=status.HTTP_400_BAD_REQUEST)
+            # Empty cells count as omitted optional columns
+            payload = {
+                'results': [
+                    {key: value for key, value in row.items() if key and value not in ('', None)}
+                    for row in csv.DictReader(io.StringIO(text))
+                ],
+                'graded_by': request.data.get('graded_by') or None,
+            }
+        elif isinstance(request.data, list):
+            payload = {'results': request.data}
+        else:
+            payload = {'results': request.data.get('results'), 'graded_by': request.data.get('graded_by') or None}
+        
+        serializer = BulkExamResultSerializer(data=payload)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        response_data = record_bulk_results(
+            exam, serializer.validated_data['results'], serializer.validated_data.get('graded_by')
+        )
+        
+        if response_data['errors']:
+            return Response(response_data, status=status.HTTP_207_MULTI_STATUS)
+        
+        return Response(response_data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=True, methods=['get'])
+    def distribution(self, request, pk=None):
+        """Get the stored score distribution of an exam"""
+        stats = ExamStatistics.objects.filter(exam_id=pk).first()
+        if stats is None:
+            # Exams graded before the statistics store existed are filled in on first read
+            stats = refresh_exam_statistics(self.get_object())
+        return Response(ExamStatisticsSerializer(stats).data)
+    
+    @action(detail=True, methods=['get'])
+    def rank(self, request, pk=None):
+        """Get a student's rank in an exam"""
+        student_id = request.query_params.get('student')
+        if not student_id:
+            return Response({'error': 'student parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            student_id = serializers.UUIDField().run_validation(student_id)
+        except serializers.ValidationError as e:
+            return Response({'student': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        
+        result = ExamResult.objects.filter(exam_id=pk, student_id=student_id).select_related(
+            'exam__statistics'
+        ).first()
+        if result is None:
+            return Response({'error': 'No result for this student in this exam'}, status=status.HTTP_404_NOT_FOUND)
+        stats = getattr(result.exam, 'statistics', None)
+        if stats is None or result.rank is None:
+            stats = refresh_exam_statistics(result.exam)
+            result.refresh_from_db(fields=['rank'])
+        
+        return Response({
+            'exam': result.exam_id,
+            'student': result.student_id,
+            'marks_obtained': result.marks_obtained,
+            'grade': result.grade,
+            'is_passed': result.is_passed,
+            'rank': result.rank,
+            'rank_count': stats.rank_count,
+            'result_count': stats.result_count,
+        })
+    
     @action(detail=False, methods=['get'])
     def upcoming(self, request):
         """Get upcoming exams"""
         from datetime import date
         today = date.today()
-        upcoming_exams = Exam.objects.filter(
+        upcoming_exams = Exam.objects.with_counts().filter(
             exam_date__gte=today, status='scheduled'
         )
         serializer = ExamListSerializer(upcoming_exams, many=True)
@@ -65,7 +152,7 @@ class ExamViewSet(viewsets.ModelViewSet):
         """Get today's exams"""
         from datetime import date
         today = date.today()
-        today_exams = Exam.objects.filter(exam_date=today)
+        today_exams = Exam.objects.with_counts().filter(exam_date=today)
         serializer = ExamListSerializer(today_exams, many=True)
         return Response(serializer.data)
     
@@ -92,28 +179,28 @@ class ExamViewSet(viewsets.ModelViewSet):
         return Response(list(levels))
     
     @action(detail=False, methods=['get'])
+    @cached_response(Exam, 'subject.Subject', 'level.Level')
     def statistics(self, request):
         """Get exam statistics"""
-        from django.db.models import Count
         from datetime import date
         
         today = date.today()
         
-        stats = {
-            'total_exams': Exam.objects.count(),
-            'upcoming_exams': Exam.objects.filter(
-                exam_date__gte=today, status='scheduled'
-            ).count(),
-            'today_exams': Exam.objects.filter(exam_date=today).count(),
-            'completed_exams': Exam.objects.filter(status='completed').count(),
-            'by_type': list(Exam.objects.values('exam_type').annotate(count=Count('id'))),
-            'by_subject': list(Exam.objects.values('subject__s_name').annotate(count=Count('id'))),
-            'by_level': list(Exam.objects.values('level__level_name').annotate(count=Count('id'))),
-        }
+        stats = (
+            StatisticsBuilder(Exam.objects.all())
+            .count('total_exams')
+            .count('upcoming_exams', exam_date__gte=today, status='scheduled')
+            .count('today_exams', exam_date=today)
+            .count('completed_exams', status='completed')
+            .group_by('by_type', 'exam_type')
+            .group_by('by_subject', 'subject__s_name')
+            .group_by('by_level', 'level__level_name')
+            .build()
+        )
         return Response(stats)
 
 
-class ExamResultViewSet(viewsets.ModelViewSet):
+class ExamResultViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for ExamResult model"""
     
     queryset = ExamResult.objects.all()
@@ -124,11 +211,35 @@ class ExamResultViewSet(viewsets.ModelViewSet):
     ordering_fields = ['marks_obtained', 'grade', 'graded_at']
     ordering = ['-marks_obtained']
     
+    def exam_statistics(self, request):
+        """Return the stored statistics for ``?exam=``, or None when the parameter is absent"""
+        from django.shortcuts import get_object_or_404
+        
+        exam_id = request.query_params.get('exam')
+        if not exam_id:
+            return None
+        try:
+            exam_id = serializers.IntegerField().run_validation(exam_id)
+        except serializers.ValidationError as e:
+            raise serializers.ValidationError({'exam': e.detail})
+        stats = ExamStatistics.objects.filter(exam_id=exam_id).first()
+        if stats is None:
+            stats = refresh_exam_statistics(get_object_or_404(Exam, pk=exam_id))
+        return stats
+    
     @action(detail=False, methods=['get'])
+    @cached_response(ExamResult)
     def by_grade(self, request):
-        """Get results grouped by grade"""
+        """Get results grouped by grade, for one exam with ?exam="""
         from django.db.models import Count
         
+        stats = self.exam_statistics(request)
+        if stats is not None:
+            return Response([
+                {'grade': grade, 'count': count}
+                for grade, count in sorted(stats.grade_counts.items()) if count
+            ])
+        
         grades = ExamResult.objects.values('grade').annotate(
             count=Count('id')
         ).order_by('grade')
@@ -137,29 +248,78 @@ class ExamResultViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def top_performers(self, request):
-        """Get top performing students"""
-        top_results = ExamResult.objects.order_by('-marks_obtained')[:10]
-        serializer = ExamResultSerializer(top_results, many=True)
+        """Get top performing students, optionally for one exam, level or section"""
+        from django.db.models import F, FloatField
+        from django.db.models.functions import Cast
+        
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 100)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        scope = {}
+        for name in ('exam', 'level', 'section'):
+            value = request.query_params.get(name)
+            if not value:
+                continue
+            try:
+                scope[name] = serializers.IntegerField().run_validation(value)
+            except serializers.ValidationError as e:
+                return Response({name: e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        exam, level, section = scope.get('exam'), scope.get('level'), scope.get('section')
+        
+        results = ExamResult.objects.select_related('exam__subject', 'student', 'graded_by')
+        if exam:
+            # Ranks are maintained per exam, so this reads the head of the (exam, rank) index
+            results = results.filter(exam_id=exam, rank__isnull=False).order_by('rank', 'pk')
+        elif level or section:
+            # Exams of a level or section have different totals; compare percentages
+            if level:
+                results = results.filter(student__level_id=level)
+            if section:
+                results = results.filter(student__section_id=section)
+            results = results.annotate(
+                percentage=Cast(F('marks_obtained'), FloatField()) * 100 / F('exam__total_marks')
+            ).order_by('-percentage', 'pk')
+        else:
+            results = results.order_by('-marks_obtained')
+        
+        serializer = ExamResultSerializer(results[:limit], many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cached_response(ExamResult)
     def statistics(self, request):
-        """Get exam result statistics"""
-        from django.db.models import Count, Avg
+        """Get exam result statistics, for one exam with ?exam="""
+        from django.db.models import Avg
         
-        stats = {
-            'total_results': ExamResult.objects.count(),
-            'passed_count': ExamResult.objects.filter(is_passed=True).count(),
-            'failed_count': ExamResult.objects.filter(is_passed=False).count(),
-            'average_marks': round(
-                ExamResult.objects.aggregate(Avg('marks_obtained'))['marks_obtained__avg'] or 0, 2
-            ),
-            'by_grade': list(ExamResult.objects.values('grade').annotate(count=Count('id'))),
-        }
+        exam_stats = self.exam_statistics(request)
+        if exam_stats is not None:
+            return Response({
+                'total_results': exam_stats.result_count,
+                'passed_count': exam_stats.passed_count,
+                'failed_count': exam_stats.result_count - exam_stats.passed_count,
+                'average_marks': round(exam_stats.mean or 0, 2),
+                'by_grade': [
+                    {'grade': grade, 'count': count}
+                    for grade, count in exam_stats.grade_counts.items() if count
+                ],
+            })
+        
+        stats = (
+            StatisticsBuilder(ExamResult.objects.all())
+            .count('total_results')
+            .count('passed_count', is_passed=True)
+            .count('failed_count', is_passed=False)
+            .aggregate('average_marks', Avg('marks_obtained'))
+            .group_by('by_grade', 'grade')
+            .build()
+        )
+        stats['average_marks'] = round(stats['average_marks'] or 0, 2)
         return Response(stats)
 
 
-class AttendanceViewSet(viewsets.ModelViewSet):
+class AttendanceViewSet(ExportMixin, RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for Attendance model"""
     
     queryset = Attendance.objects.all()
@@ -169,6 +329,11 @@ class AttendanceViewSet(viewsets.ModelViewSet):
     search_fields = ['student__name', 'student__student_number', 'subject__s_name']
     ordering_fields = ['date', 'check_in_time']
     ordering = ['-date']
+    export_fields = [
+        'id', 'date', 'student_id', 'student__student_number', 'student__name',
+        'subject_id', 'subject__s_name', 'class_room_id', 'teacher__name',
+        'status', 'check_in_time', 'check_out_time', 'notes',
+    ]
     
     def get_serializer_class(self):
         """Return appropriate serializer based on action"""
@@ -208,8 +373,8 @@ class AttendanceViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Get attendance statistics"""
-        from django.db.models import Count, Avg
-        from datetime import date, datetime
+        from django.db.models import Count, Q
+        from datetime import datetime, timedelta
         
         # Get query parameters for filtering
         start_date = request.query_params.get('start_date')
@@ -233,14 +398,26 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         if subject:
             attendance_qs = attendance_qs.filter(subject__s_code=subject)
         
-        today = date.today()
+        # Per-status counts, computed with conditional aggregation so the
+        # totals and the daily breakdown each cost a single query
+        status_counts = {
+            'present': Count('id', filter=Q(status='present')),
+            'absent': Count('id', filter=Q(status='absent')),
+            'late': Count('id', filter=Q(status='late')),
+            'excused': Count('id', filter=Q(status='excused')),
+        }
         
         # Calculate statistics
-        total_records = attendance_qs.count()
-        present_count = attendance_qs.filter(status='present').count()
-        absent_count = attendance_qs.filter(status='absent').count()
-        late_count = attendance_qs.filter(status='late').count()
-        excused_count = attendance_qs.filter(status='excused').count()
+        totals = attendance_qs.aggregate(
+            total=Count('id'),
+            students=Count('student', distinct=True),
+            **status_counts
+        )
+        total_records = totals['total']
+        present_count = totals['present']
+        absent_count = totals['absent']
+        late_count = totals['late']
+        excused_count = totals['excused']
         
         # Calculate percentages
         present_percentage = (present_count / total_records * 100) if total_records > 0 else 0
@@ -249,7 +426,7 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         excused_percentage = (excused_count / total_records * 100) if total_records > 0 else 0
         
         # Get unique students count
-        total_students = attendance_qs.values('student').distinct().count()
+        total_students = totals['students']
         
         # Calculate average attendance
         average_attendance = present_percentage
@@ -257,26 +434,29 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         # Daily stats for the period
         daily_stats = []
         if start_date and end_date:
-            from datetime import timedelta
             start = datetime.strptime(start_date, '%Y-%m-%d').date()
             end = datetime.strptime(end_date, '%Y-%m-%d').date()
             
+            # One GROUP BY date query; days without records are filled in below
+            rows = attendance_qs.order_by().values('date').annotate(
+                day_total=Count('id'),
+                **status_counts
+            )
+            by_date = {row['date']: row for row in rows}
+            
             current_date = start
             while current_date <= end:
-                day_attendance = attendance_qs.filter(date=current_date)
-                day_total = day_attendance.count()
-                day_present = day_attendance.filter(status='present').count()
-                day_absent = day_attendance.filter(status='absent').count()
-                day_late = day_attendance.filter(status='late').count()
-                day_excused = day_attendance.filter(status='excused').count()
+                row = by_date.get(current_date)
+                day_total = row['day_total'] if row else 0
+                day_present = row['present'] if row else 0
                 
                 daily_stats.append({
                     'date': current_date.strftime('%Y-%m-%d'),
                     'total_students': day_total,
                     'present': day_present,
-                    'absent': day_absent,
-                    'late': day_late,
-                    'excused': day_excused,
+                    'absent': row['absent'] if row else 0,
+                    'late': row['late'] if row else 0,
+                    'excused': row['excused'] if row else 0,
                     'attendance_rate': (day_present / day_total * 100) if day_total > 0 else 0
                 })
                 current_date += timedelta(days=1)
@@ -295,11 +475,10 @@ class AttendanceViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'], url_path='bulk')
     def bulk_attendance(self, request):
-        """Bulk create attendance records"""
+        """Bulk create or update attendance records for one date and subject (?async=1 queues it as a job)"""
         data = request.data
         attendance_date = data.get('date')
-        subject = data.get('subject')
-        class_period = data.get('class_period')
+        subject = data.get('subject') or None
         attendance_records = data.get('attendance_records', [])
         
         if not attendance_date or not attendance_records:
@@ -308,89 +487,28 @@ class AttendanceViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        created_records = []
-        errors = []
+        date_field = serializers.DateField()
+        try:
+            attendance_date = date_field.run_validation(attendance_date)
+        except serializers.ValidationError as e:
+            return Response({'date': e.detail}, status=status.HTTP_400_BAD_REQUEST)
         
-        for record_data in attendance_records:
-            try:
-                # Create attendance record
-                attendance_data = {
-                    'student': record_data.get('student'),
-                    'date': attendance_date,
-                    'status': record_data.get('status', 'present'),
-                    'check_in_time': record_data.get('check_in_time'),
-                    'check_out_time': record_data.get('check_out_time'),
-                    'notes': record_data.get('notes', ''),
-                    'subject': subject,
-                    'class_period': class_period,
-                }
-                
-                # Check if record already exists
-                existing = Attendance.objects.filter(
-                    student_id=attendance_data['student'],
-                    date=attendance_data['date'],
-                    subject_id=subject if subject else None
-                ).first()
-                
-                if existing:
-                    # Update existing record
-                    for key, value in attendance_data.items():
-                        if value is None:
-                            continue
-                        # Do not reassign student relation using instance; use _id or skip
-                        if key == 'student':
-                            # existing student should not change; ensure correct type if provided
-                            try:
-                                existing.student_id = value
-                            except Exception:
-                                # fallback: skip updating student if assignment fails
-                                pass
-                            continue
-                        # Handle subject foreign key via subject_id (subject code is PK)
-                        if key == 'subject':
-                            existing.subject_id = value
-                            continue
-                        setattr(existing, key, value)
-                    existing.save()
-                    serializer = AttendanceSerializer(existing)
-                    created_records.append(serializer.data)
-                else:
-                    # Create new record. Ensure we pass *_id for FKs
-                    create_payload = attendance_data.copy()
-                    create_payload['student'] = attendance_data['student']
-                    # Subject is optional; pass through when provided
-                    if 'subject' in create_payload:
-                        create_payload['subject'] = attendance_data['subject']
-                    serializer = AttendanceSerializer(data=create_payload)
-                    if serializer.is_valid():
-                        serializer.save()
-                        created_records.append(serializer.data)
-                    else:
-                        errors.append({
-                            'student': record_data.get('student'),
-                            'errors': serializer.errors
-                        })
-                        
-            except Exception as e:
-                errors.append({
-                    'student': record_data.get('student'),
-                    'error': str(e)
-                })
+        if async_requested(request):
+            return job_accepted(request, 'admission_office.bulk_attendance', {
+                'attendance_date': attendance_date,
+                'subject': subject,
+                'attendance_records': attendance_records,
+            })
         
-        response_data = {
-            'created_records': created_records,
-            'total_created': len(created_records),
-            'errors': errors,
-            'total_errors': len(errors)
-        }
+        response_data = record_bulk_attendance(attendance_date, subject, attendance_records)
         
-        if errors:
+        if response_data['errors']:
             return Response(response_data, status=status.HTTP_207_MULTI_STATUS)
         
         return Response(response_data, status=status.HTTP_201_CREATED)
 
 
-class AdmissionViewSet(viewsets.ModelViewSet):
+class AdmissionViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for Admission model"""
     
     queryset = Admission.objects.all()
@@ -448,15 +566,15 @@ class AdmissionViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Get admission statistics"""
-        from django.db.models import Count
-        
-        stats = {
-            'total_applications': Admission.objects.count(),
-            'pending_applications': Admission.objects.filter(status='pending').count(),
-            'approved_applications': Admission.objects.filter(status='approved').count(),
-            'rejected_applications': Admission.objects.filter(status='rejected').count(),
-            'by_status': list(Admission.objects.values('status').annotate(count=Count('id'))),
-            'by_level': list(Admission.objects.values('level_applying_for__level_name').annotate(count=Count('id'))),
-            'by_gender': list(Admission.objects.values('gender').annotate(count=Count('id'))),
-        }
+        stats = (
+            StatisticsBuilder(Admission.objects.all())
+            .count('total_applications')
+            .count('pending_applications', status='pending')
+            .count('approved_applications', status='approved')
+            .count('rejected_applications', status='rejected')
+            .group_by('by_status', 'status')
+            .group_by('by_level', 'level_applying_for__level_name')
+            .group_by('by_gender', 'gender')
+            .build()
+        )
         return Response(stats)
\ No newline at end of file
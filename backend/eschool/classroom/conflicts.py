@@ -0,0 +1,220 @@
+"""
+Room conflict detection for schedules and bookings.
+
+A room is taken by two kinds of rows: recurring ``ClassSchedule`` slots,
+which repeat every ``day_of_week`` of an ``academic_year``, and one-off
+``ClassBooking`` rows on a ``booking_date``. ``room_conflicts`` checks one
+proposed interval against both with a single range-overlap query (the
+two tables ``UNION``-ed), which the ``(class_room, day_of_week,
+start_time)`` prefix of the schedule unique key and the
+``class_bookings_room_date_idx`` index answer without scanning the day.
+
+``check_timetable`` validates a whole week of proposed schedule slots in
+one call: the existing schedules and the week's bookings of every room,
+teacher and section involved are read with one query each, and the
+overlaps are found in memory by sorting each room/day (and teacher/day,
+section/day) by start time.
+
+Two intervals overlap when each starts before the other ends, so a class
+ending at 10:00 and one starting at 10:00 do not conflict. Cancelled and
+completed bookings and inactive schedules never block a room, and
+bookings are only checked against the schedules of the current academic
+year (``current_academic_year``), since earlier years' schedules stay
+active.
+"""
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import CharField, Q, Value
+from django.utils import timezone
+
+from .models import ClassBooking, ClassSchedule
+
+
+DAYS = [day for day, label in ClassSchedule.DAYS_OF_WEEK]
+
+# Bookings that still hold their room
+BLOCKING_STATUSES = ['pending', 'confirmed']
+
+
+def current_academic_year():
+    """``CURRENT_ACADEMIC_YEAR``, else the latest academic year with active schedules"""
+    if settings.CURRENT_ACADEMIC_YEAR:
+        return settings.CURRENT_ACADEMIC_YEAR
+    return ClassSchedule.objects.filter(is_active=True).order_by('-academic_year').values_list(
+        'academic_year', flat=True
+    ).first()
+
+
+def day_of_week(date):
+    """Return the ``ClassSchedule.day_of_week`` value of ``date``"""
+    return DAYS[date.weekday()]
+
+
+def _week_day(day):
+    """Django's ``__week_day`` number (Sunday=1) of a ``day_of_week`` value"""
+    return (DAYS.index(day) + 1) % 7 + 1
+
+
+def _conflict(kind, pk, start_time, end_time, **extra):
+    return {'type': kind, 'id': pk, 'start_time': start_time, 'end_time': end_time, **extra}
+
+
+def room_conflicts(room, start_time, end_time, date=None, day=None, academic_year=None,
+                   exclude_schedule=None, exclude_booking=None):
+    """
+    Return the schedules and bookings of ``room`` overlapping ``start_time``-``end_time``.
+
+    Pass ``date`` for a one-off booking, or ``day`` (a ``day_of_week``
+    value) for a recurring slot; ``academic_year`` restricts the schedules
+    checked. A recurring slot is checked against the bookings from today
+    on that fall on the same weekday. ``exclude_schedule`` and
+    ``exclude_booking`` leave out the row being edited. Runs one query.
+    """
+    if date is None and day is None:
+        raise ValueError('Either date or day is required')
+    room_id = getattr(room, 'pk', room)
+    overlap = Q(class_room_id=room_id, start_time__lt=end_time, end_time__gt=start_time)
+
+    schedules = ClassSchedule.objects.filter(overlap, day_of_week=day or day_of_week(date), is_active=True)
+    if academic_year:
+        schedules = schedules.filter(academic_year=academic_year)
+    if exclude_schedule is not None:
+        schedules = schedules.exclude(pk=exclude_schedule)
+
+    bookings = ClassBooking.objects.filter(overlap, status__in=BLOCKING_STATUSES)
+    if date is not None:
+        bookings = bookings.filter(booking_date=date)
+    else:
+        bookings = bookings.filter(
+            booking_date__gte=timezone.now().date(), booking_date__week_day=_week_day(day)
+        )
+    if exclude_booking is not None:
+        bookings = bookings.exclude(pk=exclude_booking)
+
+    columns = ('kind', 'pk', 'start_time', 'end_time')
+    rows = schedules.order_by().annotate(
+        kind=Value('schedule', output_field=CharField())
+    ).values_list(*columns).union(
+        bookings.order_by().annotate(kind=Value('booking', output_field=CharField())).values_list(*columns)
+    )
+    return sorted(
+        (_conflict(kind, pk, start, end) for kind, pk, start, end in rows),
+        key=lambda conflict: (conflict['start_time'], conflict['type'], conflict['id'])
+    )
+
+
+def _overlapping(intervals):
+    """Yield the overlapping pairs among ``(start, end, item)`` intervals of one resource/day"""
+    intervals = sorted(intervals, key=lambda interval: (interval[0], interval[1]))
+    active = []
+    for start, end, item in intervals:
+        # Everything that ended by this start can no longer overlap anything later
+        active = [interval for interval in active if interval[1] > start]
+        for other in active:
+            yield other[2], item
+        active.append((start, end, item))
+
+
+def _slot_value(slot, name):
+    value = slot.get(name)
+    return getattr(value, 'pk', value)
+
+
+def check_timetable(slots, academic_year, week_of=None):
+    """
+    Validate a week of proposed ``ClassSchedule`` slots in one call.
+
+    ``slots`` are dicts with ``class_room``, ``day_of_week``,
+    ``start_time`` and ``end_time``, and optionally ``teacher`` and
+    ``section``. A slot conflicts with another proposed slot or an active
+    schedule of ``academic_year`` that shares its room, teacher or section
+    at an overlapping time on the same day, and with a booking of its room
+    in the week starting ``week_of`` (default: the current week).
+    Slots that update an existing schedule may carry its ``id``, which is
+    then not counted against them.
+
+    Returns one entry per slot that has conflicts, with the slot's index.
+    """
+    week_of = week_of or timezone.now().date()
+    week_start = week_of - datetime.timedelta(days=week_of.weekday())
+    week = [week_start + datetime.timedelta(days=offset) for offset in range(7)]
+
+    proposed = []
+    for index, slot in enumerate(slots):
+        proposed.append({
+            'index': index,
+            'id': _slot_value(slot, 'id'),
+            'class_room': _slot_value(slot, 'class_room'),
+            'teacher': _slot_value(slot, 'teacher'),
+            'section': _slot_value(slot, 'section'),
+            'day_of_week': slot['day_of_week'],
+            'start_time': slot['start_time'],
+            'end_time': slot['end_time'],
+        })
+    if not proposed:
+        return []
+
+    resources = {
+        name: {slot[name] for slot in proposed if slot[name] is not None}
+        for name in ('class_room', 'teacher', 'section')
+    }
+    days = {slot['day_of_week'] for slot in proposed}
+    replaced = {slot['id'] for slot in proposed if slot['id'] is not None}
+
+    clash = Q(class_room_id__in=resources['class_room'])
+    if resources['teacher']:
+        clash |= Q(teacher_id__in=resources['teacher'])
+    if resources['section']:
+        clash |= Q(section_id__in=resources['section'])
+    existing = ClassSchedule.objects.filter(
+        clash, academic_year=academic_year, day_of_week__in=days, is_active=True
+    ).exclude(pk__in=replaced).order_by().values(
+        'pk', 'class_room_id', 'teacher_id', 'section_id', 'day_of_week', 'start_time', 'end_time'
+    )
+    bookings = ClassBooking.objects.filter(
+        class_room_id__in=resources['class_room'], booking_date__range=(week[0], week[-1]),
+        status__in=BLOCKING_STATUSES,
+    ).order_by().values('pk', 'class_room_id', 'booking_date', 'start_time', 'end_time')
+
+    # (resource, id, day) -> intervals; proposed slots carry their index, existing rows a conflict dict
+    timelines = defaultdict(list)
+    for slot in proposed:
+        for name in ('class_room', 'teacher', 'section'):
+            if slot[name] is not None:
+                timelines[(name, slot[name], slot['day_of_week'])].append(
+                    (slot['start_time'], slot['end_time'], slot['index'])
+                )
+    for row in existing:
+        conflict = _conflict(
+            'schedule', row['pk'], row['start_time'], row['end_time'], day_of_week=row['day_of_week']
+        )
+        for name in ('class_room', 'teacher', 'section'):
+            key = (name, row[f'{name}_id'], row['day_of_week'])
+            if key in timelines:
+                timelines[key].append((row['start_time'], row['end_time'], dict(conflict, resource=name)))
+    for row in bookings:
+        key = ('class_room', row['class_room_id'], day_of_week(row['booking_date']))
+        if key in timelines:
+            conflict = _conflict(
+                'booking', row['pk'], row['start_time'], row['end_time'],
+                booking_date=row['booking_date'], resource='class_room',
+            )
+            timelines[key].append((row['start_time'], row['end_time'], conflict))
+
+    found = defaultdict(list)
+    for (name, resource_id, day), intervals in timelines.items():
+        for first, second in _overlapping(intervals):
+            if isinstance(first, int):
+                found[first].append(
+                    second if isinstance(second, dict) else {'type': 'slot', 'index': second, 'resource': name}
+                )
+            if isinstance(second, int):
+                found[second].append(
+                    first if isinstance(first, dict) else {'type': 'slot', 'index': first, 'resource': name}
+                )
+    return [
+        {'index': index, 'slot': slots[index], 'conflicts': found[index]}
+        for index in sorted(found)
+    ]
@@ -0,0 +1,20 @@
+import datetime
+
+from jobs.queue import register
+
+from . import schedules
+from .timetable import generate_timetable
+
+
+@register('classroom.timetable')
+def timetable(academic_year, day_start=None, **options):
+    """Generate the weekly schedules of an academic year; the result is the solver report"""
+    if day_start:
+        options['day_start'] = datetime.time.fromisoformat(day_start)
+    return generate_timetable(academic_year, **options)
+
+
+@register('classroom.warm_schedules')
+def warm_schedules():
+    """Precompute every teacher's and student's timetable for today"""
+    return schedules.warm_schedules()
@@ -0,0 +1,75 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from classroom.models import ClassSchedule
+from classroom.timetable import DEFAULT_DAYS, generate_timetable
+
+
+class Command(BaseCommand):
+    help = 'Generate the weekly class schedules of an academic year with no teacher, room or section clashes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('academic_year', help='Academic year to schedule, e.g. 2025')
+        scope = parser.add_mutually_exclusive_group()
+        scope.add_argument('--level', type=int, help='Only schedule the sections of this level')
+        scope.add_argument('--section', type=int, action='append', dest='sections',
+                           help='Only schedule this section (repeatable)')
+        parser.add_argument('--days', default=','.join(DEFAULT_DAYS),
+                            help='Comma-separated teaching days')
+        parser.add_argument('--day-start', default='08:00', help='Start of the first period (HH:MM)')
+        parser.add_argument('--period-minutes', type=int, default=45, help='Length of a period')
+        parser.add_argument('--periods-per-day', type=int, default=8, help='Periods per day')
+        parser.add_argument('--break-minutes', type=int, default=0, help='Gap between two periods')
+        parser.add_argument('--replace', action='store_true',
+                            help='Regenerate sections that already have schedules in the year')
+        parser.add_argument('--dry-run', action='store_true', help='Report without writing schedules')
+        parser.add_argument('--time-limit', type=float, default=20, help='Seconds the search may take')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the local search')
+
+    def handle(self, *args, **options):
+        days = [day.strip().lower() for day in options['days'].split(',') if day.strip()]
+        valid_days = [day for day, label in ClassSchedule.DAYS_OF_WEEK]
+        if not days or any(day not in valid_days for day in days):
+            raise CommandError(f"--days must be a comma-separated list of {', '.join(valid_days)}")
+        try:
+            day_start = datetime.time.fromisoformat(options['day_start'])
+        except ValueError:
+            raise CommandError('--day-start must be HH:MM')
+        if options['period_minutes'] < 1 or options['periods_per_day'] < 1 or options['break_minutes'] < 0:
+            raise CommandError('--period-minutes and --periods-per-day must be positive')
+
+        try:
+            report = generate_timetable(
+                options['academic_year'],
+                level=options['level'],
+                sections=options['sections'],
+                days=days,
+                day_start=day_start,
+                period_minutes=options['period_minutes'],
+                periods_per_day=options['periods_per_day'],
+                break_minutes=options['break_minutes'],
+                replace=options['replace'],
+                dry_run=options['dry_run'],
+                time_limit=options['time_limit'],
+                seed=options['seed'],
+            )
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        for section_id in report['skipped_sections']:
+            self.stdout.write(self.style.WARNING(f'Skipped section {section_id}: already scheduled (use --replace)'))
+        for warning in report['warnings']:
+            self.stdout.write(self.style.WARNING(warning))
+        for entry in report['unplaced']:
+            self.stdout.write(self.style.ERROR(
+                f"Section {entry['section']}, subject {entry['subject']}: "
+                f"{entry['missing']} period(s) not placed ({entry['reason']})"
+            ))
+        action = 'Would create' if report['dry_run'] else 'Created'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{action} {report['placed']} of {report['lessons']} weekly periods for "
+                f"{report['sections']} sections in {report['elapsed']:.2f}s"
+            )
+        )
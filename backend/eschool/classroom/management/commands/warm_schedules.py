@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from classroom.schedules import warm_schedules
+
+
+class Command(BaseCommand):
+    help = "Precompute today's timetable of every teacher and student, e.g. from a cron job before school starts"
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        warmed = warm_schedules()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Cached the {warmed['date']} timetables of {warmed['teachers']} teachers and "
+                f"{warmed['students']} students in {time.perf_counter() - started:.2f}s"
+            )
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classroom', '0003_initial'),
+        ('employee', '0005_salary_overdue_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='classbooking',
+            index=models.Index(fields=['class_room', 'booking_date', 'start_time'], name='class_bookings_room_date_idx'),
+        ),
+    ]
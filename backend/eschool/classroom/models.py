@@ -227,6 +227,10 @@ class ClassBooking(models.Model):
         ordering = ['-booking_date', 'start_time']
         verbose_name = 'Class Booking'
         verbose_name_plural = 'Class Bookings'
+        indexes = [
+            # Range-overlap conflict checks of a room on a date (see classroom.conflicts)
+            models.Index(fields=['class_room', 'booking_date', 'start_time'], name='class_bookings_room_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.class_room} - {self.booking_date} {self.start_time}-{self.end_time}"
@@ -234,5 +238,13 @@ class ClassBooking(models.Model):
     def clean(self):
         """Validate booking data"""
         from django.core.exceptions import ValidationError
+        from .conflicts import BLOCKING_STATUSES, current_academic_year, room_conflicts
         if self.start_time >= self.end_time:
-            raise ValidationError("End time must be after start time.")
\ No newline at end of file
+            raise ValidationError("End time must be after start time.")
+        if self.class_room_id and self.booking_date and self.status in BLOCKING_STATUSES:
+            conflicts = room_conflicts(
+                self.class_room_id, self.start_time, self.end_time, date=self.booking_date,
+                academic_year=current_academic_year(), exclude_booking=self.pk,
+            )
+            if conflicts:
+                raise ValidationError("The room is already taken at this time.")
\ No newline at end of file
@@ -0,0 +1,174 @@
+"""
+Free-room search over a time window.
+
+``free_rooms_queryset`` answers a search in the database: the rooms
+matching the filters, anti-joined (``NOT EXISTS``) with the active
+schedules of the date's weekday and the bookings of the date that overlap
+the window. It is a single query.
+
+``free_rooms`` answers the same search from an in-process occupancy map so
+that the repeated searches of staff planning make-up classes do not go
+back to the database. For each date it keeps, per room, a bitmap of the
+5-minute slots the room is busy in plus the exact busy intervals. A room
+whose bitmap does not intersect the window's is free; one whose bitmap
+does is checked against its intervals, so times that are not multiples of
+5 minutes give the same answer as the database. A day is loaded with one
+query and kept until ``ClassSchedule``, ``ClassBooking`` or ``Class`` rows
+change (tracked through the versions of ``eschool.cache``), and for at
+most ``ROOM_OCCUPANCY_CACHE_TIMEOUT`` seconds; the room list itself is
+kept the same way. With a shared cache (Redis) every process sees a
+change at once. With the default per-process LocMem cache a change made
+by another process is only seen once the entry has expired, so the
+timeout bounds how stale an answer can be.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+
+from eschool.cache import model_versions
+
+from .conflicts import BLOCKING_STATUSES, day_of_week
+from .models import Class, ClassBooking, ClassSchedule
+
+
+SLOT_MINUTES = 5
+
+_lock = threading.Lock()
+_days = OrderedDict()
+_rooms = {}
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute + value.second / 60
+
+
+def slot_mask(start_time, end_time):
+    """Bitmap of the 5-minute slots ``start_time``-``end_time`` touches"""
+    first = int(_minutes(start_time) // SLOT_MINUTES)
+    last = -int(-_minutes(end_time) // SLOT_MINUTES)
+    return ((1 << (last - first)) - 1) << first
+
+
+def _room_filters(capacity=None, room_type=None, has_projector=None):
+    filters = {'is_available': True}
+    if capacity is not None:
+        filters['capacity__gte'] = capacity
+    if room_type:
+        filters['room_type'] = room_type
+    if has_projector is not None:
+        filters['has_projector'] = has_projector
+    return filters
+
+
+def _busy_schedules(date, academic_year=None):
+    schedules = ClassSchedule.objects.filter(day_of_week=day_of_week(date), is_active=True)
+    if academic_year:
+        schedules = schedules.filter(academic_year=academic_year)
+    return schedules
+
+
+def _busy_bookings(date):
+    return ClassBooking.objects.filter(booking_date=date, status__in=BLOCKING_STATUSES)
+
+
+def free_rooms_queryset(date, start_time, end_time, capacity=None, room_type=None,
+                        has_projector=None, academic_year=None):
+    """Rooms matching the filters with no schedule or booking overlapping the window, in one query"""
+    overlap = {'class_room': OuterRef('pk'), 'start_time__lt': end_time, 'end_time__gt': start_time}
+    return Class.objects.filter(**_room_filters(capacity, room_type, has_projector)).exclude(
+        Exists(_busy_schedules(date, academic_year).filter(**overlap))
+    ).exclude(
+        Exists(_busy_bookings(date).filter(**overlap))
+    )
+
+
+def _load_day(date, academic_year):
+    """Map room id to (bitmap, intervals) for ``date``, read with one query"""
+    columns = ('class_room_id', 'start_time', 'end_time')
+    rows = _busy_schedules(date, academic_year).order_by().values_list(*columns).union(
+        _busy_bookings(date).order_by().values_list(*columns), all=True
+    )
+    occupancy = {}
+    for room_id, start_time, end_time in rows:
+        mask, intervals = occupancy.get(room_id, (0, []))
+        intervals.append((start_time, end_time))
+        occupancy[room_id] = (mask | slot_mask(start_time, end_time), intervals)
+    return occupancy
+
+
+def _fresh(versions, loaded_at, current):
+    return versions == current and time.monotonic() - loaded_at < settings.ROOM_OCCUPANCY_CACHE_TIMEOUT
+
+
+def day_occupancy(date, academic_year=None):
+    """
+    Return the occupancy map of ``date`` and whether it came from the cache.
+
+    Entries are dropped when the schedules or bookings change or they are
+    ``ROOM_OCCUPANCY_CACHE_TIMEOUT`` seconds old; at most
+    ``ROOM_OCCUPANCY_CACHE_DAYS`` dates are kept, least recently used first out.
+    """
+    versions = model_versions(ClassSchedule, ClassBooking)
+    key = (date, academic_year or None)
+    with _lock:
+        entry = _days.get(key)
+        if entry is not None and _fresh(entry[0], entry[1], versions):
+            _days.move_to_end(key)
+            return entry[2], True
+
+    loaded_at = time.monotonic()
+    occupancy = _load_day(date, academic_year)
+    with _lock:
+        _days[key] = (versions, loaded_at, occupancy)
+        _days.move_to_end(key)
+        while len(_days) > settings.ROOM_OCCUPANCY_CACHE_DAYS:
+            _days.popitem(last=False)
+    return occupancy, False
+
+
+def _all_rooms():
+    versions = model_versions(Class)
+    with _lock:
+        if _rooms and _fresh(_rooms['versions'], _rooms['loaded_at'], versions):
+            return _rooms['rooms']
+    loaded_at = time.monotonic()
+    rooms = list(Class.objects.order_by('floor', 'room_no'))
+    with _lock:
+        _rooms.update(versions=versions, loaded_at=loaded_at, rooms=rooms)
+    return rooms
+
+
+def clear():
+    """Forget every cached day and the room list"""
+    with _lock:
+        _days.clear()
+        _rooms.clear()
+
+
+def free_rooms(date, start_time, end_time, capacity=None, room_type=None,
+               has_projector=None, academic_year=None):
+    """
+    Return the free rooms matching the filters and whether the day was cached.
+
+    Gives the same rooms as ``free_rooms_queryset``; a repeated search of a
+    cached day runs no queries.
+    """
+    occupancy, cached = day_occupancy(date, academic_year)
+    window = slot_mask(start_time, end_time)
+
+    rooms = []
+    for room in _all_rooms():
+        if not room.is_available or (capacity is not None and room.capacity < capacity):
+            continue
+        if (room_type and room.room_type != room_type) or (
+            has_projector is not None and room.has_projector != has_projector
+        ):
+            continue
+        mask, intervals = occupancy.get(room.pk, (0, ()))
+        if mask & window and any(start < end_time and end > start_time for start, end in intervals):
+            continue
+        rooms.append(room)
+    return rooms, cached
@@ -0,0 +1,198 @@
+"""
+Precomputed weekly timetables for teachers and students.
+
+``user_schedule`` returns the timetable of whoever is signed in: a
+teacher (an employee with a ``Teacher`` profile) gets the classes they
+teach and their room bookings of the coming week, and a student (matched
+on the account's email) gets the classes of their section plus the
+level-wide classes of their level. Only the schedules of the current
+academic year (``classroom.conflicts.current_academic_year``) are shown,
+since earlier years' schedules stay active.
+
+Each user's timetable is stored in Django's cache together with the
+versions of the models it was built from (``eschool.cache.versioned_get``),
+so serving it is a single cache lookup and any saved or deleted
+``ClassSchedule`` makes it stale. Students' timetables do not depend on
+``ClassBooking`` or ``Teacher`` rows, so the bookings made through the
+day only make the teachers' timetables stale. Stale and missing
+timetables are rebuilt on request with a few queries; ``warm_schedules``
+(``manage.py warm_schedules`` or the ``classroom.warm_schedules`` job)
+builds every teacher's and student's ahead of the morning rush with a
+fixed number of queries.
+"""
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.utils import timezone
+
+from eschool.cache import KEY_PREFIX, labelled_versions, versioned_get, versioned_set, versioned_set_many
+from employee.models import Employee
+from level.models import Level, Section
+from student.models import Student
+from subject.models import Subject
+from teacher.models import Teacher
+
+from .conflicts import BLOCKING_STATUSES, DAYS, current_academic_year
+from .models import Class, ClassBooking, ClassSchedule
+from .serializers import ClassBookingSerializer, ClassScheduleSerializer
+
+
+# What each kind of timetable shows; any change to these rebuilds it. The
+# employees are the teachers, whose names every timetable shows.
+TEACHER_SOURCES = (ClassSchedule, ClassBooking, Teacher, Employee, Section, Level, Subject, Class)
+STUDENT_SOURCES = (ClassSchedule, Student, Employee, Section, Level, Subject, Class)
+SOURCES = tuple(dict.fromkeys(TEACHER_SOURCES + STUDENT_SOURCES))
+ROLE_SOURCES = {'teacher': TEACHER_SOURCES, 'student': STUDENT_SOURCES}
+
+BOOKING_DAYS = 7
+
+# Timetables written to the cache per round trip by warm_schedules
+WARM_BATCH_SIZE = 500
+
+
+def _key(user_id, today):
+    return f'{KEY_PREFIX}:schedule:{user_id}:{today.isoformat()}'
+
+
+def _schedules(academic_year):
+    return ClassSchedule.objects.filter(is_active=True, academic_year=academic_year).select_related(
+        'class_room', 'subject', 'teacher__teacher_id', 'level', 'section'
+    ).order_by('start_time', 'pk')
+
+
+def _bookings(today):
+    return ClassBooking.objects.filter(
+        booking_date__range=(today, today + datetime.timedelta(days=BOOKING_DAYS - 1)),
+        status__in=BLOCKING_STATUSES,
+    ).select_related('class_room', 'booked_by').order_by('booking_date', 'start_time', 'pk')
+
+
+def _week(schedules):
+    week = {day: [] for day in DAYS}
+    for entry in ClassScheduleSerializer(schedules, many=True).data:
+        week[entry['day_of_week']].append(entry)
+    return week
+
+
+def _timetable(role, owner, week, bookings=()):
+    return {
+        'role': role,
+        **owner,
+        'week': week,
+        'bookings': ClassBookingSerializer(bookings, many=True).data,
+    }
+
+
+def _student_owner(student):
+    return {'student': str(student['pk']), 'section': student['section_id'], 'level': student['level_id']}
+
+
+def _teacher_timetable(teacher_id, today, academic_year):
+    # A teacher's key is their employee's, who makes the bookings
+    return _timetable(
+        'teacher', {'teacher': str(teacher_id)},
+        _week(_schedules(academic_year).filter(teacher_id=teacher_id)),
+        _bookings(today).filter(booked_by_id=teacher_id),
+    )
+
+
+def _student_timetable(student, academic_year):
+    # The section's classes and the classes given to the whole level
+    classes = Q(pk__in=[])
+    if student['section_id'] is not None:
+        classes |= Q(section_id=student['section_id'])
+    if student['level_id'] is not None:
+        classes |= Q(section__isnull=True, level_id=student['level_id'])
+    return _timetable('student', _student_owner(student), _week(_schedules(academic_year).filter(classes)))
+
+
+def build_schedule(user, today=None):
+    """Build the timetable of ``user`` from the database, or None if they are no teacher or student"""
+    today = today or timezone.now().date()
+    teacher = Teacher.objects.filter(teacher_id__user=user).values_list('pk', flat=True).first()
+    if teacher is not None:
+        return _teacher_timetable(teacher, today, current_academic_year())
+    student = Student.objects.filter(email__iexact=user.email).values('pk', 'section_id', 'level_id').first()
+    if student is not None:
+        return _student_timetable(student, current_academic_year())
+    return None
+
+
+def user_schedule(user, today=None):
+    """
+    Return ``(timetable, cached)`` for ``user``.
+
+    The timetable is None when the user is neither a teacher nor a student.
+    """
+    today = today or timezone.now().date()
+    key = _key(user.pk, today)
+    timetable, versions = versioned_get(key, *SOURCES)
+    if timetable is not None:
+        return timetable, True
+    timetable = build_schedule(user, today)
+    if timetable is not None:
+        versioned_set(
+            key, timetable, versions, settings.SCHEDULE_CACHE_TIMEOUT, models=ROLE_SOURCES[timetable['role']]
+        )
+    return timetable, False
+
+
+def warm_schedules(today=None):
+    """Build and cache the timetable of every teacher and student with an account"""
+    today = today or timezone.now().date()
+    versions = labelled_versions(*SOURCES)
+
+    by_teacher, by_section, by_level = defaultdict(list), defaultdict(list), defaultdict(list)
+    for schedule in _schedules(current_academic_year()):
+        by_teacher[schedule.teacher_id].append(schedule)
+        if schedule.section_id is None:
+            by_level[schedule.level_id].append(schedule)
+        else:
+            by_section[schedule.section_id].append(schedule)
+    bookings = defaultdict(list)
+    for booking in _bookings(today):
+        bookings[booking.booked_by_id].append(booking)
+
+    entries = {}
+    teachers = Teacher.objects.filter(teacher_id__user__isnull=False).values_list('pk', 'teacher_id__user_id')
+    teacher_users = set()
+    for teacher_id, user_id in teachers:
+        teacher_users.add(user_id)
+        entries[_key(user_id, today)] = _timetable(
+            'teacher', {'teacher': str(teacher_id)}, _week(by_teacher[teacher_id]), bookings[teacher_id]
+        )
+        if len(entries) >= WARM_BATCH_SIZE:
+            versioned_set_many(entries, versions, settings.SCHEDULE_CACHE_TIMEOUT, models=TEACHER_SOURCES)
+            entries = {}
+    versioned_set_many(entries, versions, settings.SCHEDULE_CACHE_TIMEOUT, models=TEACHER_SOURCES)
+
+    entries = {}
+    users = dict(
+        (email.lower(), pk) for pk, email in get_user_model().objects.exclude(
+            pk__in=teacher_users
+        ).values_list('pk', 'email')
+    )
+    students = 0
+    # Students of one section share their week
+    weeks = {}
+    for student in Student.objects.values('pk', 'email', 'section_id', 'level_id').iterator():
+        user_id = users.get(student['email'].lower())
+        if user_id is None:
+            continue
+        students += 1
+        group = (student['section_id'], student['level_id'])
+        if group not in weeks:
+            weeks[group] = _week(sorted(
+                by_section[group[0]] + by_level[group[1]],
+                key=lambda schedule: (schedule.start_time, schedule.pk)
+            ))
+        entries[_key(user_id, today)] = _timetable('student', _student_owner(student), weeks[group])
+        if len(entries) >= WARM_BATCH_SIZE:
+            versioned_set_many(entries, versions, settings.SCHEDULE_CACHE_TIMEOUT, models=STUDENT_SOURCES)
+            entries = {}
+
+    versioned_set_many(entries, versions, settings.SCHEDULE_CACHE_TIMEOUT, models=STUDENT_SOURCES)
+    return {'teachers': len(teacher_users), 'students': students, 'date': today.isoformat()}
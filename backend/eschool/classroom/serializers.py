@@ -1,7 +1,15 @@
 from rest_framework import serializers
+from .conflicts import BLOCKING_STATUSES, current_academic_year, room_conflicts
 from .models import Class, ClassSchedule, ClassBooking
 
 
+def _current(serializer, data, name):
+    """Value of ``name`` after the save: the submitted one, else the instance's"""
+    if name in data:
+        return data[name]
+    return getattr(serializer.instance, name, None)
+
+
 class ClassSerializer(serializers.ModelSerializer):
     """Serializer for Class/Room model"""
     
@@ -50,6 +58,19 @@ class ClassScheduleSerializer(serializers.ModelSerializer):
         if data.get('start_time') and data.get('end_time'):
             if data['start_time'] >= data['end_time']:
                 raise serializers.ValidationError("End time must be after start time.")
+        room = _current(self, data, 'class_room')
+        if room and _current(self, data, 'is_active') is not False:
+            conflicts = room_conflicts(
+                room, _current(self, data, 'start_time'), _current(self, data, 'end_time'),
+                day=_current(self, data, 'day_of_week'),
+                academic_year=_current(self, data, 'academic_year'),
+                exclude_schedule=getattr(self.instance, 'pk', None),
+            )
+            if conflicts:
+                raise serializers.ValidationError({
+                    'class_room': "The room is already taken at this time.",
+                    'conflicts': conflicts,
+                })
         return data
 
 
@@ -73,6 +94,18 @@ class ClassBookingSerializer(serializers.ModelSerializer):
         if data.get('start_time') and data.get('end_time'):
             if data['start_time'] >= data['end_time']:
                 raise serializers.ValidationError("End time must be after start time.")
+        room = _current(self, data, 'class_room')
+        if room and (_current(self, data, 'status') or 'pending') in BLOCKING_STATUSES:
+            conflicts = room_conflicts(
+                room, _current(self, data, 'start_time'), _current(self, data, 'end_time'),
+                date=_current(self, data, 'booking_date'), academic_year=current_academic_year(),
+                exclude_booking=getattr(self.instance, 'pk', None),
+            )
+            if conflicts:
+                raise serializers.ValidationError({
+                    'class_room': "The room is already taken at this time.",
+                    'conflicts': conflicts,
+                })
         return data
 
 
@@ -97,3 +130,83 @@ class ClassListSerializer(serializers.ModelSerializer):
             'id', 'floor', 'room_no', 'room_name', 'room_type', 'capacity',
             'is_available', 'full_room_identifier'
         ]
+
+
+class RoomConflictQuerySerializer(serializers.Serializer):
+    """Query parameters of a room conflict check"""
+    
+    start = serializers.TimeField()
+    end = serializers.TimeField()
+    date = serializers.DateField(required=False)
+    day_of_week = serializers.ChoiceField(choices=ClassSchedule.DAYS_OF_WEEK, required=False)
+    academic_year = serializers.CharField(max_length=10, required=False)
+    
+    def validate(self, data):
+        """Require a date or a weekday and a non-empty interval"""
+        if data['start'] >= data['end']:
+            raise serializers.ValidationError("End time must be after start time.")
+        if ('date' in data) == ('day_of_week' in data):
+            raise serializers.ValidationError("Pass either date or day_of_week.")
+        return data
+
+
+class TimetableSlotSerializer(serializers.Serializer):
+    """One proposed weekly slot of a timetable check"""
+    
+    id = serializers.IntegerField(required=False, help_text="Schedule this slot replaces")
+    class_room = serializers.IntegerField()
+    day_of_week = serializers.ChoiceField(choices=ClassSchedule.DAYS_OF_WEEK)
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+    teacher = serializers.UUIDField(required=False, allow_null=True)
+    section = serializers.IntegerField(required=False, allow_null=True)
+    
+    def validate(self, data):
+        """Validate slot times"""
+        if data['start_time'] >= data['end_time']:
+            raise serializers.ValidationError("End time must be after start time.")
+        return data
+
+
+class TimetableCheckSerializer(serializers.Serializer):
+    """A week of proposed slots to validate in one call"""
+    
+    academic_year = serializers.CharField(max_length=10)
+    week_of = serializers.DateField(required=False)
+    slots = TimetableSlotSerializer(many=True)
+
+
+class FreeRoomQuerySerializer(serializers.Serializer):
+    """Query parameters of the free-room search"""
+    
+    date = serializers.DateField()
+    start = serializers.TimeField()
+    end = serializers.TimeField()
+    capacity = serializers.IntegerField(min_value=1, required=False)
+    room_type = serializers.ChoiceField(choices=Class.ROOM_TYPES, required=False)
+    has_projector = serializers.BooleanField(required=False, allow_null=True, default=None)
+    academic_year = serializers.CharField(max_length=10, required=False)
+    fresh = serializers.BooleanField(required=False, default=False)
+    
+    def validate(self, data):
+        """Validate the time window"""
+        if data['start'] >= data['end']:
+            raise serializers.ValidationError("End time must be after start time.")
+        return data
+
+
+class TimetableGenerateSerializer(serializers.Serializer):
+    """Options of a timetable generation run"""
+    
+    academic_year = serializers.CharField(max_length=10)
+    level = serializers.IntegerField(required=False)
+    sections = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    days = serializers.ListField(
+        child=serializers.ChoiceField(choices=ClassSchedule.DAYS_OF_WEEK), required=False, allow_empty=False
+    )
+    day_start = serializers.TimeField(required=False)
+    period_minutes = serializers.IntegerField(min_value=1, max_value=240, required=False)
+    periods_per_day = serializers.IntegerField(min_value=1, max_value=16, required=False)
+    break_minutes = serializers.IntegerField(min_value=0, max_value=120, required=False)
+    replace = serializers.BooleanField(required=False)
+    dry_run = serializers.BooleanField(required=False)
@@ -1,3 +1,437 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from eschool.testing import SchoolQueryBudgetTestCase
+
+
+class ClassroomListQueryTests(SchoolQueryBudgetTestCase):
+    """List and detail endpoints load related rows up-front"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from classroom.models import ClassSchedule, ClassBooking
+
+        for i, room in enumerate(cls.rooms):
+            ClassSchedule.objects.create(
+                class_room=room, day_of_week='monday', start_time=datetime.time(9),
+                end_time=datetime.time(10), subject=cls.subjects[i], teacher=cls.teachers[i],
+                level=cls.level, section=cls.sections[i], academic_year='2025',
+            )
+            ClassBooking.objects.create(
+                class_room=room, booked_by=cls.employees[i], booking_date=datetime.date(2025, 6, 2),
+                start_time=datetime.time(9), end_time=datetime.time(10), purpose='Seminar',
+            )
+
+    def test_class_schedule_list_query_budget(self):
+        self.assertQueryBudget('/api/class-schedules/', 2)
+
+    def test_class_booking_list_query_budget(self):
+        self.assertQueryBudget('/api/class-bookings/', 2)
+
+
+class RoomConflictTests(SchoolQueryBudgetTestCase):
+    """Overlaps with schedules and bookings are found with one query per check"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from classroom.models import ClassSchedule, ClassBooking
+
+        cls.schedule = ClassSchedule.objects.create(
+            class_room=cls.rooms[0], day_of_week='monday', start_time=datetime.time(9),
+            end_time=datetime.time(10), subject=cls.subjects[0], teacher=cls.teachers[0],
+            level=cls.level, section=cls.sections[0], academic_year='2025',
+        )
+        # 2025-06-03 is a Tuesday
+        cls.booking = ClassBooking.objects.create(
+            class_room=cls.rooms[0], booked_by=cls.employees[0], booking_date=datetime.date(2025, 6, 3),
+            start_time=datetime.time(13), end_time=datetime.time(14), purpose='Seminar', status='confirmed',
+        )
+
+    def test_room_conflicts(self):
+        from classroom.conflicts import room_conflicts
+
+        monday, tuesday = datetime.date(2025, 6, 2), datetime.date(2025, 6, 3)
+        with self.assertNumQueries(1):
+            conflicts = room_conflicts(self.rooms[0], datetime.time(9, 30), datetime.time(11), date=monday)
+        self.assertEqual([(c['type'], c['id']) for c in conflicts], [('schedule', self.schedule.pk)])
+        # Touching intervals do not overlap
+        self.assertEqual(room_conflicts(self.rooms[0], datetime.time(10), datetime.time(11), date=monday), [])
+        conflicts = room_conflicts(self.rooms[0], datetime.time(12), datetime.time(13, 30), date=tuesday)
+        self.assertEqual([(c['type'], c['id']) for c in conflicts], [('booking', self.booking.pk)])
+        self.assertEqual(room_conflicts(self.rooms[1], datetime.time(9), datetime.time(10), date=monday), [])
+        self.assertEqual(
+            room_conflicts(self.rooms[0], datetime.time(9), datetime.time(10), day='monday',
+                           academic_year='2025', exclude_schedule=self.schedule.pk),
+            []
+        )
+
+    def test_overlapping_booking_is_rejected(self):
+        response = self.client.post(f'/api/classes/{self.rooms[0].pk}/book/', {
+            'booked_by': self.employees[1].pk, 'booking_date': '2025-06-02',
+            'start_time': '08:30', 'end_time': '09:15', 'purpose': 'Make-up class',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['conflicts'][0]['id'], str(self.schedule.pk))
+
+        response = self.client.post(f'/api/classes/{self.rooms[0].pk}/book/', {
+            'booked_by': self.employees[1].pk, 'booking_date': '2025-06-02',
+            'start_time': '10:00', 'end_time': '11:00', 'purpose': 'Make-up class',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def test_earlier_years_schedules_do_not_block_bookings(self):
+        from django.test import override_settings
+        from classroom.conflicts import current_academic_year
+        from classroom.models import ClassSchedule
+
+        ClassSchedule.objects.create(
+            class_room=self.rooms[1], day_of_week='monday', start_time=datetime.time(9),
+            end_time=datetime.time(10), subject=self.subjects[1], teacher=self.teachers[1],
+            level=self.level, section=self.sections[1], academic_year='2024',
+        )
+        self.assertEqual(current_academic_year(), '2025')
+        booking = {
+            'booked_by': self.employees[1].pk, 'booking_date': '2025-06-02',
+            'start_time': '09:00', 'end_time': '09:30', 'purpose': 'Make-up class',
+        }
+        response = self.client.post(f'/api/classes/{self.rooms[1].pk}/book/', booking, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+
+        with override_settings(CURRENT_ACADEMIC_YEAR='2024'):
+            booking['start_time'], booking['end_time'] = '09:30', '10:00'
+            response = self.client.post(f'/api/classes/{self.rooms[1].pk}/book/', booking, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_conflicts_endpoint_query_budget(self):
+        response = self.assertQueryBudget(
+            f'/api/classes/{self.rooms[0].pk}/conflicts/?date=2025-06-02&start=09:00&end=09:30', 1
+        )
+        self.assertFalse(response.data['available'])
+
+    def test_check_week(self):
+        slots = [
+            # Clashes with the existing Monday schedule of room 0
+            {'class_room': self.rooms[0].pk, 'day_of_week': 'monday', 'start_time': '09:00',
+             'end_time': '10:00', 'teacher': self.teachers[1].pk, 'section': self.sections[1].pk},
+            # Same teacher as the next slot at an overlapping time, in another room
+            {'class_room': self.rooms[1].pk, 'day_of_week': 'wednesday', 'start_time': '09:00',
+             'end_time': '10:00', 'teacher': self.teachers[2].pk},
+            {'class_room': self.rooms[2].pk, 'day_of_week': 'wednesday', 'start_time': '09:30',
+             'end_time': '10:30', 'teacher': self.teachers[2].pk},
+            # Clashes with the Tuesday booking of the week of 2025-06-04
+            {'class_room': self.rooms[0].pk, 'day_of_week': 'tuesday', 'start_time': '13:30',
+             'end_time': '14:30'},
+            {'class_room': self.rooms[1].pk, 'day_of_week': 'friday', 'start_time': '09:00',
+             'end_time': '10:00'},
+        ]
+        response = self.assertQueryBudget(
+            '/api/class-schedules/check_week/', 2, 'post',
+            {'academic_year': '2025', 'week_of': '2025-06-04', 'slots': slots}
+        )
+        self.assertFalse(response.data['valid'])
+        conflicts = {entry['index']: entry['conflicts'] for entry in response.data['conflicts']}
+        self.assertEqual(sorted(conflicts), [0, 1, 2, 3])
+        self.assertEqual(conflicts[0], [dict(
+            type='schedule', id=self.schedule.pk, start_time=datetime.time(9), end_time=datetime.time(10),
+            day_of_week='monday', resource='class_room',
+        )])
+        self.assertEqual(conflicts[1], [{'type': 'slot', 'index': 2, 'resource': 'teacher'}])
+        self.assertEqual(conflicts[3][0]['type'], 'booking')
+
+
+class FreeRoomSearchTests(SchoolQueryBudgetTestCase):
+    """The free-room search matches the database and serves repeated searches from memory"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from classroom.models import ClassSchedule, ClassBooking
+
+        ClassSchedule.objects.create(
+            class_room=cls.rooms[0], day_of_week='monday', start_time=datetime.time(9),
+            end_time=datetime.time(10, 2), subject=cls.subjects[0], teacher=cls.teachers[0],
+            level=cls.level, section=cls.sections[0], academic_year='2025',
+        )
+        ClassBooking.objects.create(
+            class_room=cls.rooms[1], booked_by=cls.employees[0], booking_date=datetime.date(2025, 6, 2),
+            start_time=datetime.time(11), end_time=datetime.time(12), purpose='Seminar', status='confirmed',
+        )
+        ClassBooking.objects.create(
+            class_room=cls.rooms[2], booked_by=cls.employees[0], booking_date=datetime.date(2025, 6, 2),
+            start_time=datetime.time(9), end_time=datetime.time(12), purpose='Seminar', status='cancelled',
+        )
+
+    def setUp(self):
+        super().setUp()
+        from classroom import occupancy
+        occupancy.clear()
+
+    def free(self, start, end, **params):
+        query = '&'.join(f'{name}={value}' for name, value in params.items())
+        response = self.client.get(f'/api/classes/free/?date=2025-06-02&start={start}&end={end}&{query}')
+        self.assertEqual(response.status_code, 200, response.data)
+        return [room['id'] for room in response.data['rooms']], response['X-Cache']
+
+    def test_free_rooms(self):
+        room_ids = [room.pk for room in self.rooms]
+        for fresh in ('0', '1'):
+            self.assertEqual(self.free('09:30', '11:30', fresh=fresh)[0], [room_ids[2]])
+            # 10:02 is not on a 5-minute boundary; the exact intervals decide
+            self.assertEqual(self.free('10:02', '10:30', fresh=fresh)[0], room_ids)
+            self.assertEqual(self.free('10:01', '10:30', fresh=fresh)[0], room_ids[1:])
+            self.assertEqual(self.free('08:00', '09:00', fresh=fresh, capacity=31)[0], [])
+            self.assertEqual(self.free('08:00', '09:00', fresh=fresh, has_projector='true')[0], [])
+
+    def test_repeated_search_is_served_from_memory(self):
+        self.assertEqual(self.free('09:00', '10:00')[1], 'MISS')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.free('13:00', '14:00')[1], 'HIT')
+
+    def test_booking_change_invalidates_the_day(self):
+        from classroom.models import ClassBooking
+
+        self.assertIn(self.rooms[2].pk, self.free('13:00', '14:00')[0])
+        ClassBooking.objects.create(
+            class_room=self.rooms[2], booked_by=self.employees[0], booking_date=datetime.date(2025, 6, 2),
+            start_time=datetime.time(13), end_time=datetime.time(14), purpose='Exam',
+        )
+        room_ids, cache_status = self.free('13:00', '14:00')
+        self.assertEqual(cache_status, 'MISS')
+        self.assertNotIn(self.rooms[2].pk, room_ids)
+
+    def test_cached_day_expires(self):
+        from django.test import override_settings
+
+        self.assertEqual(self.free('09:00', '10:00')[1], 'MISS')
+        # Changes made by another process are not seen through a per-process cache
+        with override_settings(ROOM_OCCUPANCY_CACHE_TIMEOUT=0):
+            self.assertEqual(self.free('09:00', '10:00')[1], 'MISS')
+
+    def test_free_query_budget(self):
+        self.assertQueryBudget('/api/classes/free/?date=2025-06-02&start=09:00&end=10:00&fresh=1', 1)
+        self.assertQueryBudget('/api/classes/free/?date=2025-06-02&start=09:00&end=10:00', 2)
+
+
+class TimetableGeneratorTests(SchoolQueryBudgetTestCase):
+    """Generated timetables have no clashes and report what could not be placed"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from level.models import LevelSubject, SectionSubject
+
+        for hours, subject in zip((4, 3, 2), cls.subjects):
+            LevelSubject.objects.create(level=cls.level, subject=subject, weekly_hours=hours)
+        for section in cls.sections:
+            for subject, teacher in zip(cls.subjects, cls.teachers):
+                SectionSubject.objects.create(section=section, subject=subject, teacher=teacher)
+
+    def test_generate_timetable(self):
+        from collections import Counter
+        from classroom.conflicts import check_timetable
+        from classroom.models import ClassSchedule
+
+        response = self.client.post('/api/class-schedules/generate/', {
+            'academic_year': '2025', 'periods_per_day': 6,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['lessons'], 27)
+        self.assertEqual(response.data['placed'], 27)
+        self.assertEqual(response.data['unplaced'], [])
+
+        schedules = list(ClassSchedule.objects.filter(academic_year='2025'))
+        self.assertEqual(len(schedules), 27)
+        slots = [
+            {'class_room': schedule.class_room_id, 'day_of_week': schedule.day_of_week,
+             'start_time': schedule.start_time, 'end_time': schedule.end_time,
+             'teacher': schedule.teacher_id, 'section': schedule.section_id}
+            for schedule in schedules
+        ]
+        self.assertEqual(check_timetable(slots, '2026'), [])
+        per_day = Counter((schedule.teacher_id, schedule.day_of_week) for schedule in schedules)
+        self.assertLessEqual(max(per_day.values()), 5)
+        # Every section gets its own room, which holds it
+        self.assertTrue(all(schedule.class_room_id == schedule.section.room_id for schedule in schedules))
+
+        # Scheduled sections are left alone unless replaced
+        response = self.client.post('/api/class-schedules/generate/', {'academic_year': '2025'}, format='json')
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual(len(response.data['skipped_sections']), 3)
+
+    def test_unsatisfiable_lessons_are_reported(self):
+        from classroom.timetable import generate_timetable
+        from classroom.models import ClassSchedule
+
+        self.teachers[0].max_classes = 2
+        self.teachers[0].save()
+        report = generate_timetable('2025', periods_per_day=6)
+        # Teacher 0 has 12 periods a week but may only teach 2 a day
+        self.assertEqual(report['placed'], 25)
+        self.assertEqual({entry['reason'] for entry in report['unplaced']}, {'teacher_max_classes'})
+        self.assertEqual(sum(entry['missing'] for entry in report['unplaced']), 2)
+        self.assertEqual(ClassSchedule.objects.count(), report['placed'])
+
+    def test_inactive_schedules_keep_their_room_slot(self):
+        import datetime
+        from classroom.timetable import generate_timetable
+        from classroom.models import ClassSchedule
+
+        periods = generate_timetable('2025', periods_per_day=6, dry_run=True)['periods']
+        home_room = self.sections[0].room
+        for start, end in periods:
+            ClassSchedule.objects.create(
+                class_room=home_room, day_of_week='monday', subject=self.subjects[0],
+                teacher=self.teachers[0], level=self.level, academic_year='2025', is_active=False,
+                start_time=datetime.time.fromisoformat(start), end_time=datetime.time.fromisoformat(end),
+            )
+        report = generate_timetable('2025', periods_per_day=6)
+        self.assertEqual((report['created'], report['unplaced']), (27, []))
+        self.assertFalse(ClassSchedule.objects.filter(
+            class_room=home_room, day_of_week='monday', is_active=True
+        ).exists())
+
+    def test_dry_run_and_async(self):
+        from classroom.models import ClassSchedule
+        from jobs.queue import run_pending
+
+        response = self.client.post('/api/class-schedules/generate/', {
+            'academic_year': '2025', 'dry_run': True,
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['placed'], 27)
+        self.assertFalse(ClassSchedule.objects.exists())
+
+        response = self.client.post('/api/class-schedules/generate/?async=1', {
+            'academic_year': '2025', 'day_start': '09:00',
+        }, format='json')
+        self.assertEqual(response.status_code, 202, response.data)
+        job, = run_pending()
+        self.assertEqual(job.status, 'succeeded', job.error)
+        self.assertEqual(job.result['created'], 27)
+        self.assertEqual(job.result['periods'][0], ['09:00', '09:45'])
+
+
+class MyScheduleTests(SchoolQueryBudgetTestCase):
+    """The caller's timetable is served from one cache lookup and rebuilt after changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from django.utils import timezone
+        from accounts.models import User
+        from classroom.models import ClassSchedule, ClassBooking
+
+        cls.teacher_user = User.objects.create_user(
+            email='teacher0@example.com', username='teacher0', password='pass', role='teacher'
+        )
+        cls.employees[0].user = cls.teacher_user
+        cls.employees[0].save()
+        cls.student_user = User.objects.create_user(
+            email='Student0@example.com', username='student0', password='pass', role='student'
+        )
+        ClassSchedule.objects.create(
+            class_room=cls.rooms[0], day_of_week='monday', start_time=datetime.time(9),
+            end_time=datetime.time(10), subject=cls.subjects[0], teacher=cls.teachers[0],
+            level=cls.level, section=cls.sections[0], academic_year='2025',
+        )
+        # A class of the whole level, taught by another teacher
+        ClassSchedule.objects.create(
+            class_room=cls.rooms[1], day_of_week='tuesday', start_time=datetime.time(11),
+            end_time=datetime.time(12), subject=cls.subjects[1], teacher=cls.teachers[1],
+            level=cls.level, academic_year='2025',
+        )
+        ClassSchedule.objects.create(
+            class_room=cls.rooms[1], day_of_week='monday', start_time=datetime.time(9),
+            end_time=datetime.time(10), subject=cls.subjects[1], teacher=cls.teachers[1],
+            level=cls.level, section=cls.sections[1], academic_year='2025',
+        )
+        ClassBooking.objects.create(
+            class_room=cls.rooms[2], booked_by=cls.employees[0], booking_date=timezone.now().date(),
+            start_time=datetime.time(15), end_time=datetime.time(16), purpose='Make-up class',
+        )
+
+    def my_schedule(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/class-schedules/my_schedule/')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response
+
+    def test_teacher_schedule(self):
+        response = self.my_schedule(self.teacher_user)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['role'], 'teacher')
+        self.assertEqual([entry['section'] for entry in response.data['week']['monday']], [self.sections[0].pk])
+        self.assertEqual(response.data['week']['tuesday'], [])
+        self.assertEqual(len(response.data['bookings']), 1)
+
+        with self.assertNumQueries(0):
+            response = self.my_schedule(self.teacher_user)
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_student_schedule(self):
+        response = self.my_schedule(self.student_user)
+        self.assertEqual(response.data['role'], 'student')
+        self.assertEqual(response.data['section'], self.sections[0].pk)
+        self.assertEqual(len(response.data['week']['monday']), 1)
+        self.assertEqual(response.data['week']['tuesday'][0]['section'], None)
+
+    def test_schedule_change_rebuilds_the_timetable(self):
+        from classroom.models import ClassSchedule
+
+        self.my_schedule(self.student_user)
+        ClassSchedule.objects.create(
+            class_room=self.rooms[0], day_of_week='friday', start_time=datetime.time(9),
+            end_time=datetime.time(10), subject=self.subjects[2], teacher=self.teachers[2],
+            level=self.level, section=self.sections[0], academic_year='2025',
+        )
+        response = self.my_schedule(self.student_user)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['week']['friday']), 1)
+
+    def test_earlier_years_are_left_out(self):
+        from classroom.models import ClassSchedule
+        from classroom.schedules import warm_schedules
+
+        # Last year's classes are still active but no longer taught
+        ClassSchedule.objects.create(
+            class_room=self.rooms[2], day_of_week='wednesday', start_time=datetime.time(9),
+            end_time=datetime.time(10), subject=self.subjects[0], teacher=self.teachers[0],
+            level=self.level, section=self.sections[0], academic_year='2024',
+        )
+        self.assertEqual(self.my_schedule(self.teacher_user).data['week']['wednesday'], [])
+        self.assertEqual(self.my_schedule(self.student_user).data['week']['wednesday'], [])
+
+        warm_schedules()
+        self.assertEqual(self.my_schedule(self.student_user).data['week']['wednesday'], [])
+
+    def test_booking_only_rebuilds_teacher_timetables(self):
+        from django.utils import timezone
+        from classroom.models import ClassBooking
+
+        self.my_schedule(self.teacher_user)
+        self.my_schedule(self.student_user)
+        ClassBooking.objects.create(
+            class_room=self.rooms[1], booked_by=self.employees[0], booking_date=timezone.now().date(),
+            start_time=datetime.time(16), end_time=datetime.time(17), purpose='Revision',
+        )
+        self.assertEqual(self.my_schedule(self.student_user)['X-Cache'], 'HIT')
+        teacher = self.my_schedule(self.teacher_user)
+        self.assertEqual(teacher['X-Cache'], 'MISS')
+        self.assertEqual(len(teacher.data['bookings']), 2)
+
+    def test_warm_schedules(self):
+        from classroom.schedules import warm_schedules
+
+        self.assertEqual(warm_schedules()['teachers'], 1)
+        with self.assertNumQueries(0):
+            teacher = self.my_schedule(self.teacher_user)
+            student = self.my_schedule(self.student_user)
+        self.assertEqual(teacher['X-Cache'], 'HIT')
+        self.assertEqual(student['X-Cache'], 'HIT')
+        self.assertEqual(len(teacher.data['bookings']), 1)
+        self.assertEqual(len(student.data['week']['monday']), 1)
+
+    def test_unlinked_user(self):
+        response = self.client.get('/api/class-schedules/my_schedule/')
+        self.assertEqual(response.status_code, 404)
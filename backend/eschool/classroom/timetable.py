@@ -0,0 +1,427 @@
+"""
+Weekly timetable generation.
+
+``generate_timetable`` builds the ``ClassSchedule`` rows of an academic
+year for every active section in scope. Each active ``SectionSubject``
+with a teacher becomes as many one-period lessons a week as its level's
+``LevelSubject.weekly_hours`` (1 when the level does not list the
+subject), and every lesson gets a day, a period and a room such that:
+
+* no section, teacher or room has two lessons in the same period, also
+  counting the schedules of that year that are kept; inactive schedules
+  keep their room too, since they still hold its slot in the unique key;
+* no teacher teaches more than ``Teacher.max_classes`` periods a day;
+* the room holds the section's active students, and is of the type the
+  subject needs (a laboratory for science, a computer lab for computer
+  science, ...) when the school has one.
+
+The solver is a heuristic, so it finishes in seconds for a hundred
+sections. Lessons are placed greedily, the most constrained first, in the
+period where they cost least: the same subject twice on one day of a
+section and a room other than the section's own cost more. Lessons that
+find no period are then repaired by local search, moving the one or two
+lessons blocking a period somewhere else, and a last pass moves lessons to
+cheaper periods. Whatever is still missing is reported per section and
+subject with the reason, instead of failing the run.
+
+The rows are written with one ``bulk_create``. Sections that already have
+active schedules in the year are skipped, unless ``replace`` is set, in
+which case their schedules are deleted in the same transaction.
+"""
+import datetime
+import random
+import time
+from collections import Counter
+
+from django.db import transaction
+
+from eschool.annotations import related_count
+from eschool.cache import invalidate
+from level.models import LevelSubject, Section, SectionSubject
+
+from .models import Class, ClassSchedule
+
+
+DEFAULT_DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday']
+
+# Room types a subject type is taught in, when the school has such rooms
+ROOM_TYPES_BY_SUBJECT = {
+    'science': ('science_lab', 'laboratory'),
+    'computer': ('computer_lab',),
+    'arts': ('art_room',),
+    'physical_education': ('gymnasium',),
+}
+GENERAL_ROOM_TYPES = ('classroom',)
+
+# Soft costs of a placement
+SAME_SUBJECT_SAME_DAY = 4
+AWAY_FROM_HOME_ROOM = 1
+
+
+def periods(day_start=datetime.time(8), period_minutes=45, periods_per_day=8, break_minutes=0):
+    """Return the ``(start_time, end_time)`` of each period of a day"""
+    start = datetime.datetime.combine(datetime.date.min, day_start)
+    length = datetime.timedelta(minutes=period_minutes)
+    gap = datetime.timedelta(minutes=break_minutes)
+    times = []
+    for number in range(periods_per_day):
+        begin = start + number * (length + gap)
+        if (begin + length).date() != datetime.date.min:
+            raise ValueError('The periods do not fit in one day')
+        times.append((begin.time(), (begin + length).time()))
+    return times
+
+
+class Lesson:
+    """One weekly period of a subject in a section"""
+
+    def __init__(self, section, subject, teacher, max_per_day, rooms, home_room):
+        self.section = section
+        self.subject = subject
+        self.teacher = teacher
+        self.max_per_day = max_per_day
+        self.rooms = rooms
+        self.home_room = home_room
+        self.slot = None
+
+
+class Solver:
+    """Greedy placement plus local search over ``days`` x ``periods`` slots"""
+
+    def __init__(self, lessons, day_count, period_count, busy_rooms, busy_teachers, teacher_load, seed=0):
+        self.lessons = lessons
+        self.slots = [(day, period) for day in range(day_count) for period in range(period_count)]
+        self.random = random.Random(seed)
+        self.section_at = {}
+        self.teacher_at = {}
+        self.room_at = {}
+        # Periods taken by the schedules that are kept; no lesson can be moved out of them
+        self.fixed_rooms = busy_rooms
+        self.fixed_teachers = busy_teachers
+        self.teacher_load = Counter(teacher_load)
+        self.subject_load = Counter()
+        self.iterations = 0
+
+    def room_for(self, lesson, day, period):
+        """The first free room of ``lesson`` in the slot, or None"""
+        for room in lesson.rooms:
+            if (room, day, period) not in self.room_at and (room, day, period) not in self.fixed_rooms:
+                return room
+        return None
+
+    def fits(self, lesson, day, period):
+        """The room ``lesson`` would get in the slot, or None if the slot is not free for it"""
+        if (lesson.section, day, period) in self.section_at:
+            return None
+        key = (lesson.teacher, day, period)
+        if key in self.teacher_at or key in self.fixed_teachers:
+            return None
+        if self.teacher_load[(lesson.teacher, day)] >= lesson.max_per_day:
+            return None
+        return self.room_for(lesson, day, period)
+
+    def cost(self, lesson, day, room):
+        return (
+            SAME_SUBJECT_SAME_DAY * self.subject_load[(lesson.section, lesson.subject, day)]
+            + (AWAY_FROM_HOME_ROOM if room != lesson.home_room else 0)
+        )
+
+    def place(self, lesson, day, period, room):
+        lesson.slot = (day, period, room)
+        self.section_at[(lesson.section, day, period)] = lesson
+        self.teacher_at[(lesson.teacher, day, period)] = lesson
+        self.room_at[(room, day, period)] = lesson
+        self.teacher_load[(lesson.teacher, day)] += 1
+        self.subject_load[(lesson.section, lesson.subject, day)] += 1
+
+    def remove(self, lesson):
+        day, period, room = lesson.slot
+        lesson.slot = None
+        del self.section_at[(lesson.section, day, period)]
+        del self.teacher_at[(lesson.teacher, day, period)]
+        del self.room_at[(room, day, period)]
+        self.teacher_load[(lesson.teacher, day)] -= 1
+        self.subject_load[(lesson.section, lesson.subject, day)] -= 1
+
+    def best_slot(self, lesson, exclude=None):
+        """The cheapest free ``(day, period, room)`` for ``lesson``, or None"""
+        best, best_cost = None, None
+        for day, period in self.slots:
+            if (day, period) == exclude:
+                continue
+            room = self.fits(lesson, day, period)
+            if room is None:
+                continue
+            cost = self.cost(lesson, day, room)
+            if best is None or cost < best_cost:
+                best, best_cost = (day, period, room), cost
+                if cost == 0:
+                    break
+        return best
+
+    def greedy(self):
+        # Teachers and rooms in short supply first, then the sections with the most lessons
+        teacher_lessons = Counter(lesson.teacher for lesson in self.lessons)
+        section_lessons = Counter(lesson.section for lesson in self.lessons)
+        order = sorted(self.lessons, key=lambda lesson: (
+            len(lesson.rooms),
+            -teacher_lessons[lesson.teacher] / lesson.max_per_day,
+            -section_lessons[lesson.section],
+        ))
+        for lesson in order:
+            self.random.shuffle(self.slots)
+            slot = self.best_slot(lesson)
+            if slot is not None:
+                self.place(lesson, *slot)
+
+    def repair(self, lesson):
+        """Place ``lesson`` by moving the lessons blocking one of its periods elsewhere"""
+        self.random.shuffle(self.slots)
+        for day, period in self.slots:
+            self.iterations += 1
+            blockers = {
+                self.section_at.get((lesson.section, day, period)),
+                self.teacher_at.get((lesson.teacher, day, period)),
+            }
+            blockers.discard(None)
+            if (lesson.teacher, day, period) in self.fixed_teachers:
+                continue
+            if not blockers and self.room_for(lesson, day, period) is None:
+                # Only the rooms are taken; free the best room's occupant
+                occupant = next((
+                    self.room_at[(room, day, period)] for room in lesson.rooms
+                    if (room, day, period) in self.room_at
+                ), None)
+                if occupant is not None:
+                    blockers.add(occupant)
+            if not blockers:
+                continue
+            moved = [(blocker, blocker.slot) for blocker in blockers]
+            for blocker in blockers:
+                self.remove(blocker)
+            room = self.fits(lesson, day, period)
+            if room is not None:
+                self.place(lesson, day, period, room)
+                replaced = []
+                for blocker, previous in moved:
+                    slot = self.best_slot(blocker, exclude=(day, period))
+                    if slot is None:
+                        break
+                    self.place(blocker, *slot)
+                    replaced.append(blocker)
+                else:
+                    return True
+                for blocker in replaced:
+                    self.remove(blocker)
+                self.remove(lesson)
+            for blocker, previous in moved:
+                self.place(blocker, *previous)
+        return False
+
+    def improve(self):
+        """Move placed lessons to cheaper free periods"""
+        for lesson in self.lessons:
+            if lesson.slot is None:
+                continue
+            day, period, room = lesson.slot
+            self.iterations += 1
+            self.remove(lesson)
+            current = self.cost(lesson, day, room)
+            slot = self.best_slot(lesson)
+            if slot is not None and self.cost(lesson, slot[0], slot[2]) < current:
+                self.place(lesson, *slot)
+            else:
+                self.place(lesson, day, period, room)
+
+    def solve(self, time_limit):
+        deadline = time.perf_counter() + time_limit
+        self.greedy()
+        progress = True
+        while progress and time.perf_counter() < deadline:
+            progress = False
+            for lesson in self.lessons:
+                if lesson.slot is None and time.perf_counter() < deadline and self.repair(lesson):
+                    progress = True
+        if time.perf_counter() < deadline:
+            self.improve()
+
+
+def _room_candidates(rooms, subject_type, students, home_room, warnings):
+    """Rooms a lesson may use, the section's own room first, then the tightest fit"""
+    wanted = ROOM_TYPES_BY_SUBJECT.get(subject_type, GENERAL_ROOM_TYPES)
+    fitting = [room for room in rooms if room[1] in wanted and room[2] >= students]
+    if not fitting and wanted != GENERAL_ROOM_TYPES:
+        warnings.add(f"No available {'/'.join(wanted)} room; {subject_type} is taught in classrooms")
+        fitting = [room for room in rooms if room[1] in GENERAL_ROOM_TYPES and room[2] >= students]
+    fitting.sort(key=lambda room: (room[0] != home_room, room[2], room[0]))
+    return [room[0] for room in fitting]
+
+
+def _overlapped(period_times, start_time, end_time):
+    return [
+        number for number, (start, end) in enumerate(period_times)
+        if start < end_time and end > start_time
+    ]
+
+
+def _unplaced_reason(lesson, solver, day_count, period_count):
+    if not lesson.rooms:
+        return 'no_room'
+    if all(solver.teacher_load[(lesson.teacher, day)] >= lesson.max_per_day for day in range(day_count)):
+        return 'teacher_max_classes'
+    if sum(1 for key in solver.section_at if key[0] == lesson.section) >= day_count * period_count:
+        return 'section_full'
+    if all(solver.room_for(lesson, day, period) is None for day, period in solver.slots):
+        return 'rooms_full'
+    return 'clash'
+
+
+def generate_timetable(academic_year, level=None, sections=None, days=None, day_start=datetime.time(8),
+                       period_minutes=45, periods_per_day=8, break_minutes=0, replace=False,
+                       dry_run=False, time_limit=20, seed=0):
+    """
+    Generate the weekly ``ClassSchedule`` rows of ``academic_year``.
+
+    ``level`` (a level number) or ``sections`` (section ids) narrow the
+    sections scheduled; ``days`` and the period arguments define the week's
+    grid. With ``dry_run`` nothing is written. Returns a report with the
+    rows created and every lesson that could not be placed.
+    """
+    started = time.perf_counter()
+    days = list(days or DEFAULT_DAYS)
+    period_times = periods(day_start, period_minutes, periods_per_day, break_minutes)
+
+    scope = Section.objects.filter(is_active=True)
+    if level is not None:
+        scope = scope.filter(level_id=level)
+    if sections is not None:
+        scope = scope.filter(pk__in=sections)
+    section_rows = list(
+        scope.annotate(active_students=related_count(Section, 'students', status='active'))
+        .order_by('pk').values_list('pk', 'level_id', 'room_id', 'active_students')
+    )
+    scheduled = set(
+        ClassSchedule.objects.filter(
+            academic_year=academic_year, is_active=True, section_id__in=[row[0] for row in section_rows]
+        ).order_by().values_list('section_id', flat=True).distinct()
+    )
+    skipped = [] if replace else sorted(scheduled)
+    section_rows = [row for row in section_rows if replace or row[0] not in scheduled]
+    section_ids = [row[0] for row in section_rows]
+
+    weekly_hours = dict(
+        ((level_id, subject_id), hours) for level_id, subject_id, hours in LevelSubject.objects.filter(
+            level_id__in={row[1] for row in section_rows}, is_active=True
+        ).values_list('level_id', 'subject_id', 'weekly_hours')
+    )
+    assignments = SectionSubject.objects.filter(section_id__in=section_ids, is_active=True).order_by(
+        'section_id', 'subject_id'
+    ).values_list('section_id', 'subject_id', 'subject__subject_type', 'teacher_id', 'teacher__max_classes')
+    rooms = list(Class.objects.filter(is_available=True).values_list('pk', 'room_type', 'capacity'))
+
+    # The schedules that stay keep their rooms and teachers busy. Inactive
+    # ones only keep their room: (room, day, start time, year) is unique
+    # whether a schedule is active or not.
+    busy_rooms, busy_teachers, teacher_load = set(), set(), Counter()
+    day_index = {day: number for number, day in enumerate(days)}
+    kept = ClassSchedule.objects.filter(academic_year=academic_year, day_of_week__in=days)
+    if replace:
+        kept = kept.exclude(section_id__in=section_ids)
+    for room_id, teacher_id, day, start_time, end_time, is_active in kept.order_by().values_list(
+        'class_room_id', 'teacher_id', 'day_of_week', 'start_time', 'end_time', 'is_active'
+    ):
+        overlapped = _overlapped(period_times, start_time, end_time)
+        for period in overlapped:
+            busy_rooms.add((room_id, day_index[day], period))
+            if is_active:
+                busy_teachers.add((teacher_id, day_index[day], period))
+        if overlapped and is_active:
+            teacher_load[(teacher_id, day_index[day])] += 1
+
+    sections_by_id = {row[0]: row for row in section_rows}
+    warnings = set()
+    candidates = {}
+    lessons = []
+    unplaced = []
+    for section_id, subject_id, subject_type, teacher_id, max_classes in assignments:
+        section_id, level_id, home_room, students = sections_by_id[section_id]
+        hours = weekly_hours.get((level_id, subject_id), 1)
+        if teacher_id is None:
+            unplaced.append({
+                'section': section_id, 'subject': subject_id, 'teacher': None,
+                'missing': hours, 'reason': 'no_teacher',
+            })
+            continue
+        key = (subject_type, students, home_room)
+        if key not in candidates:
+            candidates[key] = _room_candidates(rooms, subject_type, students, home_room, warnings)
+        lessons.extend(
+            Lesson(section_id, subject_id, teacher_id, max_classes, candidates[key], home_room)
+            for hour in range(hours)
+        )
+
+    solver = Solver(
+        lessons, len(days), len(period_times), busy_rooms, busy_teachers, teacher_load, seed=seed
+    )
+    solver.solve(max(time_limit - (time.perf_counter() - started), 0))
+
+    missing = Counter()
+    reasons = {}
+    for lesson in lessons:
+        if lesson.slot is None:
+            key = (lesson.section, lesson.subject, lesson.teacher)
+            missing[key] += 1
+            reasons[key] = _unplaced_reason(lesson, solver, len(days), len(period_times))
+    unplaced.extend(
+        {
+            'section': section_id, 'subject': subject_id, 'teacher': str(teacher_id),
+            'missing': count, 'reason': reasons[(section_id, subject_id, teacher_id)],
+        }
+        for (section_id, subject_id, teacher_id), count in sorted(missing.items(), key=lambda item: item[0][:2])
+    )
+
+    rows = [
+        ClassSchedule(
+            class_room_id=lesson.slot[2],
+            day_of_week=days[lesson.slot[0]],
+            start_time=period_times[lesson.slot[1]][0],
+            end_time=period_times[lesson.slot[1]][1],
+            subject_id=lesson.subject,
+            teacher_id=lesson.teacher,
+            level_id=sections_by_id[lesson.section][1],
+            section_id=lesson.section,
+            academic_year=academic_year,
+        )
+        for lesson in sorted(
+            (lesson for lesson in lessons if lesson.slot is not None),
+            key=lambda lesson: (lesson.section, lesson.slot[0], lesson.slot[1])
+        )
+    ]
+    deleted = 0
+    if not dry_run:
+        with transaction.atomic():
+            if replace and section_ids:
+                deleted, _ = ClassSchedule.objects.filter(
+                    academic_year=academic_year, section_id__in=section_ids
+                ).delete()
+            ClassSchedule.objects.bulk_create(rows, batch_size=1000)
+        invalidate(ClassSchedule)
+
+    repeats = sum(count - 1 for count in solver.subject_load.values() if count > 1)
+    return {
+        'academic_year': academic_year,
+        'days': days,
+        'periods': [[start.strftime('%H:%M'), end.strftime('%H:%M')] for start, end in period_times],
+        'sections': len(section_rows),
+        'skipped_sections': skipped,
+        'lessons': len(lessons) + sum(entry['missing'] for entry in unplaced if entry['reason'] == 'no_teacher'),
+        'placed': len(rows),
+        'unplaced': unplaced,
+        'same_subject_same_day': repeats,
+        'warnings': sorted(warnings),
+        'created': 0 if dry_run else len(rows),
+        'deleted': deleted,
+        'dry_run': dry_run,
+        'iterations': solver.iterations,
+        'elapsed': round(time.perf_counter() - started, 3),
+    }
@@ -3,14 +3,19 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
+from eschool.mixins import RelatedFieldsMixin
+from eschool.statistics import StatisticsBuilder
+from jobs.views import async_requested, job_accepted
 from .models import Class, ClassSchedule, ClassBooking
 from .serializers import (
     ClassSerializer, ClassDetailSerializer, ClassListSerializer,
-    ClassScheduleSerializer, ClassBookingSerializer
+    ClassScheduleSerializer, ClassBookingSerializer,
+    RoomConflictQuerySerializer, TimetableCheckSerializer, FreeRoomQuerySerializer,
+    TimetableGenerateSerializer
 )
 
 
-class ClassViewSet(viewsets.ModelViewSet):
+class ClassViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for Class/Room model"""
     
     queryset = Class.objects.all()
@@ -49,12 +54,29 @@ class ClassViewSet(viewsets.ModelViewSet):
     def book(self, request, pk=None):
         """Book a class/room"""
         class_room = self.get_object()
-        serializer = ClassBookingSerializer(data=request.data)
+        data = request.data.copy()
+        data['class_room'] = class_room.pk
+        serializer = ClassBookingSerializer(data=data)
         if serializer.is_valid():
             serializer.save(class_room=class_room)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=True, methods=['get'])
+    def conflicts(self, request, pk=None):
+        """Get the schedules and bookings a proposed interval would clash with"""
+        from .conflicts import room_conflicts
+        
+        params = RoomConflictQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+        query = params.validated_data
+        conflicts = room_conflicts(
+            pk, query['start'], query['end'], date=query.get('date'),
+            day=query.get('day_of_week'), academic_year=query.get('academic_year'),
+        )
+        return Response({'available': not conflicts, 'conflicts': conflicts})
+    
     @action(detail=False, methods=['get'])
     def available(self, request):
         """Get available rooms"""
@@ -62,6 +84,34 @@ class ClassViewSet(viewsets.ModelViewSet):
         serializer = ClassListSerializer(available_rooms, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def free(self, request):
+        """Get the rooms with no schedule or booking in a time window of a date"""
+        from .occupancy import free_rooms, free_rooms_queryset
+        
+        params = FreeRoomQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+        query = dict(params.validated_data)
+        fresh = query.pop('fresh')
+        window = (query.pop('date'), query.pop('start'), query.pop('end'))
+        
+        if fresh:
+            # Straight from the database, bypassing the occupancy cache
+            rooms, cached = free_rooms_queryset(*window, **query), False
+        else:
+            rooms, cached = free_rooms(*window, **query)
+        data = ClassListSerializer(rooms, many=True).data
+        response = Response({
+            'date': window[0],
+            'start': window[1],
+            'end': window[2],
+            'count': len(data),
+            'rooms': data,
+        })
+        response['X-Cache'] = 'HIT' if cached else 'MISS'
+        return response
+    
     @action(detail=False, methods=['get'])
     def by_type(self, request):
         """Get rooms grouped by type"""
@@ -87,24 +137,24 @@ class ClassViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Get class/room statistics"""
-        from django.db.models import Count, Avg
+        from django.db.models import Avg, Sum
         
-        stats = {
-            'total_rooms': Class.objects.count(),
-            'available_rooms': Class.objects.filter(is_available=True).count(),
-            'by_type': list(Class.objects.values('room_type').annotate(count=Count('id'))),
-            'by_floor': list(Class.objects.values('floor').annotate(count=Count('id'))),
-            'average_capacity': round(
-                Class.objects.aggregate(
-                    avg_capacity=Avg('capacity')
-                )['avg_capacity'] or 0, 2
-            ),
-            'total_capacity': sum(room.capacity for room in Class.objects.all()),
-        }
+        stats = (
+            StatisticsBuilder(Class.objects.all())
+            .count('total_rooms')
+            .count('available_rooms', is_available=True)
+            .group_by('by_type', 'room_type')
+            .group_by('by_floor', 'floor')
+            .aggregate('average_capacity', Avg('capacity'))
+            .aggregate('total_capacity', Sum('capacity'))
+            .build()
+        )
+        stats['average_capacity'] = round(stats['average_capacity'] or 0, 2)
+        stats['total_capacity'] = stats['total_capacity'] or 0
         return Response(stats)
 
 
-class ClassScheduleViewSet(viewsets.ModelViewSet):
+class ClassScheduleViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for ClassSchedule model"""
     
     queryset = ClassSchedule.objects.all()
@@ -149,9 +199,61 @@ class ClassScheduleViewSet(viewsets.ModelViewSet):
             serializer = ClassScheduleSerializer(schedule, many=True)
             return Response(serializer.data)
         return Response({'error': 'level_id parameter is required'}, status=400)
+    
+    @action(detail=False, methods=['get'])
+    def my_schedule(self, request):
+        """Get the signed-in teacher's or student's weekly timetable from the cache"""
+        from .schedules import user_schedule
+        
+        timetable, cached = user_schedule(request.user)
+        if timetable is None:
+            return Response(
+                {'error': 'No teacher or student is linked to this account'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        response = Response(timetable)
+        response['X-Cache'] = 'HIT' if cached else 'MISS'
+        return response
+    
+    @action(detail=False, methods=['post'])
+    def check_week(self, request):
+        """Validate a week of proposed slots against each other, schedules and bookings"""
+        from .conflicts import check_timetable
+        
+        serializer = TimetableCheckSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        conflicts = check_timetable(data['slots'], data['academic_year'], data.get('week_of'))
+        return Response({
+            'valid': not conflicts,
+            'slots': len(data['slots']),
+            'conflicting_slots': len(conflicts),
+            'conflicts': conflicts,
+        })
+    
+    @action(detail=False, methods=['post'])
+    def generate(self, request):
+        """Generate the weekly schedules of an academic year's sections (?async=1 queues it as a job)"""
+        from .timetable import generate_timetable
+        
+        serializer = TimetableGenerateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = dict(serializer.validated_data)
+        
+        if async_requested(request):
+            if 'day_start' in params:
+                params['day_start'] = params['day_start'].isoformat()
+            return job_accepted(request, 'classroom.timetable', params)
+        try:
+            report = generate_timetable(**params)
+        except ValueError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_200_OK if report['dry_run'] else status.HTTP_201_CREATED)
 
 
-class ClassBookingViewSet(viewsets.ModelViewSet):
+class ClassBookingViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for ClassBooking model"""
     
     queryset = ClassBooking.objects.all()
@@ -183,7 +285,20 @@ class ClassBookingViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def confirm(self, request, pk=None):
         """Confirm a booking"""
+        from .conflicts import BLOCKING_STATUSES, room_conflicts
+        
         booking = self.get_object()
+        if booking.status not in BLOCKING_STATUSES:
+            # A cancelled booking only gets its room back if nothing took it since
+            conflicts = room_conflicts(
+                booking.class_room_id, booking.start_time, booking.end_time,
+                date=booking.booking_date, exclude_booking=booking.pk,
+            )
+            if conflicts:
+                return Response(
+                    {'error': 'The room is already taken at this time', 'conflicts': conflicts},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
         booking.status = 'confirmed'
         booking.save()
         serializer = ClassBookingSerializer(booking)
@@ -1,6 +1,19 @@
 from django.db import models
 from django.core.validators import MinLengthValidator
 
+from eschool.annotations import related_count
+
+
+class DepartmentQuerySet(models.QuerySet):
+    """Queryset for Department with annotated counts"""
+
+    def with_counts(self):
+        """Annotate the values read by ``employee_count`` and ``student_count``"""
+        return self.annotate(
+            _employee_count=related_count(self.model, 'employees'),
+            _student_count=related_count(self.model, 'students'),
+        )
+
 
 class Department(models.Model):
     """Department model representing academic and administrative departments"""
@@ -45,6 +58,8 @@ class Department(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = DepartmentQuerySet.as_manager()
+    
     class Meta:
         db_table = 'departments'
         ordering = ['d_name']
@@ -57,11 +72,15 @@ class Department(models.Model):
     @property
     def employee_count(self):
         """Return the number of employees in this department"""
+        if hasattr(self, '_employee_count'):
+            return self._employee_count
         return self.employees.count()
     
     @property
     def student_count(self):
         """Return the number of students in this department"""
+        if hasattr(self, '_student_count'):
+            return self._student_count
         return self.students.count()
 
 
@@ -1,3 +1,22 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from eschool.testing import SchoolQueryBudgetTestCase
+
+
+class DepartmentListQueryTests(SchoolQueryBudgetTestCase):
+    """List and detail endpoints load related rows up-front"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from department.models import Department, Finance
+
+        for i in range(cls.rows):
+            department = Department.objects.create(d_name=f'Department {i}', location='Block B')
+            Finance.objects.create(department=department, date=datetime.date(2025, 1, 1), report='Report')
+
+    def test_department_list_query_budget(self):
+        self.assertQueryBudget('/api/departments/', 2)
+
+    def test_finance_list_query_budget(self):
+        self.assertQueryBudget('/api/finances/', 2)
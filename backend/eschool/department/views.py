@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q
 
+from eschool.mixins import RelatedFieldsMixin
 from .models import Department, Finance
 from .serializers import (
     DepartmentSerializer, DepartmentDetailSerializer,
@@ -11,10 +12,10 @@ from .serializers import (
 )
 
 
-class DepartmentViewSet(viewsets.ModelViewSet):
+class DepartmentViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for Department model"""
     
-    queryset = Department.objects.all()
+    queryset = Department.objects.with_counts()
     serializer_class = DepartmentSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['d_type', 'location']
@@ -67,7 +68,7 @@ class DepartmentViewSet(viewsets.ModelViewSet):
         return Response(stats)
 
 
-class FinanceViewSet(viewsets.ModelViewSet):
+class FinanceViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for Finance model"""
     
     queryset = Finance.objects.all()
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0002_employeesalary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employeeattendance',
+            index=models.Index(fields=['-date', 'employee', 'id'], name='emp_attendance_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0003_employeeattendance_emp_attendance_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employeeattendance',
+            index=models.Index(fields=['date', 'status'], name='emp_attendance_date_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeesalary',
+            index=models.Index(fields=['month', 'status'], name='emp_salary_month_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeesalary',
+            index=models.Index(fields=['status', 'pay_date'], name='emp_salary_status_pay_idx'),
+        ),
+    ]
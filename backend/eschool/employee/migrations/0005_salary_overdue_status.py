@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0004_employeeattendance_emp_attendance_date_status_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='employeesalary',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('paid', 'Paid'), ('overdue', 'Overdue'), ('cancelled', 'Cancelled'), ('on_hold', 'On Hold')], default='pending', help_text='Payment status', max_length=20),
+        ),
+    ]
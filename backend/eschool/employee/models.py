@@ -217,6 +217,12 @@ class EmployeeAttendance(models.Model):
         verbose_name = 'Employee Attendance'
         verbose_name_plural = 'Employee Attendance Records'
         unique_together = ['employee', 'date']
+        indexes = [
+            # Keyset pagination over the default ordering (-date, employee, pk)
+            models.Index(fields=['-date', 'employee', 'id'], name='emp_attendance_keyset_idx'),
+            # today and the summary counts
+            models.Index(fields=['date', 'status'], name='emp_attendance_date_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.employee.name} - {self.date} ({self.status})"
@@ -287,6 +293,7 @@ class EmployeeSalary(models.Model):
     SALARY_STATUS = [
         ('pending', 'Pending'),
         ('paid', 'Paid'),
+        ('overdue', 'Overdue'),
         ('cancelled', 'Cancelled'),
         ('on_hold', 'On Hold'),
     ]
@@ -390,6 +397,12 @@ class EmployeeSalary(models.Model):
         verbose_name = 'Employee Salary'
         verbose_name_plural = 'Employee Salaries'
         unique_together = ['employee', 'month', 'salary_type']
+        indexes = [
+            # monthly_summary
+            models.Index(fields=['month', 'status'], name='emp_salary_month_status_idx'),
+            # pending and overdue
+            models.Index(fields=['status', 'pay_date'], name='emp_salary_status_pay_idx'),
+        ]
     
     def __str__(self):
         return f"{self.employee.name} - {self.month} ({self.amount})"
@@ -404,9 +417,9 @@ class EmployeeSalary(models.Model):
     
     @property
     def is_overdue(self):
-        """Check if salary payment is overdue"""
+        """Check if salary payment is overdue (set by the daily overdue sweep, see finance/overdue.py)"""
         from datetime import date
-        return self.status == 'pending' and self.pay_date < date.today()
+        return self.status == 'overdue' or (self.status == 'pending' and self.pay_date < date.today())
     
     @property
     def gross_salary(self):
@@ -1,3 +1,34 @@
-from django.test import TestCase
+import datetime
+from decimal import Decimal
 
-# Create your tests here.
+from eschool.testing import SchoolQueryBudgetTestCase
+
+
+class EmployeeListQueryTests(SchoolQueryBudgetTestCase):
+    """List and detail endpoints load related rows up-front"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from employee.models import EmployeeAttendance, EmployeeSalary
+
+        for employee in cls.employees:
+            EmployeeAttendance.objects.create(employee=employee, date=datetime.date(2025, 1, 2))
+            EmployeeSalary.objects.create(
+                employee=employee, month='January 2025', pay_date=datetime.date(2025, 1, 31),
+                basic_salary=Decimal('1000'), allowances=Decimal('0'), deductions=Decimal('0'),
+                overtime_hours=Decimal('0'), overtime_rate=Decimal('0'),
+                tax_deduction=Decimal('0'), net_salary=Decimal('0'), amount=Decimal('0'),
+            )
+
+    def test_employee_list_query_budget(self):
+        self.assertQueryBudget('/api/employees/', 2)
+
+    def test_employee_detail_query_budget(self):
+        self.assertQueryBudget(f'/api/employees/{self.employees[0].pk}/', 4)
+
+    def test_employee_attendance_list_query_budget(self):
+        self.assertQueryBudget('/api/employee-attendance/', 2)
+
+    def test_employee_salary_list_query_budget(self):
+        self.assertQueryBudget('/api/employee-salaries/', 2)
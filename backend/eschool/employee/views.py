@@ -4,6 +4,9 @@ from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q
 
+from eschool.mixins import ExportMixin, RelatedFieldsMixin
+from eschool.cache import cached_response
+from eschool.statistics import StatisticsBuilder
 from .models import Employee, EmployeeAttendance, Experience, EmployeeSalary
 from .serializers import (
     EmployeeSerializer, EmployeeDetailSerializer, EmployeeListSerializer,
@@ -11,7 +14,7 @@ from .serializers import (
 )
 
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+class EmployeeViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for Employee model"""
     
     queryset = Employee.objects.all()
@@ -101,24 +104,28 @@ class EmployeeViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Get employee statistics"""
-        from django.db.models import Count, Avg
+        from django.db.models import Avg
+        from django.db.models.functions import ExtractYear
         from datetime import date
         
-        stats = {
-            'total_employees': Employee.objects.count(),
-            'active_employees': Employee.objects.filter(status='active').count(),
-            'by_role': list(Employee.objects.values('role').annotate(count=Count('id'))),
-            'by_department': list(Employee.objects.values('department__d_name').annotate(count=Count('id'))),
-            'average_years_of_service': round(
-                Employee.objects.aggregate(
-                    avg_years=Avg('join_date')
-                )['avg_years'] or 0, 2
-            ),
-        }
+        stats = (
+            StatisticsBuilder(Employee.objects.all())
+            .count('total_employees')
+            .count('active_employees', status='active')
+            .group_by('by_role', 'role')
+            .group_by('by_department', 'department__d_name')
+            .aggregate('average_years_of_service', Avg(ExtractYear('join_date')))
+            .build()
+        )
+        # Same definition as Employee.years_of_service, averaged in the database
+        average_join_year = stats['average_years_of_service']
+        stats['average_years_of_service'] = (
+            round(date.today().year - average_join_year, 2) if average_join_year else 0
+        )
         return Response(stats)
 
 
-class EmployeeAttendanceViewSet(viewsets.ModelViewSet):
+class EmployeeAttendanceViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for EmployeeAttendance model"""
     
     queryset = EmployeeAttendance.objects.all()
@@ -164,7 +171,7 @@ class EmployeeAttendanceViewSet(viewsets.ModelViewSet):
         return Response(summary)
 
 
-class ExperienceViewSet(viewsets.ModelViewSet):
+class ExperienceViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for Experience model"""
     
     queryset = Experience.objects.all()
@@ -176,7 +183,7 @@ class ExperienceViewSet(viewsets.ModelViewSet):
     ordering = ['-start_date']
 
 
-class EmployeeSalaryViewSet(viewsets.ModelViewSet):
+class EmployeeSalaryViewSet(ExportMixin, RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for EmployeeSalary model"""
     
     queryset = EmployeeSalary.objects.all()
@@ -186,6 +193,12 @@ class EmployeeSalaryViewSet(viewsets.ModelViewSet):
     search_fields = ['employee__name', 'employee__position', 'month']
     ordering_fields = ['pay_date', 'paid_date', 'amount']
     ordering = ['-pay_date']
+    export_fields = [
+        'sal_id', 'employee_id', 'employee__name', 'employee__department__d_name',
+        'salary_type', 'month', 'pay_date', 'paid_date', 'status', 'basic_salary',
+        'allowances', 'overtime_hours', 'overtime_rate', 'deductions', 'tax_deduction',
+        'net_salary', 'amount',
+    ]
     
     @action(detail=False, methods=['get'])
     def pending(self, request):
@@ -197,10 +210,8 @@ class EmployeeSalaryViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def overdue(self, request):
         """Get overdue salary payments"""
-        from datetime import date
-        overdue_salaries = EmployeeSalary.objects.filter(
-            status='pending', pay_date__lt=date.today()
-        )
+        from finance.overdue import overdue_filter
+        overdue_salaries = self.get_queryset().filter(overdue_filter('pay_date'))
         serializer = EmployeeSalarySerializer(overdue_salaries, many=True)
         return Response(serializer.data)
     
@@ -215,30 +226,49 @@ class EmployeeSalaryViewSet(viewsets.ModelViewSet):
         serializer = EmployeeSalarySerializer(salary)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['post'], url_path='mark_paid/bulk')
+    def bulk_mark_paid(self, request):
+        """Mark many salaries as paid and post them to the ledger in one batch"""
+        from rest_framework import serializers
+        from finance.ledger import mark_salaries_paid
+        
+        try:
+            ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False).run_validation(
+                request.data.get('salaries')
+            )
+            paid_date = request.data.get('paid_date')
+            paid_date = serializers.DateField().run_validation(paid_date) if paid_date else None
+        except serializers.ValidationError as e:
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        
+        result = mark_salaries_paid(ids, paid_date)
+        partial = result['not_found'] or result['skipped']
+        return Response(result, status=status.HTTP_207_MULTI_STATUS if partial else status.HTTP_200_OK)
+    
     @action(detail=False, methods=['get'])
+    @cached_response(EmployeeSalary, Employee, 'department.Department')
     def summary(self, request):
         """Get salary payment summary"""
         from django.db.models import Sum, Count
-        from datetime import date
-        
-        today = date.today()
+        from finance.overdue import overdue_filter
         
+        overdue = overdue_filter('pay_date')
         summary = {
             'total_salaries': EmployeeSalary.objects.count(),
             'total_amount': EmployeeSalary.objects.aggregate(Sum('amount'))['amount__sum'] or 0,
             'paid_amount': EmployeeSalary.objects.filter(status='paid').aggregate(Sum('amount'))['amount__sum'] or 0,
-            'pending_amount': EmployeeSalary.objects.filter(status='pending').aggregate(Sum('amount'))['amount__sum'] or 0,
-            'overdue_count': EmployeeSalary.objects.filter(
-                status='pending', pay_date__lt=today
-            ).count(),
+            # Not yet due; past-due pending rows count as overdue before the sweep moves them
+            'pending_amount': EmployeeSalary.objects.filter(status='pending').exclude(overdue).aggregate(Sum('amount'))['amount__sum'] or 0,
+            'overdue_amount': EmployeeSalary.objects.filter(overdue).aggregate(Sum('amount'))['amount__sum'] or 0,
+            'overdue_count': EmployeeSalary.objects.filter(overdue).count(),
             'by_status': list(EmployeeSalary.objects.values('status').annotate(
-                count=Count('id'),
+                count=Count('pk'),
                 total=Sum('amount')
             )),
             'by_department': list(EmployeeSalary.objects.values(
                 'employee__department__d_name'
             ).annotate(
-                count=Count('id'),
+                count=Count('pk'),
                 total=Sum('amount')
             )),
         }
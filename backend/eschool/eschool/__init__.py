@@ -0,0 +1,8 @@
+# Load the Celery app with Django so tasks sent from the web process use
+# CELERY_BROKER_URL; Celery is only installed for JOBS_BACKEND=celery
+try:
+    from .celery import app as celery_app
+except ImportError:
+    celery_app = None
+
+__all__ = ['celery_app']
@@ -0,0 +1,27 @@
+"""
+Queryset annotations shared by the app models.
+"""
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def related_count(model, relation, **filters):
+    """
+    Count the rows of a reverse foreign key as a correlated subquery.
+
+    ``relation`` is the ``related_name`` of the foreign key pointing at
+    ``model``. Unlike ``Count(relation)`` this adds no join to the outer
+    query, so several counts can be annotated on one queryset without the
+    rows multiplying, and objects without related rows get ``0``.
+    """
+    rel = model._meta.get_field(relation)
+    fk_name = rel.field.name
+    counts = (
+        rel.related_model._default_manager
+        .filter(**{fk_name: OuterRef('pk')}, **filters)
+        .order_by()
+        .values(fk_name)
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
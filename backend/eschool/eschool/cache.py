@@ -0,0 +1,215 @@
+"""
+Response cache for read-heavy aggregate endpoints.
+
+``cached_response`` stores an action's response data in Django's cache,
+keyed by the endpoint, the request path and query string, the current
+date and a version number for every model the endpoint reads. Saving or
+deleting one of those models (``post_save``/``post_delete``) bumps its
+version, so every entry built from the old data stops being addressable
+and simply expires. This works the same on the local-memory and Redis
+backends, neither of which can delete keys by pattern portably.
+
+Writes that bypass model signals (``bulk_create``, ``QuerySet.update``)
+call ``invalidate`` for the models they touch.
+"""
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
+from rest_framework.response import Response
+
+
+KEY_PREFIX = 'eschool:response'
+
+# Model labels that at least one cached endpoint depends on
+_dependencies = set()
+
+# Qualified names of the cached endpoints, for the hit/miss report
+_endpoints = []
+
+
+def _label(model):
+    return model if isinstance(model, str) else model._meta.label
+
+
+def _version_key(label):
+    return f'{KEY_PREFIX}:version:{label}'
+
+
+def _counter_key(endpoint, outcome):
+    return f'{KEY_PREFIX}:stats:{endpoint}:{outcome}'
+
+
+def _increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Missing (never set or evicted); losing a concurrent increment is fine here
+        cache.set(key, 1, None)
+
+
+def _versions(labels):
+    """Return the current version of each label, seeding missing ones"""
+    keys = [_version_key(label) for label in labels]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # A fresh value rather than 0, so an evicted version never matches old entries
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def model_versions(*models):
+    """
+    Return the current versions of ``models`` for caches kept outside this module.
+
+    The models are tracked from then on, so saving or deleting one of them
+    changes the value returned next time.
+    """
+    labels = [_label(model) for model in models]
+    _dependencies.update(labels)
+    return tuple(_versions(labels))
+
+
+def versioned_get(key, *models):
+    """
+    Return ``(data, versions)`` of an entry stored with ``versioned_set``.
+
+    The entry and the current versions of ``models`` (a ``{label: version}``
+    dict) come back from a single ``get_many``; ``data`` is None when the
+    entry is missing or was built before one of the models it was stored
+    with changed. Pass ``versions`` on to ``versioned_set`` when storing the
+    rebuilt data, with the subset of ``models`` it was read from when that
+    depends on the entry.
+    """
+    labels = [_label(model) for model in models]
+    _dependencies.update(labels)
+    version_keys = [_version_key(label) for label in labels]
+    found = cache.get_many([key, *version_keys])
+    if all(version_key in found for version_key in version_keys):
+        versions = dict(zip(labels, (found[version_key] for version_key in version_keys)))
+    else:
+        versions = dict(zip(labels, _versions(labels)))
+    entry = found.get(key)
+    if entry is not None and all(versions.get(label) == version for label, version in entry[0].items()):
+        return entry[1], versions
+    return None, versions
+
+
+def labelled_versions(*models):
+    """Return the current versions of ``models`` as the ``{label: version}`` dict ``versioned_set`` takes"""
+    labels = [_label(model) for model in models]
+    return dict(zip(labels, model_versions(*models)))
+
+
+def _depending(versions, models):
+    # The versions an entry is checked against: those of ``models``, or all of them
+    if not models:
+        return versions
+    return {label: versions[label] for label in map(_label, models)}
+
+
+def versioned_set(key, data, versions, timeout=DEFAULT_TIMEOUT, models=()):
+    """Store ``data`` under ``key`` as built from ``versions`` of ``models`` (default: all; see ``versioned_get``)"""
+    cache.set(key, (_depending(versions, models), data), timeout)
+
+
+def versioned_set_many(entries, versions, timeout=DEFAULT_TIMEOUT, models=()):
+    """Store several ``{key: data}`` entries built from the same ``versions`` of ``models``"""
+    versions = _depending(versions, models)
+    cache.set_many({key: (versions, data) for key, data in entries.items()}, timeout)
+
+
+def invalidate(*models):
+    """Drop the cached responses that depend on any of ``models``"""
+    for model in models:
+        label = _label(model)
+        try:
+            cache.incr(_version_key(label))
+        except ValueError:
+            cache.set(_version_key(label), time.time_ns(), None)
+
+
+def cache_stats():
+    """Return hit and miss counters per cached endpoint and in total"""
+    keys = [
+        _counter_key(endpoint, outcome)
+        for endpoint in _endpoints for outcome in ('hits', 'misses')
+    ]
+    counters = cache.get_many(keys)
+    endpoints = {}
+    for endpoint in _endpoints:
+        hits = counters.get(_counter_key(endpoint, 'hits'), 0)
+        misses = counters.get(_counter_key(endpoint, 'misses'), 0)
+        endpoints[endpoint] = {'hits': hits, 'misses': misses}
+    hits = sum(entry['hits'] for entry in endpoints.values())
+    misses = sum(entry['misses'] for entry in endpoints.values())
+    return {
+        'backend': settings.CACHES['default']['BACKEND'],
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses) * 100, 2) if hits + misses else 0,
+        'endpoints': endpoints,
+    }
+
+
+def cached_response(*models, timeout=None):
+    """
+    Cache a viewset action's response until one of ``models`` changes.
+
+    ``models`` are model classes or ``'app_label.Model'`` strings.
+    ``timeout`` defaults to ``settings.RESPONSE_CACHE_TIMEOUT``. Only
+    successful responses are cached; the response carries an ``X-Cache``
+    header of ``HIT`` or ``MISS``.
+    """
+    def decorator(view_method):
+        endpoint = view_method.__qualname__
+        labels = [_label(model) for model in models]
+        _dependencies.update(labels)
+        _endpoints.append(endpoint)
+
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            query = sorted(
+                (name, value)
+                for name, values in request.query_params.lists() for value in values
+            )
+            raw_key = repr((endpoint, request.path, query, timezone.now().date(), _versions(labels)))
+            key = f'{KEY_PREFIX}:{hashlib.md5(raw_key.encode()).hexdigest()}'
+
+            data = cache.get(key)
+            if data is not None:
+                _increment(_counter_key(endpoint, 'hits'))
+                response = Response(data)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            _increment(_counter_key(endpoint, 'misses'))
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(
+                    key, response.data,
+                    settings.RESPONSE_CACHE_TIMEOUT if timeout is None else timeout
+                )
+            response['X-Cache'] = 'MISS'
+            return response
+
+        return wrapper
+    return decorator
+
+
+def _invalidate_on_change(sender, **kwargs):
+    if kwargs.get('raw'):
+        return
+    if sender._meta.label in _dependencies:
+        invalidate(sender)
+
+
+post_save.connect(_invalidate_on_change, dispatch_uid='eschool.cache.post_save')
+post_delete.connect(_invalidate_on_change, dispatch_uid='eschool.cache.post_delete')
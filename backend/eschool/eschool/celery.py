@@ -0,0 +1,15 @@
+"""
+Celery application for the optional Celery job backend.
+
+Start a worker with ``celery -A eschool worker`` and set
+``JOBS_BACKEND=celery``; see jobs/queue.py.
+"""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eschool.settings')
+
+app = Celery('eschool')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks(['jobs'])
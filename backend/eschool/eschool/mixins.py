@@ -0,0 +1,140 @@
+"""
+Viewset mixins shared by the API apps.
+"""
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+
+class RelatedFieldsMixin:
+    """
+    Apply ``select_related``/``prefetch_related`` for the active serializer.
+
+    The serializer's readable fields are walked (dotted ``source`` paths,
+    nested serializers and related fields) and every relation they touch is
+    loaded up-front, so listing a page costs a fixed number of queries
+    instead of one per row and relation. Single-valued relations are
+    joined with ``select_related``; reverse foreign keys and many-to-many
+    relations, and everything reached through them, are prefetched.
+
+    Relations used only inside ``SerializerMethodField`` methods or model
+    properties cannot be discovered this way; a serializer lists those in
+    ``Meta.related_paths`` using the same dotted syntax as ``source``.
+    """
+
+    _related_paths_cache = {}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        model = getattr(getattr(serializer_class, 'Meta', None), 'model', None)
+        if model is None or not issubclass(queryset.model, model):
+            return queryset
+
+        key = (serializer_class, queryset.model)
+        if key not in self._related_paths_cache:
+            self._related_paths_cache[key] = related_paths(serializer_class(), queryset.model)
+        select, prefetch = self._related_paths_cache[key]
+
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+
+class ExportMixin:
+    """
+    Add an ``export`` action that streams the filtered list as CSV or NDJSON.
+
+    The viewset lists the exported ``values()`` paths in ``export_fields``.
+    The list's filter, search and ordering parameters apply; pagination
+    does not. ``?export_format=ndjson`` selects NDJSON, CSV is the default.
+    """
+
+    export_fields = ()
+    export_batch_size = 2000
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream the filtered rows as CSV or NDJSON"""
+        from .export import EXPORT_FORMATS, streaming_export
+
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f'export_format must be one of: {", ".join(EXPORT_FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = self.filter_queryset(self.get_queryset())
+        return streaming_export(
+            queryset, list(self.export_fields), export_format,
+            getattr(self, 'basename', None) or queryset.model._meta.model_name,
+            self.export_batch_size
+        )
+
+
+def related_paths(serializer, model):
+    """Return the ``(select_related, prefetch_related)`` paths a serializer needs"""
+    select, prefetch = set(), set()
+    _collect(serializer, model, '', False, select, prefetch)
+    # A prefetch path already loads every relation along it
+    prefetch = {
+        path for path in prefetch
+        if not any(other.startswith(path + '__') for other in prefetch)
+    }
+    return sorted(select), sorted(prefetch)
+
+
+def _relations(model):
+    """Map attribute names of ``model`` to the relation behind them"""
+    relations = {}
+    for field in model._meta.get_fields():
+        if not field.is_relation:
+            continue
+        if field.auto_created and not field.concrete:
+            relations[field.get_accessor_name()] = field
+        else:
+            relations[field.name] = field
+    return relations
+
+
+def _collect(serializer, model, prefix, in_prefetch, select, prefetch):
+    """Walk the readable fields of ``serializer`` bound to ``model``"""
+    for field in serializer.fields.values():
+        if field.write_only or isinstance(field, serializers.SerializerMethodField):
+            continue
+        _walk(field, field.source_attrs, model, prefix, in_prefetch, select, prefetch)
+
+    meta = getattr(serializer, 'Meta', None)
+    for path in getattr(meta, 'related_paths', ()):
+        _walk(None, path.replace('__', '.').split('.'), model, prefix, in_prefetch, select, prefetch)
+
+
+def _walk(field, attrs, model, prefix, in_prefetch, select, prefetch):
+    """Follow one dotted attribute path and record the relations it crosses"""
+    path = prefix
+    for index, attr in enumerate(attrs):
+        relation = _relations(model).get(attr)
+        if relation is None:
+            # A plain column, property or method: nothing more to load
+            return
+
+        last = index == len(attrs) - 1
+        if (last and isinstance(field, serializers.RelatedField)
+                and field.use_pk_only_optimization()
+                and not relation.auto_created):
+            # Rendered from the local ``<attr>_id`` column
+            return
+
+        path = f'{path}__{attr}' if path else attr
+        if relation.one_to_many or relation.many_to_many:
+            in_prefetch = True
+        (prefetch if in_prefetch else select).add(path)
+        model = relation.related_model
+
+    if isinstance(field, serializers.ListSerializer):
+        field = field.child
+    if isinstance(field, serializers.BaseSerializer):
+        _collect(field, model, path, in_prefetch, select, prefetch)
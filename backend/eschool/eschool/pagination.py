@@ -0,0 +1,247 @@
+"""
+Pagination classes for the API.
+
+Lists are paginated by page number by default. A client can opt in to
+keyset (cursor) pagination for a single request with ``?pagination=cursor``
+and then follow the ``next``/``previous`` links, which carry a ``cursor``
+parameter. Keyset pages are selected with a ``WHERE`` on the ordering
+columns of the last row seen instead of ``OFFSET``, and no ``COUNT(*)`` is
+run, so with an index on the ordering every page costs the same however
+deep it is.
+"""
+import base64
+import datetime
+import decimal
+import json
+import uuid
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginate on the values of the ordering columns of the boundary rows.
+
+    The ordering is the queryset's explicit ``order_by`` (the view's
+    ``ordering`` or the client's ``?ordering=``) followed by the remaining
+    fields of the model's ``Meta.ordering`` and finally the primary key,
+    which makes it total. Foreign keys are compared on their column rather
+    than the related model's ordering, so no join is added. Nullable
+    columns cannot be compared with ``<``/``>`` and are rejected.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    display_page_controls = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = remove_query_param(request.build_absolute_uri(), 'page')
+        self.ordering = keyset_ordering(queryset)
+        values, reverse = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*[
+            ('-' if descending != reverse else '') + lookup
+            for lookup, field, descending in self.ordering
+        ])
+        if values is not None:
+            queryset = queryset.filter(keyset_filter(self.ordering, values, reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.first = rows[0] if rows else None
+        self.last = rows[-1] if rows else None
+        if reverse:
+            self.has_next, self.has_previous = bool(rows), has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None and bool(rows)
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.last, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.first, reverse=True)
+
+    def encode_cursor(self, row, reverse):
+        """Return the URL of the page after (or before) ``row``"""
+        values = [_encode_value(_row_value(row, field_path)) for field_path in self._field_paths()]
+        payload = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        """Return the ``(values, reverse)`` position of the request's cursor"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            raw_values, reverse = payload['v'], bool(payload['r'])
+            if len(raw_values) != len(self.ordering):
+                raise ValueError
+            values = [
+                field.to_python(value)
+                for value, (lookup, field, descending) in zip(raw_values, self.ordering)
+            ]
+        except (TypeError, KeyError, ValueError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def _field_paths(self):
+        return [lookup.split('__') for lookup, field, descending in self.ordering]
+
+
+class SchoolPagination(PageNumberPagination):
+    """
+    Page-number pagination, or keyset pagination when the client asks.
+
+    ``?pagination=cursor`` (or a ``cursor`` parameter taken from a previous
+    keyset response) switches the request to ``KeysetPagination``.
+    """
+
+    mode_query_param = 'pagination'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if (request.query_params.get(self.mode_query_param) == 'cursor'
+                or KeysetPagination.cursor_query_param in request.query_params):
+            self.keyset = KeysetPagination()
+            self.keyset.page_size = self.get_page_size(request)
+            self.display_page_controls = False
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+def keyset_ordering(queryset):
+    """
+    Return the total ordering of ``queryset`` as ``(lookup, field, descending)``.
+
+    ``lookup`` ends in a concrete column, ``field`` is the model field that
+    parses cursor values for it.
+    """
+    model = queryset.model
+    terms = list(queryset.query.order_by)
+    if not all(isinstance(term, str) for term in terms):
+        raise ValidationError({'ordering': 'Keyset paging needs an ordering by model fields.'})
+    seen = {term.lstrip('-') for term in terms}
+    terms += [term for term in model._meta.ordering if term.lstrip('-') not in seen]
+
+    ordering = []
+    for term in terms:
+        descending = term.startswith('-')
+        lookup, field = _resolve(model, term.lstrip('-'))
+        if lookup not in [existing for existing, _, _ in ordering]:
+            ordering.append((lookup, field, descending))
+
+    pk = model._meta.pk
+    while pk.is_relation:
+        # One-to-one primary keys (Teacher.teacher_id) compare on the target column
+        pk = pk.target_field
+    if model._meta.pk.attname not in [lookup for lookup, _, _ in ordering]:
+        # Break ties in the direction of the last column so the index scan stays one-way
+        ordering.append((model._meta.pk.attname, pk, ordering[-1][2] if ordering else False))
+    return ordering
+
+
+def keyset_filter(ordering, values, reverse):
+    """
+    Select the rows after ``values`` in ``ordering`` (before them when ``reverse``).
+
+    Expands to ``a > x OR (a = x AND b > y) OR ...`` with the comparison
+    flipped for descending columns, plus a redundant bound on the leading
+    column so the database can start a range scan on the index.
+    """
+    condition = Q()
+    equal = Q()
+    for (lookup, field, descending), value in zip(ordering, values):
+        operator = 'lt' if descending != reverse else 'gt'
+        condition |= equal & Q(**{f'{lookup}__{operator}': value})
+        equal &= Q(**{lookup: value})
+
+    lookup, field, descending = ordering[0]
+    bound = 'lte' if descending != reverse else 'gte'
+    return Q(**{f'{lookup}__{bound}': values[0]}) & condition
+
+
+def _resolve(model, name):
+    """Resolve an ordering term to a column lookup and its model field"""
+    if name == 'pk':
+        name = model._meta.pk.name
+    parts = name.split('__')
+    lookup = []
+    field = None
+    for index, part in enumerate(parts):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            raise ValidationError({'ordering': f'Keyset paging cannot order by unknown field "{name}".'})
+        if not field.concrete or field.many_to_many or getattr(field, 'null', False):
+            raise ValidationError({
+                'ordering': f'Keyset paging cannot order by nullable or multi-valued "{name}".'
+            })
+        last = index == len(parts) - 1
+        if field.is_relation and last:
+            # Order by the foreign key column, not the related model's Meta.ordering
+            lookup.append(field.attname)
+            while field.is_relation:
+                field = field.target_field
+        else:
+            lookup.append(part)
+            if field.is_relation:
+                model = field.related_model
+    return '__'.join(lookup), field
+
+
+def _row_value(row, path):
+    for attr in path:
+        row = getattr(row, attr)
+    return row
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        # isoformat keeps microseconds, which DjangoJSONEncoder would truncate
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    return value
@@ -59,6 +59,7 @@ INSTALLED_APPS = [
     'parent',
     'admission_office',
     'finance',
+    'jobs',
 ]
 
 MIDDLEWARE = [
@@ -146,6 +147,15 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded and generated files (e.g. transcript batches)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = os.getenv('MEDIA_ROOT', BASE_DIR / 'media')
+
+# TrueType font (.ttf) embedded in transcript PDFs, e.g. Noto Sans Bengali;
+# it must cover every script in student names and subjects. When unset the
+# built-in Helvetica is used, which only covers Latin-1 (see student/transcript_pdf.py)
+TRANSCRIPT_FONT = os.getenv('TRANSCRIPT_FONT', '')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -162,7 +172,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'eschool.pagination.SchoolPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -171,6 +181,57 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Cache: local memory by default, Redis when REDIS_URL is set
+# (e.g. REDIS_URL=redis://localhost:6379/1)
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'eschool',
+        }
+    }
+
+# Seconds a cached dashboard response is kept (see eschool/cache.py)
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', '300'))
+
+# Days of room occupancy each process keeps for the free-room search, and
+# for how many seconds at most (see classroom/occupancy.py)
+ROOM_OCCUPANCY_CACHE_DAYS = int(os.getenv('ROOM_OCCUPANCY_CACHE_DAYS', '31'))
+ROOM_OCCUPANCY_CACHE_TIMEOUT = int(os.getenv('ROOM_OCCUPANCY_CACHE_TIMEOUT', str(RESPONSE_CACHE_TIMEOUT)))
+
+# Academic year whose class schedules are in force, e.g. 2025-26; when unset
+# the latest year with active schedules is used (see classroom/conflicts.py)
+CURRENT_ACADEMIC_YEAR = os.getenv('CURRENT_ACADEMIC_YEAR', '')
+
+# Seconds a precomputed "my schedule" timetable is kept (see classroom/schedules.py)
+SCHEDULE_CACHE_TIMEOUT = int(os.getenv('SCHEDULE_CACHE_TIMEOUT', str(24 * 60 * 60)))
+
+# Late fee added when the overdue sweep (finance/overdue.py) moves a pending
+# payment to overdue: a flat amount plus a percentage of the payment amount
+PAYMENT_LATE_FEE = os.getenv('PAYMENT_LATE_FEE', '0')
+PAYMENT_LATE_FEE_RATE = os.getenv('PAYMENT_LATE_FEE_RATE', '0')
+
+# Background jobs (see jobs/queue.py): 'db' queues them in the jobs table for
+# `manage.py run_jobs`; 'celery' hands them to `celery -A eschool worker`
+JOBS_BACKEND = os.getenv('JOBS_BACKEND', 'db')
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', REDIS_URL or 'redis://localhost:6379/0')
+CELERY_TASK_ACKS_LATE = True
+# Seconds between a running job's heartbeats, seconds without one after which
+# the job is claimed again, and how many times a job is picked up before it
+# is failed
+JOBS_HEARTBEAT_INTERVAL = int(os.getenv('JOBS_HEARTBEAT_INTERVAL', '60'))
+JOBS_STALE_AFTER = int(os.getenv('JOBS_STALE_AFTER', str(60 * 60)))
+JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', '3'))
+
 # JWT Configuration
 from datetime import timedelta
 
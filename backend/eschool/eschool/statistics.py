@@ -0,0 +1,70 @@
+"""
+Shared helper for the ``statistics`` actions of the API viewsets.
+
+Every scalar figure of an endpoint (totals, filtered counts, sums and
+averages) is collected into one ``aggregate()`` call using conditional
+aggregation, and every group-by breakdown is answered from a single
+grouped query that is rolled up per dimension in Python. A statistics
+endpoint therefore costs at most two queries regardless of how many
+figures it reports.
+"""
+from django.db.models import Count, Q
+
+
+class StatisticsBuilder:
+    """Collect the figures of a statistics endpoint and compute them in bulk"""
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+        self._scalars = {}
+        self._groups = {}
+        self._order = []
+
+    def count(self, name, *args, **filters):
+        """Count rows, optionally restricted by ``Q`` objects or field lookups"""
+        condition = Q(*args, **filters)
+        if condition:
+            return self.aggregate(name, Count('pk', filter=condition))
+        return self.aggregate(name, Count('pk'))
+
+    def aggregate(self, name, expression):
+        """Add an arbitrary aggregate expression (``Sum``, ``Avg``, ...)"""
+        self._scalars[name] = expression
+        self._order.append(name)
+        return self
+
+    def group_by(self, name, field):
+        """
+        Add a ``[{field: value, 'count': n}, ...]`` breakdown.
+
+        ``field`` must be single-valued per row (a column or a forward
+        foreign-key path), since all breakdowns share one grouped query.
+        """
+        self._groups[name] = field
+        self._order.append(name)
+        return self
+
+    def build(self):
+        """Run the queries and return the figures in registration order"""
+        results = {}
+
+        if self._scalars:
+            results.update(self.queryset.aggregate(**self._scalars))
+
+        if self._groups:
+            fields = list(dict.fromkeys(self._groups.values()))
+            rows = self.queryset.order_by().values(*fields).annotate(count=Count('pk'))
+
+            rollup = {field: {} for field in fields}
+            for row in rows:
+                for field in fields:
+                    value = row[field]
+                    rollup[field][value] = rollup[field].get(value, 0) + row['count']
+
+            for name, field in self._groups.items():
+                results[name] = [
+                    {field: value, 'count': count}
+                    for value, count in rollup[field].items()
+                ]
+
+        return {name: results[name] for name in self._order}
@@ -0,0 +1,119 @@
+"""
+Test helpers shared by the app test suites.
+"""
+import datetime
+import time
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.models import User
+
+
+class QueryBudgetTestCase(TestCase):
+    """Base class for tests that pin how many queries an endpoint may run"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='budget@example.com',
+            username='budget',
+            password='budget-pass',
+            first_name='Query',
+            last_name='Budget',
+        )
+
+    def setUp(self):
+        # Cached responses must not leak between tests
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertQueryBudget(self, url, budget, method='get', data=None):
+        """Request ``url`` and fail if it runs more than ``budget`` queries"""
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, format='json')
+        self.assertLess(response.status_code, 400, getattr(response, 'data', response))
+        executed = [query['sql'] for query in queries.captured_queries]
+        self.assertLessEqual(
+            len(executed), budget,
+            f"{url} ran {len(executed)} queries (budget {budget}):\n" + "\n".join(executed)
+        )
+        return response
+
+    def assertResponseTime(self, url, seconds, method='get', data=None):
+        """Request ``url`` and fail if it takes longer than ``seconds`` to answer"""
+        started = time.perf_counter()
+        response = getattr(self.client, method)(url, data, format='json')
+        elapsed = time.perf_counter() - started
+        self.assertLess(response.status_code, 400, getattr(response, 'data', response))
+        self.assertLessEqual(elapsed, seconds, f"{url} took {elapsed:.3f}s (limit {seconds}s)")
+        return response
+
+
+class SchoolQueryBudgetTestCase(QueryBudgetTestCase):
+    """
+    Query budget tests that run against a small populated school.
+
+    Every relation a serializer renders is filled in for several rows, so
+    a list endpoint that loads relations one row at a time goes over
+    budget as soon as the page holds more than one object.
+    """
+
+    rows = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from department.models import Department
+        from employee.models import Employee
+        from teacher.models import Teacher
+        from subject.models import Subject
+        from level.models import Level, Section
+        from classroom.models import Class
+        from student.models import Student
+
+        today = datetime.date(2025, 1, 1)
+        cls.department = Department.objects.create(d_name='Science', location='Block A')
+        cls.rooms = [
+            Class.objects.create(floor=1, room_no=str(i), capacity=30)
+            for i in range(cls.rows)
+        ]
+        cls.employees = [
+            Employee.objects.create(
+                name=f'Employee {i}', email=f'employee{i}@example.com', phone='0100',
+                position='Teacher', role='teacher', join_date=today,
+                department=cls.department, salary=Decimal('1000'),
+            )
+            for i in range(cls.rows)
+        ]
+        cls.teachers = [
+            Teacher.objects.create(teacher_id=employee, qualification='BSc', specialization='Science')
+            for employee in cls.employees
+        ]
+        cls.subjects = [
+            Subject.objects.create(s_code=f'SUB{i}', s_name=f'Subject {i}', department=cls.department)
+            for i in range(cls.rows)
+        ]
+        cls.level = Level.objects.create(level_no=1, level_name='Grade 1', level_type='elementary')
+        cls.sections = [
+            Section.objects.create(
+                level=cls.level, sec_no=chr(ord('A') + i), section_name=f'Grade 1-{i}',
+                room=cls.rooms[i], class_teacher=cls.teachers[i],
+            )
+            for i in range(cls.rows)
+        ]
+        cls.students = [
+            Student.objects.create(
+                student_number=f'STU{i:03}', name=f'Student {i}', email=f'student{i}@example.com',
+                gender='male', date_of_birth=datetime.date(2015, 1, 1), enroll_date=today,
+                address='Street', level=cls.level, section=cls.sections[i],
+                department=cls.department, emergency_contact_name='Guardian',
+                emergency_contact_phone='0100',
+            )
+            for i in range(cls.rows)
+        ]
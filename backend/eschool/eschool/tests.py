@@ -0,0 +1,126 @@
+import datetime
+from decimal import Decimal
+
+from eschool.testing import SchoolQueryBudgetTestCase
+
+
+# The statistics actions built on eschool.statistics.StatisticsBuilder
+STATISTICS_URLS = [
+    '/api/students/statistics/',
+    '/api/employees/statistics/',
+    '/api/teachers/statistics/',
+    '/api/classes/statistics/',
+    '/api/subjects/statistics/',
+    '/api/parents/statistics/',
+    '/api/events/statistics/',
+    '/api/exams/statistics/',
+    '/api/exam-results/statistics/',
+    '/api/admissions/statistics/',
+    '/api/attendance/statistics/?start_date=2024-09-01&end_date=2025-06-30',
+]
+
+
+class StatisticsEndpointTests(SchoolQueryBudgetTestCase):
+    """Statistics endpoints answer a populated school with one aggregate and one grouped query"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from admission_office.models import Admission, Attendance, Exam, ExamResult
+        from events.models import Event
+        from parent.models import Parent
+
+        for student, birth_year in zip(cls.students, (2013, 2015, 2016)):
+            student.date_of_birth = datetime.date(birth_year, 6, 1)
+            student.save()
+        for employee, join_year in zip(cls.employees, (2020, 2025, 2025)):
+            employee.join_date = datetime.date(join_year, 3, 1)
+            employee.save()
+        for teacher, experience in zip(cls.teachers, (2, 4, 5)):
+            teacher.years_of_experience = experience
+            teacher.is_class_teacher = experience > 2
+            teacher.save()
+        cls.rooms[0].capacity = 40
+        cls.rooms[0].save()
+
+        for i, occupation in enumerate(('employed', 'employed', 'self_employed')):
+            Parent.objects.create(
+                name=f'Parent {i}', email=f'statistics-parent{i}@example.com', phone='0100',
+                gender='female' if i else 'male', occupation=occupation, address='Street',
+                is_primary_contact=i == 0,
+            )
+        exam = Exam.objects.create(
+            exam_name='Quiz', exam_type='quiz', subject=cls.subjects[0], level=cls.level,
+            duration=datetime.timedelta(hours=1), total_marks=100, passing_marks=40,
+            exam_date=datetime.date(2025, 3, 1), start_time=datetime.time(9),
+            end_time=datetime.time(10), academic_year='2025', status='completed',
+        )
+        for student, marks in zip(cls.students, (90, 30, 61)):
+            ExamResult.objects.create(exam=exam, student=student, marks_obtained=marks)
+        Event.objects.create(
+            name='Sports Day', event_type='sports', description='Annual sports day',
+            location='Field', start_date=datetime.date(2025, 5, 1), end_date=datetime.date(2025, 5, 1),
+            start_time=datetime.time(9), end_time=datetime.time(15),
+            duration=datetime.timedelta(hours=6), department=cls.department,
+            organizer=cls.employees[0], budget=Decimal('250'), status='completed',
+        )
+        for i, student in enumerate(cls.students):
+            Attendance.objects.create(
+                student=student, subject=cls.subjects[0], class_room=cls.rooms[0],
+                date=datetime.date(2025, 1, 2), teacher=cls.employees[0],
+                status='present' if i else 'absent',
+            )
+            Admission.objects.create(
+                student_name=f'Applicant {i}', date_of_birth=datetime.date(2015, 1, 1),
+                gender='male', parent_name='Parent', parent_email='parent@example.com',
+                parent_phone='0100', address='Street', level_applying_for=cls.level,
+                processed_by=cls.employees[i], status='approved' if i else 'pending',
+            )
+
+    def test_statistics_query_budget(self):
+        for url in STATISTICS_URLS:
+            with self.subTest(url=url):
+                self.assertQueryBudget(url, 2)
+
+    def test_average_age_and_years_of_service(self):
+        this_year = datetime.date.today().year
+        # The difference in calendar years, averaged: birth years 2013, 2015 and 2016
+        students = self.client.get('/api/students/statistics/').data
+        self.assertEqual(students['average_age'], round(this_year - (2013 + 2015 + 2016) / 3, 2))
+        self.assertEqual((students['total_students'], students['active_students']), (3, 3))
+        self.assertEqual(students['by_level'], [{'level__level_name': 'Grade 1', 'count': 3}])
+
+        employees = self.client.get('/api/employees/statistics/').data
+        self.assertEqual(employees['average_years_of_service'], round(this_year - (2020 + 2025 + 2025) / 3, 2))
+        self.assertEqual(employees['by_department'], [{'department__d_name': 'Science', 'count': 3}])
+
+    def test_statistics_values(self):
+        teachers = self.client.get('/api/teachers/statistics/').data
+        self.assertEqual((teachers['class_teachers'], teachers['average_experience']), (2, 3.67))
+
+        rooms = self.client.get('/api/classes/statistics/').data
+        self.assertEqual((rooms['total_capacity'], rooms['average_capacity']), (100, 33.33))
+
+        parents = self.client.get('/api/parents/statistics/').data
+        self.assertEqual((parents['total_parents'], parents['primary_contacts']), (3, 1))
+        self.assertEqual(
+            sorted(parents['by_occupation'], key=lambda row: row['occupation']),
+            [{'occupation': 'employed', 'count': 2}, {'occupation': 'self_employed', 'count': 1}]
+        )
+
+        exams = self.client.get('/api/exams/statistics/').data
+        self.assertEqual((exams['total_exams'], exams['completed_exams']), (1, 1))
+        results = self.client.get('/api/exam-results/statistics/').data
+        self.assertEqual((results['passed_count'], results['failed_count']), (2, 1))
+        self.assertEqual(results['average_marks'], 60.33)
+
+        events = self.client.get('/api/events/statistics/').data
+        self.assertEqual((events['completed_events'], events['total_budget']), (1, Decimal('250.00')))
+
+        admissions = self.client.get('/api/admissions/statistics/').data
+        self.assertEqual(
+            (admissions['pending_applications'], admissions['approved_applications']), (1, 2)
+        )
+
+        attendance = self.client.get(STATISTICS_URLS[-1]).data
+        self.assertEqual((attendance['total_records'], attendance['present_percentage']), (3, 66.67))
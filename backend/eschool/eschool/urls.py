@@ -30,10 +30,12 @@ from student.views import StudentViewSet, StudentParentViewSet, StudentActivityV
 from level.views import LevelViewSet, SectionViewSet, LevelSubjectViewSet, SectionSubjectViewSet
 from subject.views import SubjectViewSet, SubjectSyllabusViewSet, SubjectMaterialViewSet
 from classroom.views import ClassViewSet, ClassScheduleViewSet, ClassBookingViewSet
-from parent.views import ParentViewSet, PaymentViewSet, PaymentHistoryViewSet
+from parent.views import ParentViewSet, PaymentViewSet, PaymentHistoryViewSet, FeeScheduleViewSet
 from events.views import EventViewSet, EventParticipantViewSet, EventResourceViewSet
 from admission_office.views import ExamViewSet, ExamResultViewSet, AttendanceViewSet, AdmissionViewSet
 from finance.views import FinancialTransactionViewSet, FinancialSummaryViewSet, BudgetViewSet
+from jobs.views import JobViewSet
+from .views import CacheStatsView
 
 # Create router and register viewsets
 router = DefaultRouter()
@@ -82,6 +84,7 @@ router.register(r'class-bookings', ClassBookingViewSet)
 router.register(r'parents', ParentViewSet)
 router.register(r'payments', PaymentViewSet)
 router.register(r'payment-history', PaymentHistoryViewSet)
+router.register(r'fee-schedules', FeeScheduleViewSet)
 
 # Event routes
 router.register(r'events', EventViewSet)
@@ -99,6 +102,9 @@ router.register(r'financial-transactions', FinancialTransactionViewSet)
 router.register(r'financial-summaries', FinancialSummaryViewSet)
 router.register(r'budgets', BudgetViewSet)
 
+# Background job routes
+router.register(r'jobs', JobViewSet)
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     
@@ -110,6 +116,8 @@ urlpatterns = [
     path('api/payments/monthly/<uuid:student_id>/<int:year>/<int:month>/', PaymentViewSet.as_view({'get': 'monthly'}), name='payment-monthly'),
     
     # Authentication routes
+    path('api/cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
+    
     path('api/auth/', include('accounts.urls')),
     
     # API documentation
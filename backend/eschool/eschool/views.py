@@ -0,0 +1,11 @@
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .cache import cache_stats
+
+
+class CacheStatsView(APIView):
+    """Hit/miss counters of the response cache"""
+
+    def get(self, request):
+        return Response(cache_stats())
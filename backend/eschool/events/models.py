@@ -1,6 +1,18 @@
 from django.db import models
 from django.core.validators import MinLengthValidator
 
+from eschool.annotations import related_count
+
+
+class EventQuerySet(models.QuerySet):
+    """Queryset for Event with annotated counts"""
+
+    def with_counts(self):
+        """Annotate the values read by ``participant_count`` and ``is_full``"""
+        return self.annotate(
+            _participant_count=related_count(self.model, 'participants'),
+        )
+
 
 class Event(models.Model):
     """Event model for school events and activities"""
@@ -128,6 +140,8 @@ class Event(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = EventQuerySet.as_manager()
+    
     class Meta:
         db_table = 'events'
         ordering = ['start_date', 'start_time']
@@ -158,6 +172,8 @@ class Event(models.Model):
     @property
     def participant_count(self):
         """Return number of registered participants"""
+        if hasattr(self, '_participant_count'):
+            return self._participant_count
         return self.participants.count()
     
     @property
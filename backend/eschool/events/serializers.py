@@ -61,6 +61,7 @@ class EventParticipantSerializer(serializers.ModelSerializer):
             'notes'
         ]
         read_only_fields = ['id', 'registration_date']
+        related_paths = ['student', 'employee', 'parent']
     
     def get_participant_name(self, obj):
         """Get participant name based on type"""
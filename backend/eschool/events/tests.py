@@ -1,3 +1,33 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from eschool.testing import SchoolQueryBudgetTestCase
+
+
+class EventParticipantListQueryTests(SchoolQueryBudgetTestCase):
+    """List and detail endpoints load related rows up-front"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from events.models import Event, EventParticipant
+
+        cls.event = Event.objects.create(
+            name='Sports Day', event_type='sports', description='Annual sports day',
+            location='Field', start_date=datetime.date(2025, 5, 1), end_date=datetime.date(2025, 5, 1),
+            start_time=datetime.time(9), end_time=datetime.time(15),
+            duration=datetime.timedelta(hours=6), department=cls.department,
+            organizer=cls.employees[0],
+        )
+        for student in cls.students:
+            EventParticipant.objects.create(event=cls.event, participant_type='student', student=student)
+        for employee in cls.employees:
+            EventParticipant.objects.create(event=cls.event, participant_type='employee', employee=employee)
+
+    def test_event_participant_list_query_budget(self):
+        self.assertQueryBudget('/api/event-participants/', 2)
+
+    def test_event_detail_query_budget(self):
+        self.assertQueryBudget(f'/api/events/{self.event.pk}/', 5)
+
+    def test_event_list_query_budget(self):
+        self.assertQueryBudget('/api/events/', 2)
@@ -3,6 +3,8 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
+from eschool.mixins import RelatedFieldsMixin
+from eschool.statistics import StatisticsBuilder
 from .models import Event, EventParticipant, EventResource
 from .serializers import (
     EventSerializer, EventDetailSerializer, EventListSerializer,
@@ -10,10 +12,10 @@ from .serializers import (
 )
 
 
-class EventViewSet(viewsets.ModelViewSet):
+class EventViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for Event model"""
     
-    queryset = Event.objects.all()
+    queryset = Event.objects.with_counts()
     serializer_class = EventSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['event_type', 'status', 'department', 'is_public']
@@ -70,7 +72,7 @@ class EventViewSet(viewsets.ModelViewSet):
         """Get upcoming events"""
         from datetime import date
         today = date.today()
-        upcoming_events = Event.objects.filter(
+        upcoming_events = Event.objects.with_counts().filter(
             start_date__gte=today, status__in=['planned', 'confirmed']
         )
         serializer = EventListSerializer(upcoming_events, many=True)
@@ -79,7 +81,7 @@ class EventViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def ongoing(self, request):
         """Get ongoing events"""
-        ongoing_events = Event.objects.filter(status='ongoing')
+        ongoing_events = Event.objects.with_counts().filter(status='ongoing')
         serializer = EventListSerializer(ongoing_events, many=True)
         return Response(serializer.data)
     
@@ -108,27 +110,28 @@ class EventViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Get event statistics"""
-        from django.db.models import Count, Sum
+        from django.db.models import Sum
         from datetime import date
         
         today = date.today()
         
-        stats = {
-            'total_events': Event.objects.count(),
-            'upcoming_events': Event.objects.filter(
-                start_date__gte=today, status__in=['planned', 'confirmed']
-            ).count(),
-            'ongoing_events': Event.objects.filter(status='ongoing').count(),
-            'completed_events': Event.objects.filter(status='completed').count(),
-            'by_type': list(Event.objects.values('event_type').annotate(count=Count('id'))),
-            'by_department': list(Event.objects.values('department__d_name').annotate(count=Count('id'))),
-            'by_status': list(Event.objects.values('status').annotate(count=Count('id'))),
-            'total_budget': Event.objects.aggregate(Sum('budget'))['budget__sum'] or 0,
-        }
+        stats = (
+            StatisticsBuilder(Event.objects.all())
+            .count('total_events')
+            .count('upcoming_events', start_date__gte=today, status__in=['planned', 'confirmed'])
+            .count('ongoing_events', status='ongoing')
+            .count('completed_events', status='completed')
+            .group_by('by_type', 'event_type')
+            .group_by('by_department', 'department__d_name')
+            .group_by('by_status', 'status')
+            .aggregate('total_budget', Sum('budget'))
+            .build()
+        )
+        stats['total_budget'] = stats['total_budget'] or 0
         return Response(stats)
 
 
-class EventParticipantViewSet(viewsets.ModelViewSet):
+class EventParticipantViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for EventParticipant model"""
     
     queryset = EventParticipant.objects.all()
@@ -140,7 +143,7 @@ class EventParticipantViewSet(viewsets.ModelViewSet):
     ordering = ['-registration_date']
 
 
-class EventResourceViewSet(viewsets.ModelViewSet):
+class EventResourceViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for EventResource model"""
     
     queryset = EventResource.objects.all()
@@ -0,0 +1,20 @@
+import datetime
+
+from jobs.queue import register
+
+from .overdue import sweep_overdue
+from .serializers import FinancialSummarySerializer
+from .summaries import generate_period_summary
+
+
+@register('finance.generate_summary')
+def generate_summary(period_type='monthly', year=None, month=None):
+    """Rebuild one period's summary from the ledger"""
+    summary, created = generate_period_summary(period_type, year, month)
+    return {'created': created, 'summary': FinancialSummarySerializer(summary).data}
+
+
+@register('finance.sweep_overdue')
+def sweep_overdue_job(today=None):
+    """Move past-due pending payments and salaries to overdue"""
+    return sweep_overdue(datetime.date.fromisoformat(today) if today else None)
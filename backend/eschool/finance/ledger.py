@@ -0,0 +1,178 @@
+"""
+Posting paid payments and salaries to the FinancialTransaction ledger.
+
+``post_payments`` and ``post_salaries`` take any number of rows and post
+the paid ones that have no ledger entry yet: the existing entries of the
+whole batch are found with one query on ``(reference_type,
+reference_id)``, the student or employee names for the descriptions with
+one more (skipped when the relation is already loaded), and the missing
+entries are written with one ``bulk_create``. Because ``bulk_create``
+sends no signals, the summaries are updated here with a single
+``apply_transactions`` call.
+
+The post-save signals call them with one row; bulk writers that bypass
+the signals call them once with everything they marked paid (see
+``mark_payments_paid``/``mark_salaries_paid``, which only move pending,
+overdue and partial rows), and ``post_unposted`` sweeps the whole
+ledger for rows written around both.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from eschool.cache import invalidate
+from employee.models import Employee, EmployeeSalary
+from parent.models import Payment
+from student.models import Student
+
+from .models import FinancialTransaction
+from .summaries import SUMMARY_FIELDS, apply_transactions
+
+
+BATCH_SIZE = 1000
+
+# Statuses a bulk mark-paid may move to paid; cancelled, refunded and
+# on-hold rows are reported back instead
+PAYABLE_STATUSES = ('pending', 'overdue', 'partial')
+
+
+def _unposted(rows, reference_type):
+    """Return the paid ``rows`` without a ledger entry, once each"""
+    rows = list({row.pk: row for row in rows}.values())
+    if not rows:
+        return []
+    posted = set(
+        FinancialTransaction.objects.filter(
+            reference_type=reference_type, reference_id__in=[str(row.pk) for row in rows]
+        ).order_by().values_list('reference_id', flat=True)
+    )
+    return [row for row in rows if str(row.pk) not in posted]
+
+
+def _names(rows, descriptor, model, attname):
+    """Map the related object's pk to its name, loading only the relations not already cached"""
+    names = {
+        getattr(row, attname): getattr(row, descriptor.field.name).name
+        for row in rows if descriptor.is_cached(row)
+    }
+    missing = {getattr(row, attname) for row in rows} - set(names)
+    if missing:
+        names.update(model.objects.filter(pk__in=missing).values_list('pk', 'name'))
+    return names
+
+
+def _post(entries):
+    if not entries:
+        return entries
+    with transaction.atomic():
+        FinancialTransaction.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+        apply_transactions([
+            ({field: getattr(entry, field) for field in SUMMARY_FIELDS}, 1) for entry in entries
+        ])
+    invalidate(FinancialTransaction)
+    return entries
+
+
+def post_payments(payments):
+    """Post the paid ``payments`` that are not in the ledger yet; return the new entries"""
+    payments = _unposted(
+        [payment for payment in payments if payment.status == 'paid' and payment.payment_date],
+        'payment'
+    )
+    names = _names(payments, Payment.student, Student, 'student_id')
+    return _post([
+        FinancialTransaction(
+            transaction_type='revenue',
+            category='student_fees',
+            amount=payment.total_amount,
+            description=f"Student fee payment - {payment.get_payment_type_display()} - {names.get(payment.student_id)}",
+            transaction_date=payment.payment_date,
+            payment_method=payment.payment_method,
+            reference_id=str(payment.pay_id),
+            reference_type='payment',
+            notes=payment.description,
+        )
+        for payment in payments
+    ])
+
+
+def post_salaries(salaries):
+    """Post the paid ``salaries`` that are not in the ledger yet; return the new entries"""
+    salaries = _unposted(
+        [salary for salary in salaries if salary.status == 'paid' and salary.paid_date],
+        'salary'
+    )
+    names = _names(salaries, EmployeeSalary.employee, Employee, 'employee_id')
+    return _post([
+        FinancialTransaction(
+            transaction_type='expense',
+            category='salaries',
+            amount=salary.net_salary,
+            description=f"Salary payment - {names.get(salary.employee_id)} ({salary.month})",
+            transaction_date=salary.paid_date,
+            payment_method='bank_transfer',  # Default for salaries
+            reference_id=str(salary.sal_id),
+            reference_type='salary',
+            notes=salary.notes,
+        )
+        for salary in salaries
+    ])
+
+
+def _mark_paid(model, ids, values, related, post):
+    """Mark the payable rows among ``ids`` paid with one UPDATE and post them in one batch"""
+    ids = list(dict.fromkeys(ids))
+    with transaction.atomic():
+        found = dict(model.objects.filter(pk__in=ids).select_for_update().values_list('pk', 'status'))
+        unpaid = [pk for pk, status in found.items() if status in PAYABLE_STATUSES]
+        if unpaid:
+            model.objects.filter(pk__in=unpaid).update(status='paid', updated_at=timezone.now(), **values)
+        entries = post(model.objects.filter(pk__in=unpaid).select_related(related))
+    invalidate(model)
+    return {
+        'marked_paid': len(unpaid),
+        'already_paid': sum(1 for status in found.values() if status == 'paid'),
+        'ledger_entries': len(entries),
+        'not_found': [pk for pk in ids if pk not in found],
+        'skipped': [
+            {'id': pk, 'status': found[pk]}
+            for pk in ids if pk in found and found[pk] not in PAYABLE_STATUSES + ('paid',)
+        ],
+    }
+
+
+def mark_payments_paid(ids, payment_date=None, payment_method=None):
+    """Mark payments paid in bulk and post them to the ledger"""
+    values = {'payment_date': payment_date or timezone.now().date()}
+    if payment_method:
+        values['payment_method'] = payment_method
+    return _mark_paid(Payment, ids, values, 'student', post_payments)
+
+
+def mark_salaries_paid(ids, paid_date=None):
+    """Mark salaries paid in bulk and post them to the ledger"""
+    return _mark_paid(
+        EmployeeSalary, ids, {'paid_date': paid_date or timezone.now().date()}, 'employee', post_salaries
+    )
+
+
+def _in_batches(queryset):
+    last = None
+    while True:
+        batch = queryset if last is None else queryset.filter(pk__gt=last)
+        batch = list(batch.order_by('pk')[:BATCH_SIZE])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1].pk
+
+
+def post_unposted():
+    """Post every paid payment and salary missing from the ledger, in batches"""
+    posted = {'payments': 0, 'salaries': 0}
+    paid_payments = Payment.objects.filter(status='paid', payment_date__isnull=False).select_related('student')
+    for batch in _in_batches(paid_payments):
+        posted['payments'] += len(post_payments(batch))
+    paid_salaries = EmployeeSalary.objects.filter(status='paid', paid_date__isnull=False).select_related('employee')
+    for batch in _in_batches(paid_salaries):
+        posted['salaries'] += len(post_salaries(batch))
+    return posted
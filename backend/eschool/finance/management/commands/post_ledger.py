@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from finance.ledger import post_unposted
+
+
+class Command(BaseCommand):
+    help = 'Post paid payments and salaries that are missing from the financial transaction ledger'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        posted = post_unposted()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Posted {posted['payments']} payments and {posted['salaries']} salaries "
+                f"to the ledger in {elapsed:.2f}s"
+            )
+        )
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finance.summaries import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = 'Recompute the monthly and yearly financial summaries from the transaction ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Only rebuild this year')
+        parser.add_argument('--month', type=int, help='Only rebuild this month (requires --year)')
+
+    def handle(self, *args, **options):
+        year, month = options['year'], options['month']
+        if month is not None and year is None:
+            raise CommandError('--month requires --year')
+        if month is not None and not 1 <= month <= 12:
+            raise CommandError('--month must be between 1 and 12')
+
+        started = time.perf_counter()
+        written = rebuild_summaries(year, month)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {written} financial summaries in {elapsed:.2f}s')
+        )
@@ -0,0 +1,36 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finance.overdue import sweep_overdue
+
+
+class Command(BaseCommand):
+    help = 'Move past-due pending payments and salaries to overdue and apply late fees (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Sweep as of this date (YYYY-MM-DD, default: today)')
+        parser.add_argument('--late-fee', help='Flat late fee (default: PAYMENT_LATE_FEE)')
+        parser.add_argument('--late-fee-rate', help='Late fee percentage of the amount (default: PAYMENT_LATE_FEE_RATE)')
+
+    def handle(self, *args, **options):
+        try:
+            today = datetime.date.fromisoformat(options['date']) if options['date'] else None
+        except ValueError:
+            raise CommandError('--date must be YYYY-MM-DD')
+
+        started = time.perf_counter()
+        try:
+            moved = sweep_overdue(today, options['late_fee'], options['late_fee_rate'])
+        except ArithmeticError:
+            raise CommandError('--late-fee and --late-fee-rate must be numbers')
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Marked {moved['payments']} payments, {moved['installments']} installments "
+                f"and {moved['salaries']} salaries overdue "
+                f"(late fee {moved['late_fee']} + {moved['late_fee_rate']}%) in {elapsed:.2f}s"
+            )
+        )
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0002_rename_financial__period__6a9d4b_idx_financial_s_period__d6fcf2_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='financialtransaction',
+            index=models.Index(fields=['-transaction_date', '-created_at', '-transaction_id'], name='fin_txn_keyset_idx'),
+        ),
+    ]
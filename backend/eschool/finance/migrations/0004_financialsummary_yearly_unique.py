@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:58
+
+from django.db import migrations, models
+
+
+AMOUNT_FIELDS = [
+    'total_revenue', 'total_expenses', 'net_profit',
+    'student_fees_revenue', 'salary_expenses', 'operational_expenses', 'transaction_count',
+]
+
+
+def merge_duplicate_yearly_summaries(apps, schema_editor):
+    """Fold yearly rows created twice by concurrent writers into the oldest one"""
+    FinancialSummary = apps.get_model('finance', 'FinancialSummary')
+    kept = {}
+    for summary in FinancialSummary.objects.filter(month__isnull=True).order_by('summary_id'):
+        key = (summary.period_type, summary.year)
+        if key not in kept:
+            kept[key] = summary
+            continue
+        # Each copy received part of the year's changes, so they add up
+        for field in AMOUNT_FIELDS:
+            setattr(kept[key], field, getattr(kept[key], field) + getattr(summary, field))
+        kept[key].save(update_fields=AMOUNT_FIELDS)
+        summary.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0003_financialtransaction_fin_txn_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_yearly_summaries, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='financialsummary',
+            constraint=models.UniqueConstraint(condition=models.Q(('month__isnull', True)), fields=('period_type', 'year'), name='fin_summary_yearly_uniq'),
+        ),
+    ]
@@ -0,0 +1,93 @@
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+YEARLY_MONTH = 0
+
+AMOUNT_FIELDS = [
+    'total_revenue', 'total_expenses', 'net_profit',
+    'student_fees_revenue', 'salary_expenses', 'operational_expenses',
+]
+
+LEDGER_SUMS = {
+    'total_revenue': Sum('amount', filter=Q(transaction_type='revenue')),
+    'total_expenses': Sum('amount', filter=Q(transaction_type='expense')),
+    'student_fees_revenue': Sum('amount', filter=Q(transaction_type='revenue', category='student_fees')),
+    'salary_expenses': Sum('amount', filter=Q(transaction_type='expense', category='salaries')),
+    'operational_expenses': Sum(
+        'amount', filter=Q(transaction_type='expense') & ~Q(category='salaries')
+    ),
+    'transaction_count': Count('pk'),
+}
+
+
+def store_yearly_month(apps, schema_editor):
+    """Keep the oldest yearly row per year and give yearly rows the sentinel month"""
+    FinancialSummary = apps.get_model('finance', 'FinancialSummary')
+    seen = set()
+    duplicates = []
+    for summary_id, period_type, year in FinancialSummary.objects.filter(
+        month__isnull=True
+    ).order_by('summary_id').values_list('summary_id', 'period_type', 'year'):
+        if (period_type, year) in seen:
+            duplicates.append(summary_id)
+        seen.add((period_type, year))
+    FinancialSummary.objects.filter(summary_id__in=duplicates).delete()
+    FinancialSummary.objects.filter(month__isnull=True).update(month=YEARLY_MONTH)
+
+
+def clear_yearly_month(apps, schema_editor):
+    FinancialSummary = apps.get_model('finance', 'FinancialSummary')
+    FinancialSummary.objects.filter(period_type='yearly').update(month=None)
+
+
+def rebuild_from_ledger(apps, schema_editor):
+    """Recompute every summary, since yearly rows may have diverged before they were unique"""
+    FinancialSummary = apps.get_model('finance', 'FinancialSummary')
+    FinancialTransaction = apps.get_model('finance', 'FinancialTransaction')
+
+    computed = {}
+    ledger = FinancialTransaction.objects.order_by()
+    groupings = [
+        ('monthly', ['transaction_date__year', 'transaction_date__month']),
+        ('yearly', ['transaction_date__year']),
+    ]
+    for period_type, fields in groupings:
+        for totals in ledger.values(*fields).annotate(**LEDGER_SUMS):
+            amounts = {field: totals[field] or 0 for field in AMOUNT_FIELDS if field != 'net_profit'}
+            amounts['net_profit'] = amounts['total_revenue'] - amounts['total_expenses']
+            amounts['transaction_count'] = totals['transaction_count']
+            period_month = totals.get('transaction_date__month', YEARLY_MONTH)
+            computed[(period_type, totals['transaction_date__year'], period_month)] = amounts
+
+    empty = dict.fromkeys(AMOUNT_FIELDS + ['transaction_count'], 0)
+    existing = list(FinancialSummary.objects.all())
+    for summary in existing:
+        for field, value in computed.pop((summary.period_type, summary.year, summary.month), empty).items():
+            setattr(summary, field, value)
+    FinancialSummary.objects.bulk_update(existing, AMOUNT_FIELDS + ['transaction_count'], batch_size=500)
+    FinancialSummary.objects.bulk_create([
+        FinancialSummary(period_type=period_type, year=year, month=month, **values)
+        for (period_type, year, month), values in computed.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0004_financialsummary_yearly_unique'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='financialsummary',
+            name='fin_summary_yearly_uniq',
+        ),
+        migrations.RunPython(store_yearly_month, clear_yearly_month),
+        migrations.AlterField(
+            model_name='financialsummary',
+            name='month',
+            field=models.PositiveIntegerField(default=0, help_text='Month of the summary (0 for yearly summaries)'),
+        ),
+        migrations.RunPython(rebuild_from_ledger, migrations.RunPython.noop),
+    ]
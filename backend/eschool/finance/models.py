@@ -106,6 +106,11 @@ class FinancialTransaction(models.Model):
             models.Index(fields=['category']),
             models.Index(fields=['transaction_date']),
             models.Index(fields=['reference_type', 'reference_id']),
+            # Keyset pagination over the default ordering (-transaction_date, -created_at, -pk)
+            models.Index(
+                fields=['-transaction_date', '-created_at', '-transaction_id'],
+                name='fin_txn_keyset_idx',
+            ),
         ]
     
     def __str__(self):
@@ -128,6 +133,9 @@ class FinancialSummary(models.Model):
         ('yearly', 'Yearly'),
     ]
     
+    # Stored month of yearly rows, so unique_together covers them on every backend
+    YEARLY_MONTH = 0
+    
     summary_id = models.AutoField(primary_key=True)
     period_type = models.CharField(
         max_length=20,
@@ -138,9 +146,8 @@ class FinancialSummary(models.Model):
         help_text="Year of the summary"
     )
     month = models.PositiveIntegerField(
-        blank=True,
-        null=True,
-        help_text="Month of the summary (for monthly summaries)"
+        default=0,
+        help_text="Month of the summary (0 for yearly summaries)"
     )
     total_revenue = models.DecimalField(
         max_digits=12,
@@ -0,0 +1,138 @@
+"""
+Overdue state for fee payments and salaries.
+
+``sweep_overdue`` moves pending payments, installments and salaries whose
+due date has passed to ``status='overdue'``, so overdue lists, counts and
+balances are plain indexed filters on ``status`` instead of date
+arithmetic in every read. It is meant to run daily (``manage.py
+sweep_overdue`` or the ``finance.sweep_overdue`` job).
+
+A payment split into installments (``PaymentHistory`` rows) is due when
+one of its pending installments is; a payment without installments when
+its own ``due_date`` has passed. Payments are moved with one ``UPDATE``
+per batch that also adds the late fee to ``late_fee`` and
+``total_amount``; when the fee is not zero each moved payment gets a
+``PaymentHistory`` entry recording it, numbered ``LATE_FEE_ENTRY`` so it
+stays out of the installment sequence. The past-due installments of
+pending and overdue payments, and the past-due salaries, are then moved
+with one ``UPDATE`` each. A row is only ever moved once, so running the
+sweep again the same day changes nothing.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DecimalField, Exists, F, OuterRef, Q, Value
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from eschool.cache import invalidate
+from employee.models import EmployeeSalary
+from parent.models import Payment, PaymentHistory
+
+
+BATCH_SIZE = 1000
+
+# installment_number of the PaymentHistory entry recording a late fee
+LATE_FEE_ENTRY = 0
+
+
+def late_fee_settings():
+    """Return the configured flat late fee and the percentage of the amount added to it"""
+    return (
+        Decimal(str(getattr(settings, 'PAYMENT_LATE_FEE', '0'))),
+        Decimal(str(getattr(settings, 'PAYMENT_LATE_FEE_RATE', '0'))),
+    )
+
+
+def late_fee_expression(flat, rate):
+    """Late fee of one payment: ``flat`` plus ``rate`` percent of its amount, to the cent"""
+    money = DecimalField(max_digits=10, decimal_places=2)
+    fraction = DecimalField(max_digits=10, decimal_places=6)
+    return Value(flat, output_field=money) + Round(
+        F('amount') * Value(rate / 100, output_field=fraction), 2, output_field=money
+    )
+
+
+def _sweep_payments(ids, today, flat, rate):
+    fee = late_fee_expression(flat, rate)
+    with transaction.atomic():
+        # The status condition is repeated so a payment settled since the
+        # ids were read is left alone
+        moved = Payment.objects.filter(pk__in=ids, status='pending')
+        moved_ids = list(moved.select_for_update().values_list('pk', flat=True))
+        if not moved_ids:
+            return 0
+        Payment.objects.filter(pk__in=moved_ids).update(
+            status='overdue',
+            late_fee=F('late_fee') + fee,
+            total_amount=F('total_amount') + fee,
+            updated_at=timezone.now(),
+        )
+
+        if flat or rate:
+            fees = Payment.objects.filter(pk__in=moved_ids).annotate(fee=fee).values_list('pk', 'fee')
+            PaymentHistory.objects.bulk_create([
+                PaymentHistory(
+                    payment_id=pk,
+                    installment_number=LATE_FEE_ENTRY,
+                    amount=amount,
+                    due_date=today,
+                    status='overdue',
+                    notes=f'Marked overdue on {today}; late fee {amount} applied',
+                )
+                for pk, amount in fees if amount
+            ])
+    return len(moved_ids)
+
+
+def overdue_filter(date_field, today=None):
+    """
+    Match overdue rows, counting pending rows past ``date_field`` that the sweep has not moved yet.
+
+    Reads use it so figures do not change between a due date passing and
+    the next sweep; ``~overdue_filter(...)`` with ``status='pending'`` is
+    what is still pending and not yet due.
+    """
+    today = today or timezone.now().date()
+    return Q(status='overdue') | Q(status='pending', **{f'{date_field}__lt': today})
+
+
+def _due_payments(today):
+    installments = PaymentHistory.objects.filter(payment=OuterRef('pk')).exclude(installment_number=LATE_FEE_ENTRY)
+    return Payment.objects.filter(status='pending').filter(
+        Exists(installments.filter(status='pending', due_date__lt=today))
+        | (Q(due_date__lt=today) & ~Exists(installments))
+    )
+
+
+def sweep_overdue(today=None, late_fee=None, late_fee_rate=None, batch_size=BATCH_SIZE):
+    """
+    Move past-due pending payments, installments and salaries to ``overdue``.
+
+    ``late_fee``/``late_fee_rate`` override ``PAYMENT_LATE_FEE`` and
+    ``PAYMENT_LATE_FEE_RATE``. Returns the number of rows moved per model.
+    """
+    today = today or timezone.now().date()
+    flat, rate = late_fee_settings()
+    flat = flat if late_fee is None else Decimal(str(late_fee))
+    rate = rate if late_fee_rate is None else Decimal(str(late_fee_rate))
+
+    due = list(_due_payments(today).order_by('pk').values_list('pk', flat=True))
+    payments = 0
+    for offset in range(0, len(due), batch_size):
+        payments += _sweep_payments(due[offset:offset + batch_size], today, flat, rate)
+
+    installments = PaymentHistory.objects.filter(
+        status='pending', due_date__lt=today, payment__status__in=['pending', 'overdue']
+    ).update(status='overdue', updated_at=timezone.now())
+
+    salaries = EmployeeSalary.objects.filter(status='pending', pay_date__lt=today).update(
+        status='overdue', updated_at=timezone.now()
+    )
+
+    invalidate(Payment, PaymentHistory, EmployeeSalary)
+    return {
+        'payments': payments, 'installments': installments, 'salaries': salaries,
+        'late_fee': flat, 'late_fee_rate': rate,
+    }
@@ -47,6 +47,8 @@ class FinancialSummarySerializer(serializers.ModelSerializer):
     
     profit_margin = serializers.ReadOnlyField()
     period_display = serializers.SerializerMethodField()
+    # Yearly rows store FinancialSummary.YEARLY_MONTH but read and write as null
+    month = serializers.IntegerField(required=False, allow_null=True)
     
     class Meta:
         model = FinancialSummary
@@ -78,6 +80,15 @@ class FinancialSummarySerializer(serializers.ModelSerializer):
         if month and (month < 1 or month > 12):
             raise serializers.ValidationError("Month must be between 1 and 12.")
         
+        if period_type == 'yearly':
+            data['month'] = FinancialSummary.YEARLY_MONTH
+        
+        return data
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.period_type == 'yearly':
+            data['month'] = None
         return data
 
 
@@ -1,59 +1,25 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from django.utils import timezone
-from decimal import Decimal
 
 from parent.models import Payment
 from employee.models import EmployeeSalary
 from .models import FinancialTransaction
+from .ledger import post_payments, post_salaries
+from .summaries import SUMMARY_FIELDS, apply_transactions
 
 
 @receiver(post_save, sender=Payment)
-def create_payment_transaction(sender, instance, created, **kwargs):
+def create_payment_transaction(sender, instance, created, raw=False, **kwargs):
     """Create financial transaction when a payment is marked as paid"""
-    if instance.status == 'paid' and instance.payment_date:
-        # Check if transaction already exists
-        existing_transaction = FinancialTransaction.objects.filter(
-            reference_type='payment',
-            reference_id=str(instance.pay_id)
-        ).first()
-        
-        if not existing_transaction:
-            FinancialTransaction.objects.create(
-                transaction_type='revenue',
-                category='student_fees',
-                amount=instance.total_amount,
-                description=f"Student fee payment - {instance.get_payment_type_display()} - {instance.student.name}",
-                transaction_date=instance.payment_date,
-                payment_method=instance.payment_method,
-                reference_id=str(instance.pay_id),
-                reference_type='payment',
-                notes=instance.description
-            )
+    if not raw:
+        post_payments([instance])
 
 
 @receiver(post_save, sender=EmployeeSalary)
-def create_salary_transaction(sender, instance, created, **kwargs):
+def create_salary_transaction(sender, instance, created, raw=False, **kwargs):
     """Create financial transaction when a salary is marked as paid"""
-    if instance.status == 'paid' and instance.paid_date:
-        # Check if transaction already exists
-        existing_transaction = FinancialTransaction.objects.filter(
-            reference_type='salary',
-            reference_id=str(instance.sal_id)
-        ).first()
-        
-        if not existing_transaction:
-            FinancialTransaction.objects.create(
-                transaction_type='expense',
-                category='salaries',
-                amount=instance.net_salary,
-                description=f"Salary payment - {instance.employee.name} ({instance.month})",
-                transaction_date=instance.paid_date,
-                payment_method='bank_transfer',  # Default for salaries
-                reference_id=str(instance.sal_id),
-                reference_type='salary',
-                notes=instance.notes
-            )
+    if not raw:
+        post_salaries([instance])
 
 
 @receiver(post_delete, sender=Payment)
@@ -73,3 +39,30 @@ def delete_salary_transaction(sender, instance, **kwargs):
         reference_id=str(instance.sal_id)
     ).delete()
 
+
+@receiver(pre_save, sender=FinancialTransaction)
+def remember_previous_transaction(sender, instance, raw=False, **kwargs):
+    """Keep the stored values of an edited transaction so its old contribution can be reversed"""
+    instance._summary_previous = None
+    if instance.pk and not raw:
+        instance._summary_previous = FinancialTransaction.objects.filter(
+            pk=instance.pk
+        ).values(*SUMMARY_FIELDS).first()
+
+
+@receiver(post_save, sender=FinancialTransaction)
+def update_summaries_on_save(sender, instance, created, raw=False, **kwargs):
+    """Apply the transaction's contribution to its monthly and yearly summaries"""
+    if raw:
+        return
+    entries = [({field: getattr(instance, field) for field in SUMMARY_FIELDS}, 1)]
+    previous = getattr(instance, '_summary_previous', None)
+    if previous:
+        entries.append((previous, -1))
+    apply_transactions(entries)
+
+
+@receiver(post_delete, sender=FinancialTransaction)
+def update_summaries_on_delete(sender, instance, **kwargs):
+    """Remove a deleted transaction's contribution from its summaries"""
+    apply_transactions([({field: getattr(instance, field) for field in SUMMARY_FIELDS}, -1)])
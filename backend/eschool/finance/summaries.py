@@ -0,0 +1,222 @@
+"""
+Incremental maintenance of the FinancialSummary rows.
+
+Every FinancialTransaction contributes to one monthly and one yearly
+summary. Saving or deleting a transaction applies the difference to
+those two rows with ``F()`` expressions instead of re-scanning the
+ledger, so reads over a date range cost O(months) rather than
+O(transactions). ``rebuild_summaries`` recomputes the rows from scratch
+for data written around the signals (``QuerySet.update``, raw SQL,
+fixtures). It updates the existing rows in place, so a summary keeps its
+``summary_id`` and ``created_at`` across rebuilds.
+"""
+import calendar
+import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from eschool.cache import invalidate
+
+from .models import FinancialTransaction, FinancialSummary
+
+
+ZERO = Decimal('0.00')
+
+# FinancialTransaction fields a summary contribution is computed from
+SUMMARY_FIELDS = ['transaction_type', 'category', 'amount', 'transaction_date']
+
+# FinancialSummary columns maintained from the ledger
+AMOUNT_FIELDS = [
+    'total_revenue', 'total_expenses', 'net_profit',
+    'student_fees_revenue', 'salary_expenses', 'operational_expenses',
+]
+
+# Conditional sums over FinancialTransaction that produce each column
+LEDGER_SUMS = {
+    'total_revenue': Sum('amount', filter=Q(transaction_type='revenue')),
+    'total_expenses': Sum('amount', filter=Q(transaction_type='expense')),
+    'student_fees_revenue': Sum('amount', filter=Q(transaction_type='revenue', category='student_fees')),
+    'salary_expenses': Sum('amount', filter=Q(transaction_type='expense', category='salaries')),
+    'operational_expenses': Sum(
+        'amount', filter=Q(transaction_type='expense') & ~Q(category='salaries')
+    ),
+    'transaction_count': Count('pk'),
+}
+
+
+def transaction_deltas(transaction_type, category, amount):
+    """Return the summary column changes caused by one transaction"""
+    amount = Decimal(str(amount))
+    deltas = dict.fromkeys(AMOUNT_FIELDS, ZERO)
+    if transaction_type == 'revenue':
+        deltas['total_revenue'] = amount
+        deltas['net_profit'] = amount
+        if category == 'student_fees':
+            deltas['student_fees_revenue'] = amount
+    elif transaction_type == 'expense':
+        deltas['total_expenses'] = amount
+        deltas['net_profit'] = -amount
+        if category == 'salaries':
+            deltas['salary_expenses'] = amount
+        else:
+            deltas['operational_expenses'] = amount
+    deltas['transaction_count'] = 1
+    return deltas
+
+
+def period_keys(transaction_date):
+    """Return the (period_type, year, month) keys a transaction date rolls up into"""
+    return [
+        ('monthly', transaction_date.year, transaction_date.month),
+        ('yearly', transaction_date.year, FinancialSummary.YEARLY_MONTH),
+    ]
+
+
+def apply_transactions(entries):
+    """
+    Apply ``(values, sign)`` entries to the summaries.
+
+    ``values`` holds ``transaction_type``, ``category``, ``amount`` and
+    ``transaction_date``; ``sign`` is ``1`` to add a transaction and
+    ``-1`` to remove it. Changes that land on the same period are merged
+    so each touched summary row receives a single UPDATE.
+    """
+    periods = {}
+    for values, sign in entries:
+        deltas = transaction_deltas(values['transaction_type'], values['category'], values['amount'])
+        for key in period_keys(values['transaction_date']):
+            totals = periods.setdefault(key, dict.fromkeys(deltas, 0))
+            for field, delta in deltas.items():
+                totals[field] += sign * delta
+
+    now = timezone.now()
+    with transaction.atomic():
+        for (period_type, year, month), totals in periods.items():
+            if not any(totals.values()):
+                continue
+            summary, _ = FinancialSummary.objects.get_or_create(
+                period_type=period_type, year=year, month=month
+            )
+            FinancialSummary.objects.filter(pk=summary.pk).update(
+                updated_at=now,
+                **{field: F(field) + delta for field, delta in totals.items() if delta}
+            )
+    invalidate(FinancialSummary)
+
+
+def rebuild_summaries(year=None, month=None):
+    """
+    Recompute summaries from the ledger, optionally for one year or month.
+
+    Each period type is rebuilt from a single grouped aggregate. Existing
+    rows are updated in place, periods without transactions are zeroed and
+    missing periods are created. Returns the number of summary rows written.
+    """
+    ledger = FinancialTransaction.objects.order_by()
+    summaries = FinancialSummary.objects.all()
+    if year is not None:
+        ledger = ledger.filter(transaction_date__year=year)
+        summaries = summaries.filter(year=year)
+    if month is not None:
+        ledger = ledger.filter(transaction_date__month=month)
+        summaries = summaries.filter(month=month, period_type='monthly')
+
+    computed = {}
+    groupings = [('monthly', ['transaction_date__year', 'transaction_date__month'])]
+    if month is None:
+        groupings.append(('yearly', ['transaction_date__year']))
+    for period_type, fields in groupings:
+        for totals in ledger.values(*fields).annotate(**LEDGER_SUMS):
+            amounts = {field: totals[field] or ZERO for field in AMOUNT_FIELDS if field != 'net_profit'}
+            amounts['net_profit'] = amounts['total_revenue'] - amounts['total_expenses']
+            amounts['transaction_count'] = totals['transaction_count']
+            period_month = totals.get('transaction_date__month', FinancialSummary.YEARLY_MONTH)
+            computed[(period_type, totals['transaction_date__year'], period_month)] = amounts
+
+    empty = dict.fromkeys(AMOUNT_FIELDS, ZERO)
+    empty['transaction_count'] = 0
+    now = timezone.now()
+    with transaction.atomic():
+        existing = list(summaries.select_for_update())
+        for summary in existing:
+            values = computed.pop((summary.period_type, summary.year, summary.month), empty)
+            for field, value in values.items():
+                setattr(summary, field, value)
+            summary.updated_at = now
+        FinancialSummary.objects.bulk_update(
+            existing, AMOUNT_FIELDS + ['transaction_count', 'updated_at'], batch_size=500
+        )
+        FinancialSummary.objects.bulk_create([
+            FinancialSummary(period_type=period_type, year=year, month=period_month, **values)
+            for (period_type, year, period_month), values in computed.items()
+        ])
+    invalidate(FinancialSummary)
+    return len(existing) + len(computed)
+
+
+def generate_period_summary(period_type, year, month=None):
+    """Rebuild one period from the ledger and return ``(summary, created)``"""
+    if period_type == 'yearly':
+        month = FinancialSummary.YEARLY_MONTH
+    existed = FinancialSummary.objects.filter(
+        period_type=period_type, year=year, month=month
+    ).exists()
+    if period_type == 'monthly':
+        rebuild_summaries(year, month)
+    else:
+        rebuild_summaries(year)
+    # Periods without transactions get an empty row
+    summary, _ = FinancialSummary.objects.get_or_create(
+        period_type=period_type, year=year, month=month
+    )
+    return summary, not existed
+
+
+def month_bounds(year, month):
+    """Return the first and last day of a month"""
+    return datetime.date(year, month, 1), datetime.date(year, month, calendar.monthrange(year, month)[1])
+
+
+def range_totals(start_date, end_date):
+    """
+    Return the summary columns for an arbitrary date range.
+
+    Months that lie entirely inside the range are read from the monthly
+    summaries. The partial months at either end are aggregated from the
+    ledger, so at most two queries run whatever the range length.
+    """
+    first_full = start_date if start_date.day == 1 else month_bounds(
+        start_date.year, start_date.month
+    )[1] + datetime.timedelta(days=1)
+    last_full = end_date if end_date == month_bounds(end_date.year, end_date.month)[1] else (
+        end_date.replace(day=1) - datetime.timedelta(days=1)
+    )
+
+    totals = dict.fromkeys(AMOUNT_FIELDS, ZERO)
+    totals['transaction_count'] = 0
+
+    edges = Q()
+    if first_full <= last_full:
+        full_months = FinancialSummary.objects.filter(period_type='monthly').filter(
+            (Q(year__gt=first_full.year) | Q(year=first_full.year, month__gte=first_full.month))
+            & (Q(year__lt=last_full.year) | Q(year=last_full.year, month__lte=last_full.month))
+        ).aggregate(**{field: Sum(field) for field in totals})
+        for field, value in full_months.items():
+            totals[field] += value or 0
+        if start_date < first_full:
+            edges |= Q(transaction_date__gte=start_date, transaction_date__lt=first_full)
+        if last_full < end_date:
+            edges |= Q(transaction_date__gt=last_full, transaction_date__lte=end_date)
+    else:
+        edges = Q(transaction_date__gte=start_date, transaction_date__lte=end_date)
+
+    if edges:
+        partial = FinancialTransaction.objects.filter(edges).aggregate(**LEDGER_SUMS)
+        for field, value in partial.items():
+            totals[field] += value or 0
+        totals['net_profit'] += (partial['total_revenue'] or ZERO) - (partial['total_expenses'] or ZERO)
+
+    return totals
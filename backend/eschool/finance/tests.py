@@ -0,0 +1,318 @@
+import datetime
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from eschool.testing import QueryBudgetTestCase, SchoolQueryBudgetTestCase
+from .models import FinancialTransaction, FinancialSummary
+
+SUMMARY_COLUMNS = [
+    'period_type', 'year', 'month', 'total_revenue', 'total_expenses', 'net_profit',
+    'student_fees_revenue', 'salary_expenses', 'operational_expenses', 'transaction_count',
+]
+
+
+def summary_rows():
+    return sorted(
+        FinancialSummary.objects.values_list(*SUMMARY_COLUMNS),
+        key=lambda row: (row[0], row[1], row[2] or 0),
+    )
+
+
+class FinancialSummaryMaintenanceTests(TestCase):
+    """Ledger signals keep the summaries equal to a full rebuild"""
+
+    def create(self, transaction_type, category, amount, day):
+        return FinancialTransaction.objects.create(
+            transaction_type=transaction_type, category=category, amount=Decimal(amount),
+            description='Entry', transaction_date=day,
+        )
+
+    def assertMatchesRebuild(self):
+        incremental = summary_rows()
+        call_command('rebuild_financial_summaries', stdout=StringIO())
+        self.assertEqual(incremental, summary_rows())
+
+    def test_create_update_delete(self):
+        fee = self.create('revenue', 'student_fees', '150.00', datetime.date(2025, 1, 10))
+        self.create('revenue', 'donations', '40.00', datetime.date(2025, 1, 12))
+        salary = self.create('expense', 'salaries', '90.00', datetime.date(2025, 1, 31))
+        self.create('expense', 'utilities', '25.50', datetime.date(2025, 2, 3))
+        self.assertMatchesRebuild()
+
+        january = FinancialSummary.objects.get(period_type='monthly', year=2025, month=1)
+        self.assertEqual(january.total_revenue, Decimal('190.00'))
+        self.assertEqual(january.salary_expenses, Decimal('90.00'))
+        self.assertEqual(january.net_profit, Decimal('100.00'))
+        self.assertEqual(january.transaction_count, 3)
+
+        # Moving a transaction to another month, type and amount
+        fee.transaction_type = 'expense'
+        fee.category = 'maintenance'
+        fee.amount = Decimal('60.00')
+        fee.transaction_date = datetime.date(2025, 3, 1)
+        fee.save()
+        self.assertMatchesRebuild()
+
+        salary.delete()
+        self.assertMatchesRebuild()
+
+        yearly = FinancialSummary.objects.get(period_type='yearly', year=2025)
+        self.assertEqual(yearly.total_revenue, Decimal('40.00'))
+        self.assertEqual(yearly.operational_expenses, Decimal('85.50'))
+        self.assertEqual(yearly.transaction_count, 3)
+
+    def test_rebuild_updates_rows_in_place(self):
+        from django.db import IntegrityError, transaction
+        from finance.summaries import rebuild_summaries
+
+        entry = self.create('revenue', 'student_fees', '150.00', datetime.date(2025, 1, 10))
+        before = dict(FinancialSummary.objects.values_list('period_type', 'summary_id'))
+        FinancialTransaction.objects.filter(pk=entry.pk).update(transaction_date=datetime.date(2025, 2, 10))
+        self.assertEqual(rebuild_summaries(), 3)
+
+        january = FinancialSummary.objects.get(period_type='monthly', year=2025, month=1)
+        self.assertEqual(january.summary_id, before['monthly'])
+        self.assertEqual((january.total_revenue, january.transaction_count), (Decimal('0.00'), 0))
+        yearly = FinancialSummary.objects.get(period_type='yearly', year=2025)
+        self.assertEqual((yearly.summary_id, yearly.total_revenue), (before['yearly'], Decimal('150.00')))
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            FinancialSummary.objects.create(period_type='yearly', year=2025)
+
+    def test_yearly_rows_read_without_a_month(self):
+        from finance.serializers import FinancialSummarySerializer
+
+        self.create('revenue', 'student_fees', '150.00', datetime.date(2025, 1, 10))
+        yearly = FinancialSummary.objects.get(period_type='yearly', year=2025)
+        self.assertEqual(yearly.month, FinancialSummary.YEARLY_MONTH)
+        self.assertIsNone(FinancialSummarySerializer(yearly).data['month'])
+
+        serializer = FinancialSummarySerializer(data={'period_type': 'yearly', 'year': 2026, 'month': None})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.save().month, FinancialSummary.YEARLY_MONTH)
+
+class FinancialOverviewQueryTests(QueryBudgetTestCase):
+    """The overview reads whole months from the summaries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for month in range(1, 13):
+            for day in (1, 15, 28):
+                FinancialTransaction.objects.create(
+                    transaction_type='revenue', category='student_fees', amount=Decimal('10.00'),
+                    description='Fee', transaction_date=datetime.date(2025, month, day),
+                )
+
+    def test_overview_matches_ledger(self):
+        response = self.assertQueryBudget(
+            '/api/financial-transactions/overview/?start_date=2025-01-15&end_date=2025-12-20', 2
+        )
+        self.assertEqual(response.data['total_transactions'], 34)
+        self.assertEqual(Decimal(response.data['total_revenue']), Decimal('340.00'))
+
+    def test_monthly_trend_single_query(self):
+        response = self.assertQueryBudget(
+            '/api/financial-transactions/monthly_trend/?years=2024,2025&categories=1', 1
+        )
+        self.assertEqual(len(response.data), 24)
+        march = response.data[12 + 2]
+        self.assertEqual((march['year'], march['month']), (2025, 3))
+        self.assertEqual(march['revenue'], Decimal('30.00'))
+        self.assertEqual(march['categories']['revenue'], {'student_fees': Decimal('30.00')})
+
+    def test_monthly_trend_caps_the_years(self):
+        from finance.views import MAX_TREND_YEARS
+
+        years = ','.join(str(2000 + offset) for offset in range(MAX_TREND_YEARS + 1))
+        response = self.client.get(f'/api/financial-transactions/monthly_trend/?years={years}')
+        self.assertEqual(response.status_code, 400)
+
+
+class OverdueSweepTests(SchoolQueryBudgetTestCase):
+    """The sweep moves past-due rows once, applies late fees and records history"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from employee.models import EmployeeSalary
+        from parent.models import Parent, Payment
+
+        parent = Parent.objects.create(
+            name='Parent', email='sweep-parent@example.com', phone='0100',
+            gender='male', occupation='employed', address='Street',
+        )
+        cls.payments = [
+            Payment.objects.create(
+                parent=parent, student=student, payment_type='tuition', amount=Decimal('200'),
+                late_fee=Decimal('0'), discount=Decimal('0'), due_date=due_date,
+                academic_year='2025', status=payment_status,
+            )
+            for student, due_date, payment_status in [
+                (cls.students[0], datetime.date(2025, 1, 10), 'pending'),
+                (cls.students[1], datetime.date(2025, 1, 10), 'paid'),
+                (cls.students[2], datetime.date(2025, 3, 10), 'pending'),
+            ]
+        ]
+        cls.salary = EmployeeSalary.objects.create(
+            employee=cls.employees[0], month='January 2025', pay_date=datetime.date(2025, 1, 31),
+            basic_salary=Decimal('1000'), allowances=Decimal('0'), deductions=Decimal('0'),
+            overtime_hours=Decimal('0'), overtime_rate=Decimal('0'),
+            tax_deduction=Decimal('0'), net_salary=Decimal('0'), amount=Decimal('0'),
+        )
+
+    def test_sweep_marks_overdue_once(self):
+        from finance.overdue import LATE_FEE_ENTRY, sweep_overdue
+        from parent.models import PaymentHistory
+
+        moved = sweep_overdue(datetime.date(2025, 2, 1), late_fee='5', late_fee_rate='2.5')
+        self.assertEqual((moved['payments'], moved['salaries']), (1, 1))
+
+        overdue, paid, not_due = [payment.__class__.objects.get(pk=payment.pk) for payment in self.payments]
+        self.assertEqual(overdue.status, 'overdue')
+        self.assertEqual(overdue.late_fee, Decimal('10.00'))
+        self.assertEqual(overdue.total_amount, Decimal('210.00'))
+        self.assertEqual((paid.status, not_due.status), ('paid', 'pending'))
+        history = PaymentHistory.objects.get(payment=overdue)
+        self.assertEqual((history.installment_number, history.amount), (LATE_FEE_ENTRY, Decimal('10.00')))
+        self.salary.refresh_from_db()
+        self.assertEqual(self.salary.status, 'overdue')
+
+        moved = sweep_overdue(datetime.date(2025, 2, 1), late_fee='5', late_fee_rate='2.5')
+        self.assertEqual((moved['payments'], moved['salaries']), (0, 0))
+        self.assertEqual(PaymentHistory.objects.count(), 1)
+
+        # The March payment is past due today too, though no sweep has moved it yet
+        response = self.assertQueryBudget('/api/payments/overdue/', 2)
+        self.assertEqual(sorted(row['pay_id'] for row in response.data), [overdue.pk, not_due.pk])
+        self.assertTrue(all(row['is_overdue'] for row in response.data))
+
+    def test_summary_counts_past_due_rows_before_and_after_the_sweep(self):
+        from finance.overdue import sweep_overdue
+        from parent.models import Payment
+
+        future = Payment.objects.get(pk=self.payments[2].pk)
+        future.due_date = datetime.date.today() + datetime.timedelta(days=30)
+        future.save()
+
+        before = self.client.get('/api/payments/summary/').data
+        sweep_overdue()
+        after = self.client.get('/api/payments/summary/').data
+        for summary in (before, after):
+            self.assertEqual(summary['overdue_count'], 1)
+            self.assertEqual(summary['pending_amount'], Decimal('200.00'))
+        self.assertEqual(before['overdue_amount'], Decimal('200.00'))
+        # The sweep's late fee lands on late_fee and total_amount, not on the amount
+        self.assertEqual(after['overdue_amount'], Decimal('200.00'))
+
+    def test_sweep_follows_installments(self):
+        from finance.overdue import sweep_overdue
+        from parent.models import PaymentHistory
+
+        not_due = self.payments[2]
+        for number, due_date in enumerate(
+            [datetime.date(2025, 3, 10), datetime.date(2025, 4, 10), datetime.date(2025, 5, 10)], start=1
+        ):
+            PaymentHistory.objects.create(
+                payment=not_due, installment_number=number, amount=Decimal('66.67'), due_date=due_date,
+                status='paid' if number == 1 else 'pending',
+            )
+        # The first installment was paid on time, so the payment is not overdue yet
+        moved = sweep_overdue(datetime.date(2025, 4, 1), late_fee='0')
+        self.assertEqual((moved['payments'], moved['installments']), (1, 0))
+        not_due.refresh_from_db()
+        self.assertEqual(not_due.status, 'pending')
+
+        moved = sweep_overdue(datetime.date(2025, 4, 20), late_fee='0')
+        self.assertEqual((moved['payments'], moved['installments']), (1, 1))
+        not_due.refresh_from_db()
+        self.assertEqual((not_due.status, not_due.late_fee), ('overdue', Decimal('0.00')))
+        self.assertEqual(
+            list(not_due.payment_history.values_list('installment_number', 'status')),
+            [(1, 'paid'), (2, 'overdue'), (3, 'pending')]
+        )
+
+    def test_sweep_command(self):
+        out = StringIO()
+        call_command('sweep_overdue', '--date', '2025-04-01', stdout=out)
+        self.assertIn('Marked 2 payments, 0 installments and 1 salaries overdue', out.getvalue())
+
+
+class LedgerPostingTests(SchoolQueryBudgetTestCase):
+    """Paid payments reach the ledger once, in batches of any size"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from parent.models import Parent, Payment
+
+        parent = Parent.objects.create(
+            name='Parent', email='ledger-parent@example.com', phone='0100',
+            gender='male', occupation='employed', address='Street',
+        )
+        cls.payments = [
+            Payment.objects.create(
+                parent=parent, student=student, payment_type='tuition', amount=Decimal('100'),
+                late_fee=Decimal('0'), discount=Decimal('0'), due_date=datetime.date(2025, 1, 10),
+                academic_year='2025',
+            )
+            for student in cls.students
+        ]
+
+    def test_bulk_mark_paid_posts_in_one_batch(self):
+        ids = [payment.pk for payment in self.payments]
+        # A fixed set of statements whatever the batch size: lock, update, read back,
+        # ledger lookup, one insert, the two period summaries, and their savepoints
+        response = self.assertQueryBudget(
+            '/api/payments/mark_paid/bulk/', 21, method='post',
+            data={'payments': ids + [0], 'payment_date': '2025-01-15', 'payment_method': 'cash'},
+        )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['marked_paid'], 3)
+        self.assertEqual(response.data['ledger_entries'], 3)
+        self.assertEqual(response.data['not_found'], [0])
+
+        entries = FinancialTransaction.objects.filter(reference_type='payment')
+        self.assertEqual(sorted(entries.values_list('reference_id', flat=True)), sorted(str(pk) for pk in ids))
+        self.assertIn('Student 0', entries.get(reference_id=str(ids[0])).description)
+        summary = FinancialSummary.objects.get(period_type='monthly', year=2025, month=1)
+        self.assertEqual(summary.student_fees_revenue, Decimal('300.00'))
+
+        response = self.client.post('/api/payments/mark_paid/bulk/', {'payments': ids}, format='json')
+        self.assertEqual((response.data['already_paid'], response.data['ledger_entries']), (3, 0))
+
+    def test_bulk_mark_paid_skips_cancelled_and_refunded(self):
+        from parent.models import Payment
+
+        cancelled, refunded, overdue = self.payments
+        Payment.objects.filter(pk=cancelled.pk).update(status='cancelled')
+        Payment.objects.filter(pk=refunded.pk).update(status='refunded')
+        Payment.objects.filter(pk=overdue.pk).update(status='overdue')
+        response = self.client.post(
+            '/api/payments/mark_paid/bulk/', {'payments': [payment.pk for payment in self.payments]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual((response.data['marked_paid'], response.data['ledger_entries']), (1, 1))
+        self.assertEqual(response.data['skipped'], [
+            {'id': cancelled.pk, 'status': 'cancelled'}, {'id': refunded.pk, 'status': 'refunded'},
+        ])
+        self.assertEqual(
+            dict(Payment.objects.values_list('pk', 'status')),
+            {cancelled.pk: 'cancelled', refunded.pk: 'refunded', overdue.pk: 'paid'}
+        )
+        self.assertFalse(FinancialTransaction.objects.exclude(reference_id=str(overdue.pk)).exists())
+
+    def test_saving_a_paid_payment_posts_once(self):
+        payment = self.payments[0]
+        payment.status = 'paid'
+        payment.payment_date = datetime.date(2025, 1, 20)
+        payment.save()
+        payment.save()
+        self.assertEqual(FinancialTransaction.objects.filter(reference_id=str(payment.pk)).count(), 1)
+
+        call_command('post_ledger', stdout=StringIO())
+        self.assertEqual(FinancialTransaction.objects.count(), 1)
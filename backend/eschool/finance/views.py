@@ -7,14 +7,22 @@ from django.utils import timezone
 from datetime import datetime, timedelta
 from decimal import Decimal
 
+from eschool.mixins import ExportMixin, RelatedFieldsMixin
+from eschool.cache import cached_response
 from .models import FinancialTransaction, FinancialSummary, Budget
+from jobs.views import async_requested, job_accepted
+from .summaries import generate_period_summary, range_totals
 from .serializers import (
     FinancialTransactionSerializer, FinancialSummarySerializer,
     BudgetSerializer, FinancialOverviewSerializer
 )
 
 
-class FinancialTransactionViewSet(viewsets.ModelViewSet):
+# Years monthly_trend answers for at once (12 rows each)
+MAX_TREND_YEARS = 10
+
+
+class FinancialTransactionViewSet(ExportMixin, RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for FinancialTransaction model"""
     
     queryset = FinancialTransaction.objects.all()
@@ -24,12 +32,18 @@ class FinancialTransactionViewSet(viewsets.ModelViewSet):
     search_fields = ['description', 'reference_id', 'notes']
     ordering_fields = ['transaction_date', 'amount', 'created_at']
     ordering = ['-transaction_date', '-created_at']
+    export_fields = [
+        'transaction_id', 'transaction_date', 'transaction_type', 'category', 'amount',
+        'description', 'payment_method', 'reference_type', 'reference_id', 'created_by_id',
+        'created_at',
+    ]
     
     def perform_create(self, serializer):
         """Set created_by when creating a transaction"""
         serializer.save(created_by=self.request.user)
     
     @action(detail=False, methods=['get'])
+    @cached_response(FinancialTransaction, FinancialSummary)
     def overview(self, request):
         """Get financial overview with key metrics"""
         # Get date range from query params
@@ -41,39 +55,20 @@ class FinancialTransactionViewSet(viewsets.ModelViewSet):
         if request.query_params.get('end_date'):
             end_date = datetime.strptime(request.query_params.get('end_date'), '%Y-%m-%d').date()
         
-        # Get transactions in date range
-        transactions = FinancialTransaction.objects.filter(
-            transaction_date__range=[start_date, end_date]
-        )
-        
-        # Calculate totals
-        revenue_total = transactions.filter(transaction_type='revenue').aggregate(
-            total=Sum('amount')
-        )['total'] or Decimal('0.00')
-        
-        expense_total = transactions.filter(transaction_type='expense').aggregate(
-            total=Sum('amount')
-        )['total'] or Decimal('0.00')
-        
-        # Calculate specific categories
-        student_fees = transactions.filter(
-            transaction_type='revenue',
-            category='student_fees'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        # Whole months come from the maintained summaries, partial months from the ledger
+        totals = range_totals(start_date, end_date)
         
+        revenue_total = totals['total_revenue']
+        expense_total = totals['total_expenses']
+        student_fees = totals['student_fees_revenue']
         other_revenue = revenue_total - student_fees
-        
-        salary_expenses = transactions.filter(
-            transaction_type='expense',
-            category='salaries'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        
+        salary_expenses = totals['salary_expenses']
         operational_expenses = expense_total - salary_expenses
         
         net_profit = revenue_total - expense_total
         profit_margin = (net_profit / revenue_total * 100) if revenue_total > 0 else Decimal('0.00')
         
-        total_transactions = transactions.count()
+        total_transactions = totals['transaction_count']
         
         overview_data = {
             'total_revenue': revenue_total,
@@ -91,34 +86,84 @@ class FinancialTransactionViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cached_response(FinancialTransaction)
     def monthly_trend(self, request):
         """Get monthly revenue and expense trends"""
-        year = int(request.query_params.get('year', timezone.now().year))
+        from django.db.models.functions import TruncMonth
         
-        monthly_data = []
-        for month in range(1, 13):
-            transactions = FinancialTransaction.objects.filter(
-                transaction_date__year=year,
-                transaction_date__month=month
+        # ?years=2024,2025 returns several years at once; ?year= keeps working
+        raw_years = (
+            request.query_params.get('years')
+            or request.query_params.get('year')
+            or str(timezone.now().year)
+        )
+        try:
+            years = sorted({int(value) for value in raw_years.split(',') if value.strip()})
+        except ValueError:
+            years = []
+        if not years or not all(1 <= year < 9999 for year in years):
+            return Response(
+                {'error': 'year and years must be comma-separated years'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            
-            revenue = transactions.filter(transaction_type='revenue').aggregate(
-                total=Sum('amount')
-            )['total'] or Decimal('0.00')
-            
-            expenses = transactions.filter(transaction_type='expense').aggregate(
-                total=Sum('amount')
-            )['total'] or Decimal('0.00')
-            
-            monthly_data.append({
-                'month': month,
-                'month_name': datetime(year, month, 1).strftime('%B'),
-                'revenue': revenue,
-                'expenses': expenses,
-                'net_profit': revenue - expenses
-            })
+        if len(years) > MAX_TREND_YEARS:
+            return Response(
+                {'error': f'At most {MAX_TREND_YEARS} years can be requested at once'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        include_categories = request.query_params.get('categories', '').lower() in ('1', 'true', 'yes')
+        
+        # Plain date ranges instead of __year/__month so the transaction_date index is used
+        in_range = Q()
+        for year in years:
+            in_range |= Q(
+                transaction_date__gte=datetime(year, 1, 1).date(),
+                transaction_date__lt=datetime(year + 1, 1, 1).date()
+            )
+        
+        rows = FinancialTransaction.objects.filter(in_range).annotate(
+            period=TruncMonth('transaction_date')
+        ).order_by()
+        if include_categories:
+            rows = rows.values('period', 'transaction_type', 'category').annotate(total=Sum('amount'))
+        else:
+            rows = rows.values('period').annotate(
+                revenue=Sum('amount', filter=Q(transaction_type='revenue')),
+                expenses=Sum('amount', filter=Q(transaction_type='expense')),
+            )
+        
+        monthly_data = {}
+        for year in years:
+            for month in range(1, 13):
+                entry = {
+                    'year': year,
+                    'month': month,
+                    'month_name': datetime(year, month, 1).strftime('%B'),
+                    'revenue': Decimal('0.00'),
+                    'expenses': Decimal('0.00'),
+                }
+                if include_categories:
+                    entry['categories'] = {'revenue': {}, 'expense': {}}
+                monthly_data[(year, month)] = entry
+        
+        for row in rows:
+            entry = monthly_data[(row['period'].year, row['period'].month)]
+            if include_categories:
+                if row['transaction_type'] == 'revenue':
+                    entry['revenue'] += row['total']
+                elif row['transaction_type'] == 'expense':
+                    entry['expenses'] += row['total']
+                else:
+                    continue
+                entry['categories'][row['transaction_type']][row['category']] = row['total']
+            else:
+                entry['revenue'] = row['revenue'] or Decimal('0.00')
+                entry['expenses'] = row['expenses'] or Decimal('0.00')
         
-        return Response(monthly_data)
+        for entry in monthly_data.values():
+            entry['net_profit'] = entry['revenue'] - entry['expenses']
+        
+        return Response(list(monthly_data.values()))
     
     @action(detail=False, methods=['get'])
     def category_breakdown(self, request):
@@ -223,7 +268,7 @@ class FinancialTransactionViewSet(viewsets.ModelViewSet):
         return Response(salary_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class FinancialSummaryViewSet(viewsets.ModelViewSet):
+class FinancialSummaryViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for FinancialSummary model"""
     
     queryset = FinancialSummary.objects.all()
@@ -235,7 +280,7 @@ class FinancialSummaryViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def generate_summary(self, request):
-        """Generate financial summary for a specific period"""
+        """Generate financial summary for a specific period (?async=1 queues it as a job)"""
         period_type = request.data.get('period_type', 'monthly')
         year = int(request.data.get('year', timezone.now().year))
         month = request.data.get('month')
@@ -246,64 +291,21 @@ class FinancialSummaryViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Calculate date range
-        if period_type == 'monthly':
-            start_date = datetime(year, int(month), 1).date()
-            if int(month) == 12:
-                end_date = datetime(year + 1, 1, 1).date() - timedelta(days=1)
-            else:
-                end_date = datetime(year, int(month) + 1, 1).date() - timedelta(days=1)
-        else:  # yearly
-            start_date = datetime(year, 1, 1).date()
-            end_date = datetime(year, 12, 31).date()
-        
-        # Get transactions for the period
-        transactions = FinancialTransaction.objects.filter(
-            transaction_date__range=[start_date, end_date]
-        )
-        
-        # Calculate totals
-        total_revenue = transactions.filter(transaction_type='revenue').aggregate(
-            total=Sum('amount')
-        )['total'] or Decimal('0.00')
-        
-        total_expenses = transactions.filter(transaction_type='expense').aggregate(
-            total=Sum('amount')
-        )['total'] or Decimal('0.00')
-        
-        student_fees_revenue = transactions.filter(
-            transaction_type='revenue',
-            category='student_fees'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        
-        salary_expenses = transactions.filter(
-            transaction_type='expense',
-            category='salaries'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        
-        operational_expenses = total_expenses - salary_expenses
-        transaction_count = transactions.count()
+        month = int(month) if period_type == 'monthly' else None
+        if async_requested(request):
+            return job_accepted(
+                request, 'finance.generate_summary',
+                {'period_type': period_type, 'year': year, 'month': month}
+            )
         
-        # Create or update summary
-        summary, created = FinancialSummary.objects.update_or_create(
-            period_type=period_type,
-            year=year,
-            month=int(month) if month else None,
-            defaults={
-                'total_revenue': total_revenue,
-                'total_expenses': total_expenses,
-                'student_fees_revenue': student_fees_revenue,
-                'salary_expenses': salary_expenses,
-                'operational_expenses': operational_expenses,
-                'transaction_count': transaction_count,
-            }
-        )
+        # Recompute the period from the ledger
+        summary, created = generate_period_summary(period_type, year, month)
         
         serializer = FinancialSummarySerializer(summary)
         return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
 
-class BudgetViewSet(viewsets.ModelViewSet):
+class BudgetViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for Budget model"""
     
     queryset = Budget.objects.all()
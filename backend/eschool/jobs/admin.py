@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'backend', 'submitted_by', 'created_at', 'started_at', 'finished_at']
+    list_filter = ['status', 'backend', 'name']
+    search_fields = ['name', 'worker']
+    ordering = ['-created_at']
+    readonly_fields = ['id', 'created_at', 'started_at', 'heartbeat_at', 'finished_at', 'worker', 'attempts', 'result', 'error']
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs.queue import run_pending, worker_name
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs from the database queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once the queue is empty instead of polling')
+        parser.add_argument('--poll', type=float, default=2.0,
+                            help='Seconds to wait between polls of an empty queue')
+        parser.add_argument('--max-jobs', type=int, help='Exit after running this many jobs')
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        remaining = options['max_jobs']
+        ran = 0
+        self.stdout.write(f'Worker {worker} polling the job queue')
+        while remaining is None or remaining > 0:
+            for job in run_pending(worker, limit=remaining):
+                ran += 1
+                if remaining is not None:
+                    remaining -= 1
+                style = self.style.SUCCESS if job.status == 'succeeded' else self.style.ERROR
+                self.stdout.write(style(f'{job.name} {job.pk} {job.status} in {job.duration:.2f}s'))
+            if options['burst'] or remaining == 0:
+                break
+            time.sleep(options['poll'])
+        self.stdout.write(self.style.SUCCESS(f'Ran {ran} jobs'))
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:21
+
+import django.core.serializers.json
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, help_text='Unique job ID', primary_key=True, serialize=False)),
+                ('name', models.CharField(help_text='Registered job function, e.g. finance.generate_summary', max_length=100)),
+                ('params', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Keyword arguments passed to the job function')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='queued', help_text='Current state of the job', max_length=20)),
+                ('backend', models.CharField(choices=[('db', 'Database queue'), ('celery', 'Celery')], default='db', help_text='Queue the job was dispatched to', max_length=20)),
+                ('result', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Return value of the job function', null=True)),
+                ('error', models.TextField(blank=True, help_text='Traceback of a failed job')),
+                ('worker', models.CharField(blank=True, help_text='Worker that ran the job', max_length=100)),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Number of times a worker picked up the job')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, help_text='When a worker picked up the job', null=True)),
+                ('finished_at', models.DateTimeField(blank=True, help_text='When the job succeeded, failed or was cancelled', null=True)),
+                ('submitted_by', models.ForeignKey(blank=True, help_text='User who submitted the job', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Job',
+                'verbose_name_plural': 'Jobs',
+                'db_table': 'jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'backend', 'created_at'], name='jobs_queue_idx'), models.Index(fields=['submitted_by', '-created_at'], name='jobs_submitter_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,118 @@
+import uuid
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class Job(models.Model):
+    """A long-running action queued for a worker instead of run in the request"""
+    
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+    
+    BACKEND_CHOICES = [
+        ('db', 'Database queue'),
+        ('celery', 'Celery'),
+    ]
+    
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False,
+        help_text="Unique job ID"
+    )
+    name = models.CharField(
+        max_length=100,
+        help_text="Registered job function, e.g. finance.generate_summary"
+    )
+    params = models.JSONField(
+        default=dict,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        help_text="Keyword arguments passed to the job function"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='queued',
+        help_text="Current state of the job"
+    )
+    backend = models.CharField(
+        max_length=20,
+        choices=BACKEND_CHOICES,
+        default='db',
+        help_text="Queue the job was dispatched to"
+    )
+    result = models.JSONField(
+        blank=True,
+        null=True,
+        encoder=DjangoJSONEncoder,
+        help_text="Return value of the job function"
+    )
+    error = models.TextField(
+        blank=True,
+        help_text="Traceback of a failed job"
+    )
+    worker = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Worker that ran the job"
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of times a worker picked up the job"
+    )
+    submitted_by = models.ForeignKey(
+        'accounts.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        help_text="User who submitted the job"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="When a worker picked up the job"
+    )
+    heartbeat_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="Last time the running worker reported it is still on the job"
+    )
+    finished_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="When the job succeeded, failed or was cancelled"
+    )
+    
+    class Meta:
+        db_table = 'jobs'
+        ordering = ['-created_at']
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+        indexes = [
+            # The worker's queue scan: oldest queued job of a backend first
+            models.Index(fields=['status', 'backend', 'created_at'], name='jobs_queue_idx'),
+            models.Index(fields=['submitted_by', '-created_at'], name='jobs_submitter_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+    
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed', 'cancelled')
+    
+    @property
+    def duration(self):
+        """Seconds between pick-up and completion"""
+        if self.started_at and self.finished_at:
+            return round((self.finished_at - self.started_at).total_seconds(), 3)
+        return None
@@ -0,0 +1,208 @@
+"""
+Background jobs backed by the ``jobs`` table.
+
+Apps register the functions that may run in the background in their
+``jobs.py`` with ``@register('<app>.<action>')``; the functions take
+JSON-serialisable keyword arguments and return a JSON-serialisable result.
+``submit`` stores a ``Job`` row and dispatches it to ``JOBS_BACKEND``:
+
+* ``db`` (default) leaves the row queued. ``manage.py run_jobs`` polls
+  the table and claims rows one at a time, so no broker is needed.
+* ``celery`` also sends the job id to a Celery worker once the
+  submitting transaction commits (``jobs/tasks.py``).
+
+Either way a job is claimed with a conditional ``UPDATE ... WHERE
+status = 'queued'``, so two workers never run the same job, and callers
+poll the row for its status and result.
+
+While a job runs, its worker refreshes ``heartbeat_at`` every
+``JOBS_HEARTBEAT_INTERVAL`` seconds. A worker that dies mid-job leaves
+its row ``running`` and stops beating; after ``JOBS_STALE_AFTER`` seconds
+without a heartbeat the job counts as abandoned and is claimed again like
+a queued one (by the database worker, or by the task Celery redelivers
+under ``CELERY_TASK_ACKS_LATE``) until it has been picked up
+``JOBS_MAX_ATTEMPTS`` times; after that it is marked failed. A worker
+only stores its result while it still owns the claim, so a run that was
+taken over late cannot overwrite the newer one.
+"""
+import datetime
+import os
+import socket
+import threading
+import traceback
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+
+_registry = {}
+
+
+def register(name):
+    """Decorator registering ``function`` as the job called ``name``"""
+    def decorator(function):
+        _registry[name] = function
+        return function
+    return decorator
+
+
+def registered_jobs():
+    return sorted(_registry)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def submit(name, params=None, user=None, backend=None):
+    """Queue the job ``name`` with keyword arguments ``params`` and return its ``Job``"""
+    if name not in _registry:
+        raise KeyError(f'Unknown job "{name}"')
+    backend = backend or settings.JOBS_BACKEND
+    job = Job.objects.create(
+        name=name,
+        params=params or {},
+        backend=backend,
+        submitted_by=user if user is not None and user.is_authenticated else None,
+    )
+    if backend == 'celery':
+        from .tasks import run_job_task
+        job_id = str(job.pk)
+        transaction.on_commit(lambda: run_job_task.delay(job_id))
+    return job
+
+
+def _stale_cutoff():
+    return timezone.now() - datetime.timedelta(seconds=settings.JOBS_STALE_AFTER)
+
+
+def _claimable():
+    # Queued jobs, and running jobs whose worker stopped reporting back
+    return Q(status='queued') | Q(
+        status='running', heartbeat_at__lt=_stale_cutoff(), attempts__lt=settings.JOBS_MAX_ATTEMPTS
+    )
+
+
+def fail_abandoned():
+    """Mark the stale running jobs that ran out of attempts as failed; return how many"""
+    return Job.objects.filter(
+        status='running', heartbeat_at__lt=_stale_cutoff(), attempts__gte=settings.JOBS_MAX_ATTEMPTS
+    ).update(
+        status='failed',
+        error=f'Abandoned after {settings.JOBS_MAX_ATTEMPTS} attempts: no worker finished it',
+        finished_at=timezone.now(),
+    )
+
+
+def seconds_until_stale(job_id):
+    """Seconds until the running job ``job_id`` can be claimed again, or None if it never will"""
+    job = Job.objects.filter(pk=job_id, status='running').values('heartbeat_at', 'attempts').first()
+    if job is None or job['attempts'] >= settings.JOBS_MAX_ATTEMPTS:
+        return None
+    remaining = job['heartbeat_at'] - _stale_cutoff()
+    return max(remaining.total_seconds(), 0) + 1
+
+
+def claim(job_id, worker=None):
+    """Mark the queued (or abandoned) job ``job_id`` as running and return it, or None if another worker has it"""
+    now = timezone.now()
+    claimed = Job.objects.filter(_claimable(), pk=job_id).update(
+        status='running',
+        started_at=now,
+        heartbeat_at=now,
+        worker=worker or worker_name(),
+        attempts=F('attempts') + 1,
+    )
+    return Job.objects.get(pk=job_id) if claimed else None
+
+
+def claim_next(worker=None, backend='db'):
+    """Claim the oldest queued or abandoned job of ``backend``, or return None when there is none"""
+    fail_abandoned()
+    while True:
+        candidates = list(
+            Job.objects.filter(_claimable(), backend=backend)
+            .order_by('created_at').values_list('pk', flat=True)[:10]
+        )
+        if not candidates:
+            return None
+        for job_id in candidates:
+            job = claim(job_id, worker)
+            if job is not None:
+                return job
+
+
+def _owned(job):
+    # The row as long as this run's claim has not been taken over
+    return Job.objects.filter(pk=job.pk, status='running', worker=job.worker, attempts=job.attempts)
+
+
+def beat(job):
+    """Refresh the heartbeat of the claimed ``job``; return False once the claim is lost"""
+    return bool(_owned(job).update(heartbeat_at=timezone.now()))
+
+
+@contextmanager
+def heartbeat(job):
+    """Beat for ``job`` from a background thread while the block runs"""
+    stop = threading.Event()
+
+    def keep_beating():
+        try:
+            while not stop.wait(settings.JOBS_HEARTBEAT_INTERVAL) and beat(job):
+                pass
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=keep_beating, name=f'job-heartbeat-{job.pk}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_job(job):
+    """Run a claimed job and store its result or traceback if the claim is still ours"""
+    function = _registry.get(job.name)
+    with heartbeat(job):
+        try:
+            if function is None:
+                raise KeyError(f'Unknown job "{job.name}"')
+            job.result = function(**job.params)
+            job.status = 'succeeded'
+        except Exception:
+            job.status = 'failed'
+            job.error = traceback.format_exc()
+    job.finished_at = timezone.now()
+    _owned(job).update(
+        status=job.status, result=job.result, error=job.error, finished_at=job.finished_at
+    )
+    return job
+
+
+def run_pending(worker=None, limit=None):
+    """Run queued database jobs until the queue is empty or ``limit`` jobs ran"""
+    done = []
+    while limit is None or len(done) < limit:
+        close_old_connections()
+        job = claim_next(worker)
+        if job is None:
+            break
+        done.append(run_job(job))
+    return done
+
+
+def cancel(job):
+    """Cancel ``job`` if no worker picked it up yet; return whether it was cancelled"""
+    cancelled = Job.objects.filter(pk=job.pk, status='queued').update(
+        status='cancelled', finished_at=timezone.now()
+    )
+    job.refresh_from_db()
+    return bool(cancelled)
@@ -0,0 +1,33 @@
+from rest_framework import serializers
+from .models import Job
+from .queue import registered_jobs
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer for Job model"""
+    
+    submitted_by_name = serializers.CharField(source='submitted_by.get_full_name', read_only=True)
+    duration = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'name', 'params', 'status', 'backend', 'result', 'error', 'worker',
+            'attempts', 'submitted_by', 'submitted_by_name', 'created_at', 'started_at',
+            'heartbeat_at', 'finished_at', 'duration'
+        ]
+        read_only_fields = [
+            'id', 'status', 'backend', 'result', 'error', 'worker', 'attempts',
+            'submitted_by', 'created_at', 'started_at', 'heartbeat_at', 'finished_at'
+        ]
+    
+    def validate_name(self, value):
+        """Only registered job functions can be submitted"""
+        if value not in registered_jobs():
+            raise serializers.ValidationError(f'Unknown job. Available jobs: {", ".join(registered_jobs())}')
+        return value
+    
+    def validate_params(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError('params must be an object of keyword arguments.')
+        return value
@@ -0,0 +1,23 @@
+"""
+Celery entry point for jobs submitted with ``JOBS_BACKEND = 'celery'``.
+
+Only imported when that backend is in use; Celery itself stays optional.
+"""
+from celery import shared_task
+
+from .queue import claim, fail_abandoned, run_job, seconds_until_stale
+
+
+@shared_task(bind=True, name='jobs.run_job', max_retries=None)
+def run_job_task(self, job_id):
+    job = claim(job_id)
+    if job is not None:
+        run_job(job)
+        return
+    # A job cancelled before the worker got to it is no longer queued. One
+    # still running was redelivered because its worker died, or another
+    # worker is on it: look again once it would count as abandoned.
+    retry_in = seconds_until_stale(job_id)
+    if retry_in is not None:
+        raise self.retry(countdown=retry_in)
+    fail_abandoned()
@@ -0,0 +1,140 @@
+from eschool.testing import QueryBudgetTestCase, SchoolQueryBudgetTestCase
+from jobs.models import Job
+from jobs.queue import register, run_pending
+
+
+@register('jobs.test_echo')
+def echo(value=None, fail=False):
+    if fail:
+        raise ValueError('asked to fail')
+    return {'value': value}
+
+
+class JobQueueTests(QueryBudgetTestCase):
+    """Jobs are submitted over the API, run by the database worker and polled"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user.is_staff = True
+        cls.user.save(update_fields=['is_staff'])
+
+    def test_only_staff_submit_jobs(self):
+        self.user.is_staff = False
+        self.user.save(update_fields=['is_staff'])
+        response = self.client.post('/api/jobs/', {'name': 'jobs.test_echo'}, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Job.objects.exists())
+
+    def test_abandoned_jobs_are_claimed_again(self):
+        import datetime
+        from django.test import override_settings
+        from django.utils import timezone
+        from jobs.queue import claim, submit
+
+        job = submit('jobs.test_echo', {'value': 1})
+        self.assertIsNotNone(claim(job.pk, worker='dead'))
+        # A redelivered task does not take a job another worker is still on
+        self.assertIsNone(claim(job.pk))
+        self.assertEqual(run_pending(), [])
+
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - datetime.timedelta(hours=2))
+        rerun, = run_pending()
+        self.assertEqual((rerun.status, rerun.attempts), ('succeeded', 2))
+
+        job = submit('jobs.test_echo')
+        Job.objects.filter(pk=job.pk).update(
+            status='running', attempts=3, heartbeat_at=timezone.now() - datetime.timedelta(hours=2)
+        )
+        with override_settings(JOBS_MAX_ATTEMPTS=3):
+            self.assertEqual(run_pending(), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('Abandoned', job.error)
+
+    def test_only_the_current_claim_stores_a_result(self):
+        import datetime
+        from django.utils import timezone
+        from jobs.queue import beat, claim, run_job, submit
+
+        job = submit('jobs.test_echo', {'value': 1})
+        slow = claim(job.pk, worker='slow')
+        # Heartbeats keep a long job from being taken over
+        stale = timezone.now() - datetime.timedelta(hours=2)
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=stale)
+        self.assertTrue(beat(slow))
+        self.assertIsNone(claim(job.pk, worker='other'))
+
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=stale)
+        current = claim(job.pk, worker='other')
+        self.assertFalse(beat(slow))
+        run_job(current)
+        slow.params = {'value': 'late'}
+        run_job(slow)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker, job.result), ('succeeded', 'other', {'value': 1}))
+
+    def test_submit_run_and_poll(self):
+        response = self.client.post(
+            '/api/jobs/', {'name': 'jobs.test_echo', 'params': {'value': 3}}, format='json'
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'queued')
+        job_id = response.data['id']
+
+        self.assertEqual([job.status for job in run_pending()], ['succeeded'])
+        self.assertEqual(run_pending(), [])
+
+        response = self.assertQueryBudget(f'/api/jobs/{job_id}/', 2)
+        self.assertEqual(response.data['status'], 'succeeded')
+        self.assertEqual(response.data['result'], {'value': 3})
+        self.assertEqual(response.data['attempts'], 1)
+
+    def test_failed_job_keeps_traceback(self):
+        self.client.post('/api/jobs/', {'name': 'jobs.test_echo', 'params': {'fail': True}}, format='json')
+        job, = run_pending()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('asked to fail', Job.objects.get(pk=job.pk).error)
+
+    def test_unknown_job_is_rejected(self):
+        response = self.client.post('/api/jobs/', {'name': 'nope'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_cancel_only_queued_jobs(self):
+        job_id = self.client.post('/api/jobs/', {'name': 'jobs.test_echo'}, format='json').data['id']
+        response = self.client.post(f'/api/jobs/{job_id}/cancel/')
+        self.assertEqual(response.data['status'], 'cancelled')
+        self.assertEqual(run_pending(), [])
+        response = self.client.post(f'/api/jobs/{job_id}/cancel/')
+        self.assertEqual(response.status_code, 400)
+
+
+class AsyncEndpointTests(SchoolQueryBudgetTestCase):
+    """?async=1 answers with a job that the worker then completes"""
+
+    def test_async_bulk_attendance(self):
+        from admission_office.models import Attendance
+
+        response = self.client.post('/api/attendance/bulk/?async=1', {
+            'date': '2025-02-03',
+            'attendance_records': [{'student': str(student.pk), 'status': 'present'} for student in self.students],
+        }, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(Attendance.objects.exists())
+
+        job, = run_pending()
+        self.assertEqual(job.status, 'succeeded', job.error)
+        self.assertEqual(job.result['total_created'], len(self.students))
+        self.assertEqual(Attendance.objects.count(), len(self.students))
+
+    def test_async_generate_summary(self):
+        response = self.client.post(
+            '/api/financial-summaries/generate_summary/?async=1',
+            {'period_type': 'monthly', 'year': 2025, 'month': 1}, format='json'
+        )
+        self.assertEqual(response.status_code, 202)
+        job, = run_pending()
+        self.assertEqual(job.status, 'succeeded', job.error)
+        self.assertTrue(job.result['created'])
+        self.assertEqual(job.result['summary']['month'], 1)
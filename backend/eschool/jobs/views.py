@@ -0,0 +1,66 @@
+from rest_framework import viewsets, mixins, filters, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
+
+from .models import Job
+from .queue import cancel as cancel_job, registered_jobs, submit
+from .serializers import JobSerializer
+
+
+def async_requested(request):
+    """Whether the client asked for the action to run as a background job (?async=1)"""
+    return request.query_params.get('async', '').lower() in ('1', 'true', 'yes')
+
+
+def job_accepted(request, name, params):
+    """Submit the job ``name`` and answer 202 with the job to poll"""
+    job = submit(name, params, user=request.user)
+    data = JobSerializer(job).data
+    data['poll_url'] = request.build_absolute_uri(f'/api/jobs/{job.pk}/')
+    return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Location': data['poll_url']})
+
+
+class JobViewSet(mixins.CreateModelMixin,
+                 mixins.ListModelMixin,
+                 mixins.RetrieveModelMixin,
+                 viewsets.GenericViewSet):
+    """ViewSet for submitting and polling background jobs"""
+    
+    queryset = Job.objects.select_related('submitted_by')
+    serializer_class = JobSerializer
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['name', 'status', 'backend']
+    ordering_fields = ['created_at', 'started_at', 'finished_at']
+    ordering = ['-created_at']
+    
+    def get_queryset(self):
+        # Staff see every job; other users only the jobs they submitted
+        queryset = super().get_queryset()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(submitted_by=self.request.user)
+        return queryset
+    
+    def create(self, request, *args, **kwargs):
+        # Jobs take their params unchecked; everyone else goes through the endpoints' ?async=1
+        if not request.user.is_staff:
+            return Response({'error': 'Only staff can submit jobs directly'}, status=status.HTTP_403_FORBIDDEN)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return job_accepted(request, serializer.validated_data['name'], serializer.validated_data.get('params'))
+    
+    @action(detail=False, methods=['get'])
+    def available(self, request):
+        """Get the names of the jobs that can be submitted"""
+        return Response(registered_jobs())
+    
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Cancel a job that no worker has picked up yet"""
+        job = self.get_object()
+        if not cancel_job(job):
+            return Response(
+                {'error': f'Only queued jobs can be cancelled; this job is {job.status}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(JobSerializer(job).data)
@@ -1,6 +1,19 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from eschool.annotations import related_count
+
+
+class LevelQuerySet(models.QuerySet):
+    """Queryset for Level with annotated counts"""
+
+    def with_counts(self):
+        """Annotate the values read by ``student_count`` and ``section_count``"""
+        return self.annotate(
+            _student_count=related_count(self.model, 'students'),
+            _section_count=related_count(self.model, 'sections'),
+        )
+
 
 class Level(models.Model):
     """Academic level model (e.g., Grade 1, Grade 2, etc.)"""
@@ -59,6 +72,8 @@ class Level(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = LevelQuerySet.as_manager()
+    
     class Meta:
         db_table = 'levels'
         ordering = ['level_no']
@@ -71,11 +86,15 @@ class Level(models.Model):
     @property
     def student_count(self):
         """Return the number of students in this level"""
+        if hasattr(self, '_student_count'):
+            return self._student_count
         return self.students.count()
     
     @property
     def section_count(self):
         """Return the number of sections in this level"""
+        if hasattr(self, '_section_count'):
+            return self._section_count
         return self.sections.count()
     
     @property
@@ -84,6 +103,16 @@ class Level(models.Model):
         return self.teachers.count()
 
 
+class SectionQuerySet(models.QuerySet):
+    """Queryset for Section with annotated counts"""
+
+    def with_counts(self):
+        """Annotate the values read by ``student_count``, ``is_full`` and ``available_spots``"""
+        return self.annotate(
+            _student_count=related_count(self.model, 'students'),
+        )
+
+
 class Section(models.Model):
     """Section model for organizing students within a level"""
     
@@ -142,6 +171,8 @@ class Section(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = SectionQuerySet.as_manager()
+    
     class Meta:
         db_table = 'sections'
         unique_together = ['level', 'sec_no']
@@ -155,6 +186,8 @@ class Section(models.Model):
     @property
     def student_count(self):
         """Return the current number of students in this section"""
+        if hasattr(self, '_student_count'):
+            return self._student_count
         return self.students.count()
     
     @property
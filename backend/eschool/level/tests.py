@@ -1,3 +1,102 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from django.test import tag
+
+from eschool.testing import QueryBudgetTestCase, SchoolQueryBudgetTestCase
+
+
+class LevelListQueryTests(SchoolQueryBudgetTestCase):
+    """List and detail endpoints load related rows up-front"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from level.models import LevelSubject, SectionSubject
+
+        for i, subject in enumerate(cls.subjects):
+            LevelSubject.objects.create(level=cls.level, subject=subject)
+            SectionSubject.objects.create(section=cls.sections[i], subject=subject, teacher=cls.teachers[i])
+
+    def test_level_subject_list_query_budget(self):
+        self.assertQueryBudget('/api/level-subjects/', 2)
+
+    def test_section_subject_list_query_budget(self):
+        self.assertQueryBudget('/api/section-subjects/', 2)
+
+    def test_section_detail_query_budget(self):
+        self.assertQueryBudget(f'/api/sections/{self.sections[0].pk}/', 2)
+
+    def test_section_list_query_budget(self):
+        self.assertQueryBudget('/api/sections/', 2)
+
+    def test_level_list_query_budget(self):
+        self.assertQueryBudget('/api/levels/', 2)
+
+    def test_section_available_spots_query_budget(self):
+        self.assertQueryBudget('/api/sections/available_spots/', 1)
+
+
+@tag('benchmark')
+class StatisticsBenchmarkTests(QueryBudgetTestCase):
+    """Statistics endpoints stay flat on a school with 500 sections and 20k students"""
+
+    levels = 10
+    sections_per_level = 50
+    students_per_section = 40
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from classroom.models import Class
+        from level.models import Level, Section
+        from student.models import Student
+
+        rooms = Class.objects.bulk_create(
+            Class(floor=i // 100, room_no=str(i), capacity=40)
+            for i in range(cls.levels * cls.sections_per_level)
+        )
+        Level.objects.bulk_create(
+            Level(level_no=no, level_name=f'Grade {no}', level_type='elementary')
+            for no in range(1, cls.levels + 1)
+        )
+        sections = Section.objects.bulk_create(
+            Section(
+                level_id=no, sec_no=str(i), section_name=f'Grade {no}-{i}',
+                room=rooms[(no - 1) * cls.sections_per_level + i],
+                # Every other section ends up full
+                max_students=cls.students_per_section + i % 2,
+            )
+            for no in range(1, cls.levels + 1)
+            for i in range(cls.sections_per_level)
+        )
+        Student.objects.bulk_create(
+            (
+                Student(
+                    student_number=f'BEN{n:06}', name=f'Student {n}',
+                    email=f'bench{n}@example.com', gender='male',
+                    date_of_birth=datetime.date(2012, 1, 1), enroll_date=datetime.date(2024, 1, 1),
+                    address='Street', level_id=section.level_id, section=section,
+                    emergency_contact_name='Guardian', emergency_contact_phone='0100',
+                )
+                for n, section in enumerate(
+                    section for section in sections for _ in range(cls.students_per_section)
+                )
+            ),
+            batch_size=2000,
+        )
+
+    def test_level_statistics(self):
+        response = self.assertQueryBudget('/api/levels/statistics/', 2)
+        self.assertEqual(response.data['total_sections'], 500)
+        self.assertEqual(response.data['total_students'], 20000)
+        self.assertResponseTime('/api/levels/statistics/', 0.5)
+
+    def test_section_statistics(self):
+        response = self.assertQueryBudget('/api/sections/statistics/', 2)
+        self.assertEqual(response.data['full_sections'], 250)
+        self.assertResponseTime('/api/sections/statistics/', 0.5)
+
+    def test_class_statistics(self):
+        response = self.assertQueryBudget('/api/classes/statistics/', 2)
+        self.assertEqual(response.data['total_capacity'], 20000)
+        self.assertResponseTime('/api/classes/statistics/', 0.5)
@@ -3,6 +3,9 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
+from eschool.annotations import related_count
+from eschool.mixins import RelatedFieldsMixin
+from eschool.statistics import StatisticsBuilder
 from .models import Level, Section, LevelSubject, SectionSubject
 from .serializers import (
     LevelSerializer, LevelDetailSerializer,
@@ -11,10 +14,10 @@ from .serializers import (
 )
 
 
-class LevelViewSet(viewsets.ModelViewSet):
+class LevelViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for Level model"""
     
-    queryset = Level.objects.all()
+    queryset = Level.objects.with_counts()
     serializer_class = LevelSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['level_type', 'is_active']
@@ -32,7 +35,7 @@ class LevelViewSet(viewsets.ModelViewSet):
     def sections(self, request, pk=None):
         """Get sections for a specific level"""
         level = self.get_object()
-        sections = level.sections.filter(is_active=True)
+        sections = level.sections.with_counts().filter(is_active=True)
         serializer = SectionSerializer(sections, many=True)
         return Response(serializer.data)
     
@@ -76,22 +79,26 @@ class LevelViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Get level statistics"""
-        from django.db.models import Count
+        from django.db.models import Sum
         
-        stats = {
-            'total_levels': Level.objects.count(),
-            'active_levels': Level.objects.filter(is_active=True).count(),
-            'by_type': list(Level.objects.values('level_type').annotate(count=Count('id'))),
-            'total_students': sum(level.student_count for level in Level.objects.all()),
-            'total_sections': sum(level.section_count for level in Level.objects.all()),
-        }
+        stats = (
+            StatisticsBuilder(Level.objects.all())
+            .count('total_levels')
+            .count('active_levels', is_active=True)
+            .group_by('by_type', 'level_type')
+            .aggregate('total_students', Sum(related_count(Level, 'students')))
+            .aggregate('total_sections', Sum(related_count(Level, 'sections')))
+            .build()
+        )
+        stats['total_students'] = stats['total_students'] or 0
+        stats['total_sections'] = stats['total_sections'] or 0
         return Response(stats)
 
 
-class SectionViewSet(viewsets.ModelViewSet):
+class SectionViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for Section model"""
     
-    queryset = Section.objects.all()
+    queryset = Section.objects.with_counts()
     serializer_class = SectionSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['level', 'section_type', 'is_active', 'class_teacher']
@@ -141,7 +148,7 @@ class SectionViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def available_spots(self, request):
         """Get sections with available spots"""
-        sections = Section.objects.filter(is_active=True)
+        sections = Section.objects.with_counts().filter(is_active=True).select_related('level')
         available = []
         for section in sections:
             if not section.is_full:
@@ -157,24 +164,22 @@ class SectionViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Get section statistics"""
-        from django.db.models import Count, Avg
+        from django.db.models import Avg, F
         
-        stats = {
-            'total_sections': Section.objects.count(),
-            'active_sections': Section.objects.filter(is_active=True).count(),
-            'by_type': list(Section.objects.values('section_type').annotate(count=Count('id'))),
-            'average_capacity': round(
-                Section.objects.aggregate(
-                    avg_capacity=Avg('max_students')
-                )['avg_capacity'] or 0, 2
-            ),
-            'full_sections': Section.objects.filter(is_active=True).count() - 
-                           sum(1 for s in Section.objects.filter(is_active=True) if not s.is_full),
-        }
+        stats = (
+            StatisticsBuilder(Section.objects.with_counts())
+            .count('total_sections')
+            .count('active_sections', is_active=True)
+            .group_by('by_type', 'section_type')
+            .aggregate('average_capacity', Avg('max_students'))
+            .count('full_sections', is_active=True, _student_count__gte=F('max_students'))
+            .build()
+        )
+        stats['average_capacity'] = round(stats['average_capacity'] or 0, 2)
         return Response(stats)
 
 
-class LevelSubjectViewSet(viewsets.ModelViewSet):
+class LevelSubjectViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for LevelSubject model"""
     
     queryset = LevelSubject.objects.all()
@@ -186,7 +191,7 @@ class LevelSubjectViewSet(viewsets.ModelViewSet):
     ordering = ['level__level_no', 'subject__s_name']
 
 
-class SectionSubjectViewSet(viewsets.ModelViewSet):
+class SectionSubjectViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for SectionSubject model"""
     queryset = SectionSubject.objects.all()
     serializer_class = SectionSubjectSerializer
@@ -0,0 +1,203 @@
+"""
+Term invoicing from fee schedules.
+
+``run_invoicing`` charges every active student the fees their level's
+``FeeSchedule`` rows define for an academic year: one ``Payment`` per
+student and fee, split into ``PaymentHistory`` installments. Students are
+processed in chunks, each in its own transaction, and every chunk costs
+the same handful of queries: primary parents, scholarship totals and the
+payments already invoiced are read in one query each, and the new rows go
+out with ``bulk_create``.
+
+A student who already has a payment of the same type, academic year and
+semester is skipped, so a run that was interrupted, or is repeated after
+new students enrolled, only adds what is missing. Each chunk locks the
+fee schedules it invoices before it reads what is already there, so two
+overlapping runs (a sync request next to a queued job) take turns, and
+``Payment.fee_schedule`` is unique per student as a last line of defence.
+Invoicing records the scholarship part of each discount in
+``Payment.scholarship_discount``; only those amounts count against the
+scholarship on a later run, not discounts granted by hand.
+"""
+import datetime
+import time
+from collections import defaultdict
+from decimal import Decimal, ROUND_DOWN
+
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from eschool.cache import invalidate
+from student.models import Student, StudentParent, StudentScholarship
+
+from .models import FeeSchedule, Payment, PaymentHistory
+
+
+DEFAULT_CHUNK_SIZE = 500
+
+CENT = Decimal('0.01')
+
+
+def split_installments(total, count):
+    """Split ``total`` into ``count`` amounts to the cent; the last one takes the remainder"""
+    share = (total / count).quantize(CENT, rounding=ROUND_DOWN)
+    return [share] * (count - 1) + [total - share * (count - 1)]
+
+
+def _primary_parents(student_ids):
+    parents = {}
+    links = StudentParent.objects.filter(student_id__in=student_ids, is_active=True).order_by(
+        'student_id', '-is_primary_contact', 'created_at'
+    ).values_list('student_id', 'parent_id')
+    for student_id, parent_id in links:
+        parents.setdefault(student_id, parent_id)
+    return parents
+
+
+def _scholarship_totals(student_ids, academic_year):
+    return dict(
+        StudentScholarship.objects.filter(
+            student_id__in=student_ids, academic_year=academic_year, is_active=True
+        ).order_by().values('student_id').annotate(total=Sum('amount_awarded'))
+        .values_list('student_id', 'total')
+    )
+
+
+def _invoiced(student_ids, academic_year):
+    """The (student, type, semester) keys invoiced in ``academic_year`` and the scholarship each student used so far"""
+    invoiced, discounted = set(), defaultdict(Decimal)
+    for student_id, payment_type, semester, discount in Payment.objects.filter(
+        student_id__in=student_ids, academic_year=academic_year
+    ).order_by().values_list('student_id', 'payment_type', 'semester', 'scholarship_discount'):
+        invoiced.add((student_id, payment_type, semester or ''))
+        discounted[student_id] += discount or 0
+    return invoiced, discounted
+
+
+def _lock_schedules(schedules_by_level):
+    """Lock the fee schedules of a run; an overlapping run waits here and then sees the new payments"""
+    list(FeeSchedule.objects.filter(
+        pk__in=[schedule.pk for schedules in schedules_by_level.values() for schedule in schedules]
+    ).select_for_update().values_list('pk', flat=True))
+
+
+def _invoice_chunk(students, schedules_by_level, academic_year, stats):
+    with transaction.atomic():
+        _lock_schedules(schedules_by_level)
+        student_ids = [pk for pk, level_id in students]
+        parents = _primary_parents(student_ids)
+        invoiced, discounted = _invoiced(student_ids, academic_year)
+        scholarships = {}
+        if any(schedule.apply_scholarships for schedules in schedules_by_level.values() for schedule in schedules):
+            scholarships = _scholarship_totals(student_ids, academic_year)
+
+        planned = []
+        for student_id, level_id in students:
+            if student_id not in parents:
+                stats['students_without_parent'].append(str(student_id))
+                continue
+            # A scholarship is deducted once, across the fees that accept it and the runs before this one
+            remaining_scholarship = (scholarships.get(student_id) or Decimal('0')) - discounted[student_id]
+            for schedule in schedules_by_level[level_id]:
+                if (student_id, schedule.payment_type, schedule.semester) in invoiced:
+                    stats['skipped_existing'] += 1
+                    continue
+                discount = Decimal('0')
+                if schedule.apply_scholarships and remaining_scholarship > 0:
+                    discount = min(remaining_scholarship, schedule.amount)
+                    remaining_scholarship -= discount
+                payment = Payment(
+                    parent_id=parents[student_id],
+                    student_id=student_id,
+                    payment_type=schedule.payment_type,
+                    amount=schedule.amount,
+                    due_date=schedule.due_date,
+                    status='pending',
+                    academic_year=academic_year,
+                    semester=schedule.semester or None,
+                    description=schedule.description,
+                    late_fee=Decimal('0'),
+                    discount=discount,
+                    scholarship_discount=discount,
+                    total_amount=schedule.amount - discount,
+                    fee_schedule=schedule,
+                )
+                planned.append((payment, schedule))
+
+        if not planned:
+            return
+        payments = [payment for payment, schedule in planned]
+
+        Payment.objects.bulk_create(payments)
+        if not connection.features.can_return_rows_from_bulk_insert:
+            # Read the new keys back; (student, fee schedule) is unique
+            keys = dict(
+                ((student_id, fee_schedule_id), pk)
+                for pk, student_id, fee_schedule_id in Payment.objects.filter(
+                    student_id__in=student_ids, fee_schedule__in={schedule.pk for payment, schedule in planned},
+                ).values_list('pk', 'student_id', 'fee_schedule_id')
+            )
+            for payment, schedule in planned:
+                payment.pk = keys[(payment.student_id, schedule.pk)]
+
+        installments = []
+        for payment, schedule in planned:
+            amounts = split_installments(payment.total_amount, schedule.installments)
+            for number, amount in enumerate(amounts, start=1):
+                installments.append(PaymentHistory(
+                    payment_id=payment.pk,
+                    installment_number=number,
+                    amount=amount,
+                    due_date=schedule.due_date + datetime.timedelta(
+                        days=schedule.installment_interval_days * (number - 1)
+                    ),
+                    status='pending',
+                ))
+        PaymentHistory.objects.bulk_create(installments)
+
+    stats['payments_created'] += len(payments)
+    stats['installments_created'] += len(installments)
+
+
+def run_invoicing(academic_year, semester=None, level=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Invoice the active fee schedules of ``academic_year`` to every active student.
+
+    ``semester`` and ``level`` narrow the schedules that are invoiced.
+    Returns the counts of the run and its throughput in rows per second.
+    """
+    started = time.perf_counter()
+    schedules = FeeSchedule.objects.filter(academic_year=academic_year, is_active=True)
+    if semester is not None:
+        schedules = schedules.filter(semester=semester)
+    if level is not None:
+        schedules = schedules.filter(level_id=level)
+
+    schedules_by_level = defaultdict(list)
+    for schedule in schedules.order_by('level_id', 'semester', 'payment_type'):
+        schedules_by_level[schedule.level_id].append(schedule)
+
+    students = list(
+        Student.objects.filter(level_id__in=list(schedules_by_level), status='active')
+        .order_by('pk').values_list('pk', 'level_id')
+    ) if schedules_by_level else []
+
+    stats = {
+        'academic_year': academic_year,
+        'schedules': sum(len(level_schedules) for level_schedules in schedules_by_level.values()),
+        'students': len(students),
+        'payments_created': 0,
+        'installments_created': 0,
+        'skipped_existing': 0,
+        'students_without_parent': [],
+    }
+    for offset in range(0, len(students), chunk_size):
+        _invoice_chunk(students[offset:offset + chunk_size], schedules_by_level, academic_year, stats)
+
+    if stats['payments_created']:
+        invalidate(Payment, PaymentHistory)
+    elapsed = time.perf_counter() - started
+    rows = stats['payments_created'] + stats['installments_created']
+    stats['elapsed'] = round(elapsed, 3)
+    stats['rows_per_second'] = round(rows / elapsed, 1) if elapsed else 0
+    return stats
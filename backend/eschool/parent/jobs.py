@@ -0,0 +1,9 @@
+from jobs.queue import register
+
+from .invoicing import run_invoicing
+
+
+@register('parent.invoicing')
+def invoicing(academic_year, semester=None, level=None):
+    """Invoice an academic year's fee schedules to every active student"""
+    return run_invoicing(academic_year, semester=semester, level=level)
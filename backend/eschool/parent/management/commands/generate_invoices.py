@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from parent.invoicing import DEFAULT_CHUNK_SIZE, run_invoicing
+
+
+class Command(BaseCommand):
+    help = 'Generate the Payments and installments of the fee schedules of an academic year'
+
+    def add_arguments(self, parser):
+        parser.add_argument('academic_year', help='Academic year to invoice, e.g. 2025')
+        parser.add_argument('--semester', help='Only invoice the schedules of this semester')
+        parser.add_argument('--level', type=int, help='Only invoice the schedules of this level')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Students invoiced per transaction')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        stats = run_invoicing(
+            options['academic_year'],
+            semester=options['semester'],
+            level=options['level'],
+            chunk_size=options['chunk_size'],
+        )
+
+        for student_id in stats['students_without_parent']:
+            self.stdout.write(self.style.WARNING(f'Skipped student {student_id}: no active parent to invoice'))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Invoiced {stats['students']} students against {stats['schedules']} fee schedules: "
+                f"{stats['payments_created']} payments and {stats['installments_created']} installments, "
+                f"{stats['skipped_existing']} already invoiced, in {stats['elapsed']:.2f}s "
+                f"({stats['rows_per_second']:.0f} rows/sec)"
+            )
+        )
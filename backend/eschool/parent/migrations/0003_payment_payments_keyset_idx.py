@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parent', '0002_initial'),
+        ('student', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['-due_date', '-pay_id'], name='payments_keyset_idx'),
+        ),
+    ]
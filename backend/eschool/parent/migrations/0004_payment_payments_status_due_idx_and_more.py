@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parent', '0003_payment_payments_keyset_idx'),
+        ('student', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'due_date'], name='payments_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['student', 'due_date'], name='payments_student_due_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:25
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('level', '0005_sectionsubject'),
+        ('parent', '0004_payment_payments_status_due_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeeSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.CharField(help_text='Academic year of the fee', max_length=10)),
+                ('semester', models.CharField(blank=True, default='', help_text='Semester (blank for a yearly fee)', max_length=20)),
+                ('payment_type', models.CharField(choices=[('tuition', 'Tuition Fee'), ('transport', 'Transport Fee'), ('library', 'Library Fee'), ('laboratory', 'Laboratory Fee'), ('sports', 'Sports Fee'), ('examination', 'Examination Fee'), ('development', 'Development Fee'), ('other', 'Other')], help_text='Type of fee', max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, help_text='Fee amount per student', max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))])),
+                ('due_date', models.DateField(help_text='Due date of the fee (of the first installment)')),
+                ('installments', models.PositiveIntegerField(default=1, help_text='Number of installments the fee is split into', validators=[django.core.validators.MinValueValidator(1)])),
+                ('installment_interval_days', models.PositiveIntegerField(default=30, help_text='Days between installment due dates')),
+                ('apply_scholarships', models.BooleanField(default=False, help_text="Whether the student's active scholarships are deducted from this fee")),
+                ('description', models.TextField(blank=True, help_text='Description copied to the generated payments', null=True)),
+                ('is_active', models.BooleanField(default=True, help_text='Whether invoicing runs include this fee')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('level', models.ForeignKey(help_text='Level whose students are charged this fee', on_delete=django.db.models.deletion.CASCADE, related_name='fee_schedules', to='level.level')),
+            ],
+            options={
+                'verbose_name': 'Fee Schedule',
+                'verbose_name_plural': 'Fee Schedules',
+                'db_table': 'fee_schedules',
+                'ordering': ['academic_year', 'level', 'semester', 'payment_type'],
+                'unique_together': {('level', 'academic_year', 'semester', 'payment_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parent', '0005_feeschedule'),
+        ('student', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='fee_schedule',
+            field=models.ForeignKey(blank=True, help_text='Fee schedule this payment was invoiced from', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payments', to='parent.feeschedule'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='scholarship_discount',
+            field=models.DecimalField(decimal_places=2, default=0.0, help_text="Part of the discount deducted from the student's scholarship by invoicing", max_digits=10),
+        ),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(fields=('student', 'fee_schedule'), name='payments_student_fee_uniq'),
+        ),
+    ]
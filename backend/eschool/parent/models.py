@@ -1,5 +1,19 @@
+from decimal import Decimal
+
 from django.db import models
-from django.core.validators import EmailValidator, MinLengthValidator
+from django.core.validators import EmailValidator, MinLengthValidator, MinValueValidator
+
+from eschool.annotations import related_count
+
+
+class ParentQuerySet(models.QuerySet):
+    """Queryset for Parent with annotated counts"""
+
+    def with_counts(self):
+        """Annotate the values read by ``children_count``"""
+        return self.annotate(
+            _children_count=related_count(self.model, 'children', is_active=True),
+        )
 
 
 class Parent(models.Model):
@@ -103,6 +117,8 @@ class Parent(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ParentQuerySet.as_manager()
+    
     class Meta:
         db_table = 'parents'
         ordering = ['name']
@@ -115,6 +131,8 @@ class Parent(models.Model):
     @property
     def children_count(self):
         """Return the number of children this parent has"""
+        if hasattr(self, '_children_count'):
+            return self._children_count
         return self.children.filter(is_active=True).count()
     
     @property
@@ -237,11 +255,25 @@ class Payment(models.Model):
         default=0.00,
         help_text="Discount amount"
     )
+    scholarship_discount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0.00,
+        help_text="Part of the discount deducted from the student's scholarship by invoicing"
+    )
     total_amount = models.DecimalField(
         max_digits=10,
         decimal_places=2,
         help_text="Total amount including fees and discounts"
     )
+    fee_schedule = models.ForeignKey(
+        'FeeSchedule',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='payments',
+        help_text="Fee schedule this payment was invoiced from"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -250,6 +282,18 @@ class Payment(models.Model):
         ordering = ['-due_date']
         verbose_name = 'Payment'
         verbose_name_plural = 'Payments'
+        constraints = [
+            # A fee is invoiced to a student once, however many runs overlap
+            models.UniqueConstraint(fields=['student', 'fee_schedule'], name='payments_student_fee_uniq'),
+        ]
+        indexes = [
+            # Keyset pagination over the default ordering (-due_date, -pk)
+            models.Index(fields=['-due_date', '-pay_id'], name='payments_keyset_idx'),
+            # overdue, pending and the summary status breakdown
+            models.Index(fields=['status', 'due_date'], name='payments_status_due_idx'),
+            # monthly payments of a student
+            models.Index(fields=['student', 'due_date'], name='payments_student_due_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student.name} - {self.get_payment_type_display()} ({self.amount})"
@@ -261,9 +305,9 @@ class Payment(models.Model):
     
     @property
     def is_overdue(self):
-        """Check if payment is overdue"""
+        """Check if payment is overdue (set by the daily overdue sweep, see finance/overdue.py)"""
         from datetime import date
-        return self.status == 'pending' and self.due_date < date.today()
+        return self.status == 'overdue' or (self.status == 'pending' and self.due_date < date.today())
     
     @property
     def days_overdue(self):
@@ -334,4 +378,72 @@ class PaymentHistory(models.Model):
         unique_together = ['payment', 'installment_number']
     
     def __str__(self):
-        return f"{self.payment.student.name} - Installment {self.installment_number} ({self.amount})"
\ No newline at end of file
+        return f"{self.payment.student.name} - Installment {self.installment_number} ({self.amount})"
+
+class FeeSchedule(models.Model):
+    """Fee charged to every student of a level for an academic year, invoiced in bulk"""
+    
+    level = models.ForeignKey(
+        'level.Level',
+        on_delete=models.CASCADE,
+        related_name='fee_schedules',
+        help_text="Level whose students are charged this fee"
+    )
+    academic_year = models.CharField(
+        max_length=10,
+        help_text="Academic year of the fee"
+    )
+    semester = models.CharField(
+        max_length=20,
+        blank=True,
+        default='',
+        help_text="Semester (blank for a yearly fee)"
+    )
+    payment_type = models.CharField(
+        max_length=20,
+        choices=Payment.PAYMENT_TYPES,
+        help_text="Type of fee"
+    )
+    amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        validators=[MinValueValidator(Decimal('0.01'))],
+        help_text="Fee amount per student"
+    )
+    due_date = models.DateField(
+        help_text="Due date of the fee (of the first installment)"
+    )
+    installments = models.PositiveIntegerField(
+        default=1,
+        validators=[MinValueValidator(1)],
+        help_text="Number of installments the fee is split into"
+    )
+    installment_interval_days = models.PositiveIntegerField(
+        default=30,
+        help_text="Days between installment due dates"
+    )
+    apply_scholarships = models.BooleanField(
+        default=False,
+        help_text="Whether the student's active scholarships are deducted from this fee"
+    )
+    description = models.TextField(
+        blank=True,
+        null=True,
+        help_text="Description copied to the generated payments"
+    )
+    is_active = models.BooleanField(
+        default=True,
+        help_text="Whether invoicing runs include this fee"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'fee_schedules'
+        ordering = ['academic_year', 'level', 'semester', 'payment_type']
+        verbose_name = 'Fee Schedule'
+        verbose_name_plural = 'Fee Schedules'
+        unique_together = ['level', 'academic_year', 'semester', 'payment_type']
+    
+    def __str__(self):
+        return f"Level {self.level_id} {self.academic_year} - {self.get_payment_type_display()} ({self.amount})"
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Parent, Payment, PaymentHistory
+from .models import Parent, Payment, PaymentHistory, FeeSchedule
 
 
 class ParentSerializer(serializers.ModelSerializer):
@@ -102,3 +102,18 @@ class ParentListSerializer(serializers.ModelSerializer):
 
 
 
+
+
+class FeeScheduleSerializer(serializers.ModelSerializer):
+    """Serializer for FeeSchedule model"""
+    
+    level_name = serializers.CharField(source='level.level_name', read_only=True)
+    
+    class Meta:
+        model = FeeSchedule
+        fields = [
+            'id', 'level', 'level_name', 'academic_year', 'semester', 'payment_type',
+            'amount', 'due_date', 'installments', 'installment_interval_days',
+            'apply_scholarships', 'description', 'is_active', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'created_at', 'updated_at']
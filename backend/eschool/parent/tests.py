@@ -1,3 +1,126 @@
-from django.test import TestCase
+import datetime
+from decimal import Decimal
 
-# Create your tests here.
+from eschool.testing import SchoolQueryBudgetTestCase
+
+
+class PaymentListQueryTests(SchoolQueryBudgetTestCase):
+    """List and detail endpoints load related rows up-front"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from parent.models import Parent, Payment
+
+        for i, student in enumerate(cls.students):
+            parent = Parent.objects.create(
+                name=f'Parent {i}', email=f'parent{i}@example.com', phone='0100',
+                gender='male', occupation='employed', address='Street',
+            )
+            Payment.objects.create(
+                parent=parent, student=student, payment_type='tuition', amount=Decimal('100'),
+                due_date=datetime.date(2025, 1, 10), academic_year='2025',
+                total_amount=Decimal('0'), late_fee=Decimal('0'), discount=Decimal('0'),
+            )
+
+    def test_payment_list_query_budget(self):
+        self.assertQueryBudget('/api/payments/', 3)
+
+
+class FeeInvoicingTests(SchoolQueryBudgetTestCase):
+    """Invoicing runs bulk-create payments and installments and are idempotent"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from parent.models import FeeSchedule, Parent
+        from student.models import Scholarship, StudentParent, StudentScholarship
+
+        # The last student has no parent and cannot be invoiced
+        for i, student in enumerate(cls.students[:2]):
+            parent = Parent.objects.create(
+                name=f'Parent {i}', email=f'invoice-parent{i}@example.com', phone='0100',
+                gender='male', occupation='employed', address='Street',
+            )
+            StudentParent.objects.create(student=student, parent=parent, relationship='father')
+        scholarship = Scholarship.objects.create(
+            name='Merit', scholarship_type='merit', amount=Decimal('150'), criteria='Top marks',
+        )
+        StudentScholarship.objects.create(
+            student=cls.students[0], scholarship=scholarship, award_date=datetime.date(2025, 1, 1),
+            amount_awarded=Decimal('150'), academic_year='2025',
+        )
+        FeeSchedule.objects.create(
+            level=cls.level, academic_year='2025', payment_type='tuition', amount=Decimal('1000'),
+            due_date=datetime.date(2025, 2, 1), installments=3, apply_scholarships=True,
+        )
+        FeeSchedule.objects.create(
+            level=cls.level, academic_year='2025', payment_type='transport', amount=Decimal('50'),
+            due_date=datetime.date(2025, 2, 1),
+        )
+
+    def test_invoicing_is_idempotent(self):
+        from parent.invoicing import run_invoicing
+        from parent.models import Payment, PaymentHistory
+
+        stats = run_invoicing('2025')
+        self.assertEqual((stats['payments_created'], stats['installments_created']), (4, 8))
+        self.assertEqual(stats['students_without_parent'], [str(self.students[2].pk)])
+
+        tuition = Payment.objects.get(student=self.students[0], payment_type='tuition')
+        self.assertEqual((tuition.discount, tuition.total_amount), (Decimal('150.00'), Decimal('850.00')))
+        installments = list(tuition.payment_history.order_by('installment_number'))
+        self.assertEqual([row.amount for row in installments], [Decimal('283.33'), Decimal('283.33'), Decimal('283.34')])
+        self.assertEqual(installments[2].due_date, datetime.date(2025, 4, 2))
+
+        stats = run_invoicing('2025')
+        self.assertEqual((stats['payments_created'], stats['skipped_existing']), (0, 4))
+        self.assertEqual(Payment.objects.count(), 4)
+        self.assertEqual(PaymentHistory.objects.count(), 8)
+
+    def test_rerun_does_not_deduct_the_scholarship_again(self):
+        from parent.invoicing import run_invoicing
+        from parent.models import FeeSchedule, Payment
+
+        run_invoicing('2025')
+        FeeSchedule.objects.create(
+            level=self.level, academic_year='2025', payment_type='library', amount=Decimal('200'),
+            due_date=datetime.date(2025, 3, 1), apply_scholarships=True,
+        )
+        stats = run_invoicing('2025')
+        self.assertEqual(stats['payments_created'], 2)
+        library = Payment.objects.get(student=self.students[0], payment_type='library')
+        self.assertEqual((library.discount, library.total_amount), (Decimal('0.00'), Decimal('200.00')))
+
+    def test_manual_discounts_leave_the_scholarship_alone(self):
+        from parent.invoicing import run_invoicing
+        from parent.models import Parent, Payment
+
+        # A goodwill discount granted by hand before the run
+        Payment.objects.create(
+            parent=Parent.objects.first(), student=self.students[0], payment_type='examination', amount=Decimal('100'),
+            late_fee=Decimal('0'), discount=Decimal('100'), due_date=datetime.date(2025, 1, 10),
+            academic_year='2025',
+        )
+        run_invoicing('2025')
+        tuition = Payment.objects.get(student=self.students[0], payment_type='tuition')
+        self.assertEqual((tuition.discount, tuition.scholarship_discount), (Decimal('150.00'), Decimal('150.00')))
+
+    def test_a_fee_is_invoiced_to_a_student_once(self):
+        from django.db import IntegrityError, transaction
+        from parent.invoicing import run_invoicing
+        from parent.models import Payment
+
+        run_invoicing('2025')
+        tuition = Payment.objects.get(student=self.students[0], payment_type='tuition')
+        tuition.pk = None
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            tuition.save()
+
+    def test_invoice_endpoint_query_count_is_per_chunk(self):
+        # schedules, students, then the schedule lock, parents, invoiced, scholarships,
+        # payments and installments
+        response = self.assertQueryBudget(
+            '/api/fee-schedules/invoice/', 10, method='post', data={'academic_year': '2025'}
+        )
+        self.assertEqual(response.data['payments_created'], 4)
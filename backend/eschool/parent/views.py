@@ -4,17 +4,21 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .models import Parent, Payment, PaymentHistory
+from eschool.mixins import ExportMixin, RelatedFieldsMixin
+from eschool.cache import cached_response
+from eschool.statistics import StatisticsBuilder
+from jobs.views import async_requested, job_accepted
+from .models import Parent, Payment, PaymentHistory, FeeSchedule
 from .serializers import (
     ParentSerializer, ParentDetailSerializer, ParentListSerializer,
-    PaymentSerializer, PaymentHistorySerializer
+    PaymentSerializer, PaymentHistorySerializer, FeeScheduleSerializer
 )
 
 
-class ParentViewSet(viewsets.ModelViewSet):
+class ParentViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for Parent model"""
     
-    queryset = Parent.objects.all()
+    queryset = Parent.objects.with_counts()
     serializer_class = ParentSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['gender', 'occupation', 'is_primary_contact', 'is_emergency_contact']
@@ -71,19 +75,19 @@ class ParentViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Get parent statistics"""
-        from django.db.models import Count
-        
-        stats = {
-            'total_parents': Parent.objects.count(),
-            'primary_contacts': Parent.objects.filter(is_primary_contact=True).count(),
-            'emergency_contacts': Parent.objects.filter(is_emergency_contact=True).count(),
-            'by_occupation': list(Parent.objects.values('occupation').annotate(count=Count('id'))),
-            'by_gender': list(Parent.objects.values('gender').annotate(count=Count('id'))),
-        }
+        stats = (
+            StatisticsBuilder(Parent.objects.all())
+            .count('total_parents')
+            .count('primary_contacts', is_primary_contact=True)
+            .count('emergency_contacts', is_emergency_contact=True)
+            .group_by('by_occupation', 'occupation')
+            .group_by('by_gender', 'gender')
+            .build()
+        )
         return Response(stats)
 
 
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(ExportMixin, RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for Payment model"""
     
     queryset = Payment.objects.all()
@@ -93,13 +97,17 @@ class PaymentViewSet(viewsets.ModelViewSet):
     search_fields = ['parent__name', 'student__name', 'transaction_id']
     ordering_fields = ['due_date', 'payment_date', 'amount']
     ordering = ['-due_date']
+    export_fields = [
+        'pay_id', 'student_id', 'student__student_number', 'student__name', 'parent__name',
+        'payment_type', 'academic_year', 'semester', 'amount', 'late_fee', 'discount',
+        'total_amount', 'due_date', 'payment_date', 'status', 'payment_method', 'transaction_id',
+    ]
     
     @action(detail=False, methods=['get'])
     def overdue(self, request):
         """Get overdue payments"""
-        overdue_payments = Payment.objects.filter(
-            status='pending', due_date__lt=timezone.now().date()
-        )
+        from finance.overdue import overdue_filter
+        overdue_payments = self.get_queryset().filter(overdue_filter('due_date'))
         serializer = PaymentSerializer(overdue_payments, many=True)
         return Response(serializer.data)
     
@@ -144,24 +152,46 @@ class PaymentViewSet(viewsets.ModelViewSet):
         serializer = PaymentSerializer(payment)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['post'], url_path='mark_paid/bulk')
+    def bulk_mark_paid(self, request):
+        """Mark many payments as paid and post them to the ledger in one batch"""
+        from rest_framework import serializers
+        from finance.ledger import mark_payments_paid
+        
+        try:
+            ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False).run_validation(
+                request.data.get('payments')
+            )
+            payment_date = request.data.get('payment_date')
+            payment_date = serializers.DateField().run_validation(payment_date) if payment_date else None
+            payment_method = request.data.get('payment_method') or None
+            if payment_method:
+                payment_method = serializers.ChoiceField(Payment.PAYMENT_METHODS).run_validation(payment_method)
+        except serializers.ValidationError as e:
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        
+        result = mark_payments_paid(ids, payment_date, payment_method)
+        partial = result['not_found'] or result['skipped']
+        return Response(result, status=status.HTTP_207_MULTI_STATUS if partial else status.HTTP_200_OK)
+    
     @action(detail=False, methods=['get'])
+    @cached_response(Payment)
     def summary(self, request):
         """Get payment summary"""
         from django.db.models import Sum, Count
-        from django.utils import timezone
-        
-        today = timezone.now().date()
+        from finance.overdue import overdue_filter
         
+        overdue = overdue_filter('due_date')
         summary = {
             'total_payments': Payment.objects.count(),
             'total_amount': Payment.objects.aggregate(Sum('amount'))['amount__sum'] or 0,
             'paid_amount': Payment.objects.filter(status='paid').aggregate(Sum('amount'))['amount__sum'] or 0,
-            'pending_amount': Payment.objects.filter(status='pending').aggregate(Sum('amount'))['amount__sum'] or 0,
-            'overdue_count': Payment.objects.filter(
-                status='pending', due_date__lt=today
-            ).count(),
+            # Not yet due; past-due pending rows count as overdue before the sweep moves them
+            'pending_amount': Payment.objects.filter(status='pending').exclude(overdue).aggregate(Sum('amount'))['amount__sum'] or 0,
+            'overdue_amount': Payment.objects.filter(overdue).aggregate(Sum('amount'))['amount__sum'] or 0,
+            'overdue_count': Payment.objects.filter(overdue).count(),
             'by_status': list(Payment.objects.values('status').annotate(
-                count=Count('id'),
+                count=Count('pk'),
                 total=Sum('amount')
             )),
         }
@@ -199,17 +229,28 @@ class PaymentViewSet(viewsets.ModelViewSet):
         if not all([student_id, year, month]):
             return Response({'error': 'Student ID, year, and month are required'}, status=status.HTTP_400_BAD_REQUEST)
         
+        import calendar
+        from datetime import date
+        
+        try:
+            year, month = int(year), int(month)
+            first_day = date(year, month, 1)
+            last_day = date(year, month, calendar.monthrange(year, month)[1])
+        except (TypeError, ValueError):
+            return Response({'error': 'Invalid year or month'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # A date range (not __year/__month) lets the (student, due_date) index bound the scan
         monthly_payments = Payment.objects.filter(
             student_id=student_id,
-            due_date__year=year,
-            due_date__month=month
+            due_date__gte=first_day,
+            due_date__lte=last_day
         )
         
         serializer = PaymentSerializer(monthly_payments, many=True)
         return Response(serializer.data)
 
 
-class PaymentHistoryViewSet(viewsets.ModelViewSet):
+class PaymentHistoryViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for PaymentHistory model"""
     
     queryset = PaymentHistory.objects.all()
@@ -218,4 +259,37 @@ class PaymentHistoryViewSet(viewsets.ModelViewSet):
     filterset_fields = ['payment', 'status', 'payment_date']
     search_fields = ['payment__student__name', 'transaction_id']
     ordering_fields = ['due_date', 'payment_date', 'amount']
-    ordering = ['-due_date']
\ No newline at end of file
+    ordering = ['-due_date']
+
+class FeeScheduleViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
+    """ViewSet for FeeSchedule model"""
+    
+    queryset = FeeSchedule.objects.all()
+    serializer_class = FeeScheduleSerializer
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['level', 'academic_year', 'semester', 'payment_type', 'is_active']
+    ordering_fields = ['academic_year', 'level', 'due_date', 'amount']
+    ordering = ['academic_year', 'level', 'semester', 'payment_type']
+    
+    @action(detail=False, methods=['post'])
+    def invoice(self, request):
+        """Invoice an academic year's fee schedules to every active student (?async=1 queues it as a job)"""
+        from .invoicing import run_invoicing
+        
+        academic_year = request.data.get('academic_year')
+        if not academic_year:
+            return Response({'error': 'academic_year is required'}, status=status.HTTP_400_BAD_REQUEST)
+        params = {
+            'academic_year': academic_year,
+            'semester': request.data.get('semester'),
+            'level': request.data.get('level') or None,
+        }
+        if params['level'] is not None:
+            try:
+                params['level'] = int(params['level'])
+            except (TypeError, ValueError):
+                return Response({'error': 'level must be a level number'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if async_requested(request):
+            return job_accepted(request, 'parent.invoicing', params)
+        return Response(run_invoicing(**params), status=status.HTTP_201_CREATED)
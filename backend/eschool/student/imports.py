@@ -0,0 +1,425 @@
+"""
+Bulk student import from CSV or XLSX files.
+
+``import_students`` creates the ``Student`` of every row of a file, and
+optionally the row's parent (``Parent`` plus the ``StudentParent`` link).
+The first row holds the column names (see ``COLUMNS``); the file is read
+row by row and handled in chunks, so memory does not grow with the file:
+
+* every row of a chunk is parsed by ``StudentImportRowSerializer``, which
+  has no per-row database validators;
+* student numbers, student emails and parent emails are checked for
+  uniqueness against the database with one query for the students and
+  one for the parents per chunk, and against the rows before them in
+  the file;
+* levels, sections and departments are looked up in maps loaded once;
+* the valid rows are written with ``bulk_create`` in one transaction per
+  chunk.
+
+A row with errors is skipped and reported with its line number and the
+errors per column; the other rows are imported. A parent whose email is
+already known, in the database or earlier in the file, is linked to the
+student instead of being created again, so siblings can share a parent.
+
+Uploads imported in the background are saved under ``MEDIA_ROOT/imports``
+by ``save_upload``, and the job is handed the opaque token it returns, never
+a path; ``upload_path`` only resolves tokens of that shape inside that
+directory.
+"""
+import csv
+import datetime
+import io
+import os
+import re
+import time
+import uuid
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+
+from department.models import Department
+from eschool.cache import invalidate
+from level.models import Level, Section
+from parent.models import Parent
+
+from .models import Student, StudentParent
+
+
+DEFAULT_CHUNK_SIZE = 1000
+
+IMPORT_FORMATS = ('csv', 'xlsx')
+
+UPLOAD_TOKEN = re.compile(r'^[0-9a-f]{32}\.(%s)$' % '|'.join(IMPORT_FORMATS))
+
+# Columns describing the row's parent besides parent_email
+PARENT_COLUMNS = (
+    'parent_name', 'parent_phone', 'parent_gender', 'parent_occupation', 'parent_address', 'relationship',
+)
+
+
+class StudentImportRowSerializer(serializers.Serializer):
+    """One row of a student import file"""
+
+    student_number = serializers.CharField(min_length=3, max_length=20)
+    name = serializers.CharField(min_length=2, max_length=100)
+    email = serializers.EmailField()
+    phone = serializers.CharField(max_length=15, required=False)
+    gender = serializers.ChoiceField(choices=Student.GENDER_CHOICES)
+    date_of_birth = serializers.DateField()
+    enroll_date = serializers.DateField(required=False)
+    address = serializers.CharField()
+    status = serializers.ChoiceField(choices=Student.STUDENT_STATUS, required=False)
+    level = serializers.IntegerField(required=False)
+    section = serializers.CharField(max_length=10, required=False)
+    department = serializers.CharField(max_length=100, required=False)
+    emergency_contact_name = serializers.CharField(max_length=100)
+    emergency_contact_phone = serializers.CharField(max_length=15)
+    previous_education = serializers.CharField(required=False)
+    medical_conditions = serializers.CharField(required=False)
+    parent_name = serializers.CharField(min_length=2, max_length=100, required=False)
+    parent_email = serializers.EmailField(required=False)
+    parent_phone = serializers.CharField(max_length=15, required=False)
+    parent_gender = serializers.ChoiceField(choices=Parent.GENDER_CHOICES, required=False)
+    parent_occupation = serializers.ChoiceField(choices=Parent.OCCUPATION_TYPES, required=False)
+    parent_address = serializers.CharField(required=False)
+    relationship = serializers.ChoiceField(choices=StudentParent.RELATIONSHIP_TYPES, required=False)
+
+    def validate_student_number(self, value):
+        """Normalise the student number like ``StudentSerializer`` does"""
+        return value.strip().upper()
+
+    def validate_email(self, value):
+        """Normalise the email like ``StudentSerializer`` does"""
+        return value.lower()
+
+    def validate_parent_email(self, value):
+        """Compare parent emails case-insensitively"""
+        return value.lower()
+
+    def validate(self, data):
+        """A section needs its level; a parent needs an email"""
+        if 'section' in data and 'level' not in data:
+            raise serializers.ValidationError({'section': ['A section needs the level column.']})
+        if any(name in data for name in PARENT_COLUMNS) and 'parent_email' not in data:
+            raise serializers.ValidationError({'parent_email': ['Required when parent columns are filled in.']})
+        return data
+
+
+COLUMNS = list(StudentImportRowSerializer().fields)
+
+
+def _cell(value):
+    """Turn a spreadsheet cell into what the row serializer expects; empty cells are dropped"""
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, float) and value.is_integer():
+        # Numbers typed into spreadsheets, such as phone numbers and levels
+        return str(int(value))
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def _records(header, rows):
+    columns = [str(name).strip().lower() if name is not None else '' for name in header]
+    unknown = sorted(set(columns) - set(COLUMNS) - {''})
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    missing = [
+        name for name, field in StudentImportRowSerializer().fields.items()
+        if field.required and name not in columns
+    ]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    for values in rows:
+        record = {}
+        for name, value in zip(columns, values):
+            value = _cell(value)
+            if name and value is not None:
+                record[name] = value
+        if record:
+            yield record
+        else:
+            # Blank lines keep their line number but are not imported
+            yield None
+
+
+def read_csv(file):
+    """Yield the records of a CSV file object opened in binary mode"""
+    reader = csv.reader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+    header = next(reader, None)
+    if header is None:
+        raise ValueError('The file is empty')
+    yield from _records(header, reader)
+
+
+def read_xlsx(file):
+    """Yield the records of the first sheet of an XLSX file object"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError('XLSX imports need the openpyxl package; upload a CSV file instead')
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except Exception:
+        raise ValueError('The file is not a valid XLSX workbook')
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise ValueError('The file is empty')
+        yield from _records(header, rows)
+    finally:
+        workbook.close()
+
+
+def file_format(filename):
+    """The import format of ``filename`` from its extension, or None"""
+    extension = os.path.splitext(filename)[1].lower().lstrip('.')
+    return extension if extension in IMPORT_FORMATS else None
+
+
+def _uploads_root():
+    return os.path.join(settings.MEDIA_ROOT, 'imports')
+
+
+def save_upload(upload, import_format):
+    """Save an uploaded file for a background import and return its token"""
+    os.makedirs(_uploads_root(), exist_ok=True)
+    token = f'{uuid.uuid4().hex}.{import_format}'
+    with open(os.path.join(_uploads_root(), token), 'wb') as file:
+        for chunk in upload.chunks():
+            file.write(chunk)
+    return token
+
+
+def upload_path(token):
+    """The path of the upload saved as ``token``; ValueError for anything ``save_upload`` did not return"""
+    if not isinstance(token, str) or not UPLOAD_TOKEN.match(token):
+        raise ValueError('Unknown upload')
+    return os.path.join(_uploads_root(), token)
+
+
+class _Importer:
+    """State of one import run: lookups loaded once and the keys seen so far"""
+
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.levels = set(Level.objects.values_list('pk', flat=True))
+        self.sections = {
+            (level_id, sec_no.upper()): pk
+            for pk, level_id, sec_no in Section.objects.values_list('pk', 'level_id', 'sec_no')
+        }
+        self.departments = {name.lower(): name for name in Department.objects.values_list('pk', flat=True)}
+        self.student_numbers = set()
+        self.student_emails = set()
+        # Parent email -> pk for parents created earlier in the file (None in a dry run)
+        self.parents = {}
+        self.stats = {'rows': 0, 'students': 0, 'parents': 0, 'links': 0}
+        self.errors = []
+        self.row = StudentImportRowSerializer()
+
+    def _error(self, line, errors):
+        if not isinstance(errors, dict):
+            errors = {'non_field_errors': errors}
+        self.errors.append({
+            'row': line,
+            'errors': {field: [str(message) for message in messages] for field, messages in errors.items()},
+        })
+
+    def _resolve(self, data, errors):
+        """Turn the level, section and department columns into keys"""
+        if 'level' in data:
+            if data['level'] not in self.levels:
+                errors.setdefault('level', []).append(f"Level {data['level']} does not exist.")
+            elif 'section' in data:
+                data['section'] = self.sections.get((data['level'], data['section'].upper()))
+                if data['section'] is None:
+                    errors.setdefault('section', []).append('Section does not exist in this level.')
+        if 'department' in data:
+            data['department'] = self.departments.get(data['department'].lower())
+            if data['department'] is None:
+                errors.setdefault('department', []).append('Department does not exist.')
+
+    def chunk(self, rows):
+        """Validate and write one chunk of ``(line, record)`` rows"""
+        rows = [(line, record) for line, record in rows if record is not None]
+        if not rows:
+            return
+        self.stats['rows'] += len(rows)
+        parsed = []
+        for line, record in rows:
+            try:
+                parsed.append((line, self.row.run_validation(record)))
+            except serializers.ValidationError as error:
+                self._error(line, error.detail)
+        if not parsed:
+            return
+
+        # One query each for the database side of the uniqueness checks
+        numbers = {data['student_number'] for line, data in parsed}
+        emails = {data['email'] for line, data in parsed}
+        taken_numbers, taken_emails = set(), set()
+        for number, email in Student.objects.filter(
+            Q(student_number__in=numbers) | Q(email__in=emails)
+        ).order_by().values_list('student_number', 'email'):
+            taken_numbers.add(number)
+            taken_emails.add(email.lower())
+        parent_emails = {data['parent_email'] for line, data in parsed if 'parent_email' in data}
+        existing_parents = dict(
+            (email.lower(), pk) for email, pk in Parent.objects.filter(
+                email__in=parent_emails - set(self.parents)
+            ).values_list('email', 'pk')
+        ) if parent_emails else {}
+
+        valid = []
+        for line, data in parsed:
+            errors = {}
+            if data['student_number'] in taken_numbers or data['student_number'] in self.student_numbers:
+                errors['student_number'] = ['Student number already exists.']
+            if data['email'] in taken_emails or data['email'] in self.student_emails:
+                errors['email'] = ['Email already exists.']
+            self._resolve(data, errors)
+            if errors:
+                self._error(line, errors)
+                continue
+            self.student_numbers.add(data['student_number'])
+            self.student_emails.add(data['email'])
+            valid.append((line, data))
+
+        if not valid:
+            return
+        if self.dry_run:
+            self._count([data for line, data in valid], existing_parents)
+        else:
+            try:
+                self._write([data for line, data in valid], existing_parents)
+            except IntegrityError as error:
+                # Rows written by someone else since the uniqueness checks; the chunk was rolled back
+                for line, data in valid:
+                    self._error(line, {'non_field_errors': [f'Not imported, its chunk failed: {error}']})
+                return
+        self.stats['students'] += len(valid)
+
+    def _count(self, valid, existing_parents):
+        """Count the parents and links a real run would create"""
+        for data in valid:
+            email = data.get('parent_email')
+            if email is None:
+                continue
+            if email not in existing_parents and email not in self.parents:
+                self.parents[email] = None
+                self.stats['parents'] += 1
+            self.stats['links'] += 1
+
+    def _write(self, valid, existing_parents):
+        today = timezone.now().date()
+        students, new_parents, links = [], {}, []
+        for data in valid:
+            student = Student(
+                student_number=data['student_number'],
+                name=data['name'],
+                email=data['email'],
+                phone=data.get('phone'),
+                gender=data['gender'],
+                date_of_birth=data['date_of_birth'],
+                enroll_date=data.get('enroll_date', today),
+                address=data['address'],
+                status=data.get('status', 'active'),
+                level_id=data.get('level'),
+                section_id=data.get('section'),
+                department_id=data.get('department'),
+                emergency_contact_name=data['emergency_contact_name'],
+                emergency_contact_phone=data['emergency_contact_phone'],
+                previous_education=data.get('previous_education'),
+                medical_conditions=data.get('medical_conditions'),
+            )
+            students.append(student)
+            email = data.get('parent_email')
+            if email is None:
+                continue
+            if email not in existing_parents and email not in self.parents and email not in new_parents:
+                new_parents[email] = Parent(
+                    name=data.get('parent_name') or data['emergency_contact_name'],
+                    email=email,
+                    phone=data.get('parent_phone') or data['emergency_contact_phone'],
+                    gender=data.get('parent_gender', 'other'),
+                    occupation=data.get('parent_occupation', 'other'),
+                    address=data.get('parent_address') or data['address'],
+                    is_primary_contact=True,
+                )
+            links.append((student, email, data.get('relationship', 'guardian')))
+
+        with transaction.atomic():
+            Student.objects.bulk_create(students)
+            Parent.objects.bulk_create(new_parents.values())
+            if new_parents and not connection.features.can_return_rows_from_bulk_insert:
+                keys = dict(Parent.objects.filter(email__in=list(new_parents)).values_list('email', 'pk'))
+                for email, parent in new_parents.items():
+                    parent.pk = keys[email]
+            parent_ids = {
+                **existing_parents, **self.parents,
+                **{email: parent.pk for email, parent in new_parents.items()},
+            }
+            StudentParent.objects.bulk_create([
+                StudentParent(
+                    student=student, parent_id=parent_ids[email], relationship=relationship,
+                    is_primary_contact=True, is_emergency_contact=True,
+                )
+                for student, email, relationship in links
+            ])
+        self.parents.update((email, parent.pk) for email, parent in new_parents.items())
+        self.stats['parents'] += len(new_parents)
+        self.stats['links'] += len(links)
+
+
+def import_students(records, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+    """
+    Import the student records yielded by ``read_csv``/``read_xlsx``.
+
+    With ``dry_run`` the rows are only validated. Returns the counts of the
+    run, its throughput and the errors of every rejected row, whose ``row``
+    is the line number in the file (the header being line 1).
+    """
+    started = time.perf_counter()
+    importer = _Importer(dry_run)
+    chunk = []
+    for line, record in enumerate(records, start=2):
+        chunk.append((line, record))
+        if len(chunk) >= chunk_size:
+            importer.chunk(chunk)
+            chunk = []
+    importer.chunk(chunk)
+
+    if importer.stats['students'] and not dry_run:
+        invalidate(Student, Parent, StudentParent)
+    elapsed = time.perf_counter() - started
+    stats = importer.stats
+    return {
+        'rows': stats['rows'],
+        # In a dry run: what a real run would create
+        'students_created': stats['students'],
+        'parents_created': stats['parents'],
+        'parent_links_created': stats['links'],
+        'rejected': len(importer.errors),
+        'errors': importer.errors,
+        'dry_run': dry_run,
+        'elapsed': round(elapsed, 3),
+        'rows_per_second': round(importer.stats['rows'] / elapsed, 1) if elapsed else 0,
+    }
+
+
+def import_file(path, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+    """Import the CSV or XLSX file at ``path``"""
+    import_format = file_format(path)
+    if import_format is None:
+        raise ValueError('Only .csv and .xlsx files can be imported')
+    reader = read_csv if import_format == 'csv' else read_xlsx
+    with open(path, 'rb') as file:
+        return import_students(reader(file), chunk_size=chunk_size, dry_run=dry_run)
@@ -0,0 +1,27 @@
+import datetime
+import os
+
+from jobs.queue import register
+
+from .imports import import_file, upload_path
+from .transcripts import generate_transcripts
+
+
+@register('student.transcripts')
+def transcripts(start_date=None, end_date=None, **options):
+    """Generate a level's or section's transcripts; the result is the batch manifest"""
+    return generate_transcripts(
+        start_date=datetime.date.fromisoformat(start_date) if start_date else None,
+        end_date=datetime.date.fromisoformat(end_date) if end_date else None,
+        **options
+    )
+
+
+@register('student.import')
+def import_students(upload, dry_run=False):
+    """Import a student file saved by the import endpoint, then delete it; the result is the import report"""
+    path = upload_path(upload)
+    try:
+        return import_file(path, dry_run=dry_run)
+    finally:
+        os.remove(path)
@@ -0,0 +1,62 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from level.models import Level, Section
+from student.transcripts import DEFAULT_CHUNK_SIZE, generate_transcripts
+
+
+class Command(BaseCommand):
+    help = 'Generate the PDF transcripts of a level or section into a zip, resuming an unfinished batch'
+
+    def add_arguments(self, parser):
+        scope = parser.add_mutually_exclusive_group(required=True)
+        scope.add_argument('--level', type=int, help='Level number')
+        scope.add_argument('--section', type=int, help='Section ID')
+        parser.add_argument('--academic-year', help='Restrict exams and fees to this academic year')
+        parser.add_argument('--start-date', help='First exam/attendance date (YYYY-MM-DD)')
+        parser.add_argument('--end-date', help='Last exam/attendance date (YYYY-MM-DD)')
+        parser.add_argument('--status', help='Only students with this status, e.g. active')
+        parser.add_argument('--workers', type=int, help='Rendering processes (default: CPU count)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Students loaded and rendered per round')
+        parser.add_argument('--restart', action='store_true',
+                            help='Discard the PDFs of an earlier run instead of resuming it')
+
+    def handle(self, *args, **options):
+        if options['level'] is not None and not Level.objects.filter(pk=options['level']).exists():
+            raise CommandError(f"Level {options['level']} does not exist")
+        if options['section'] is not None and not Section.objects.filter(pk=options['section']).exists():
+            raise CommandError(f"Section {options['section']} does not exist")
+        if options['chunk_size'] < 1 or (options['workers'] is not None and options['workers'] < 1):
+            raise CommandError('--chunk-size and --workers must be positive')
+        try:
+            start_date, end_date = (
+                datetime.date.fromisoformat(options[name]) if options[name] else None
+                for name in ('start_date', 'end_date')
+            )
+        except ValueError:
+            raise CommandError('--start-date and --end-date must be YYYY-MM-DD')
+
+        try:
+            manifest = generate_transcripts(
+                level=options['level'],
+                section=options['section'],
+                start_date=start_date,
+                end_date=end_date,
+                academic_year=options['academic_year'],
+                status=options['status'],
+                workers=options['workers'],
+                chunk_size=options['chunk_size'],
+                restart=options['restart'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Batch {manifest['batch']}: generated {manifest['generated']} transcripts, "
+                f"skipped {manifest['skipped']} already done, in {manifest['elapsed']:.2f}s "
+                f"({manifest['students_per_second']:.1f} students/sec) -> {manifest['archive']}"
+            )
+        )
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from student.imports import DEFAULT_CHUNK_SIZE, import_file
+
+
+class Command(BaseCommand):
+    help = 'Import students and their parents from a CSV or XLSX file, reporting the rejected rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file whose first row names the columns')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Rows validated and written per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Validate the file without importing it')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+        try:
+            report = import_file(options['path'], chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+
+        for entry in report['errors']:
+            messages = '; '.join(
+                f"{field}: {' '.join(errors)}" for field, errors in entry['errors'].items()
+            )
+            self.stdout.write(self.style.ERROR(f"Row {entry['row']}: {messages}"))
+        action = 'Validated' if report['dry_run'] else 'Imported'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{action} {report['students_created']} of {report['rows']} students "
+                f"({report['parents_created']} new parents, {report['rejected']} rows rejected) "
+                f"in {report['elapsed']:.2f}s ({report['rows_per_second']:.0f} rows/sec)"
+            )
+        )
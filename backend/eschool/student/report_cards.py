@@ -0,0 +1,179 @@
+"""
+Term report cards assembled from grouped queries.
+
+``build_report_cards`` produces the report cards of any number of
+students with three queries: one for their exam results, one grouped
+query for attendance per subject and one grouped query for fees. The
+per-student and per-subject roll-up happens in Python, so a single
+student and a whole section cost the same number of round trips.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+
+from admission_office.models import Attendance, ExamResult, grade_for_percentage
+from parent.models import Payment
+
+
+ATTENDANCE_STATUSES = [status for status, label in Attendance.ATTENDANCE_STATUS]
+
+
+def _rate(part, whole):
+    return round(part / whole * 100, 2) if whole else 0
+
+
+def _exam_rows(student_ids, start_date, end_date, academic_year):
+    results = ExamResult.objects.filter(student_id__in=student_ids)
+    if start_date:
+        results = results.filter(exam__exam_date__gte=start_date)
+    if end_date:
+        results = results.filter(exam__exam_date__lte=end_date)
+    if academic_year:
+        results = results.filter(exam__academic_year=academic_year)
+    return results.order_by('exam__exam_date', 'exam_id').values(
+        'student_id', 'exam_id', 'exam__exam_name', 'exam__exam_type', 'exam__exam_date',
+        'exam__total_marks', 'exam__subject_id', 'exam__subject__s_name',
+        'marks_obtained', 'grade', 'is_passed', 'rank',
+    )
+
+
+def _attendance_rows(student_ids, start_date, end_date):
+    records = Attendance.objects.filter(student_id__in=student_ids)
+    if start_date:
+        records = records.filter(date__gte=start_date)
+    if end_date:
+        records = records.filter(date__lte=end_date)
+    return records.order_by().values('student_id', 'subject_id', 'subject__s_name').annotate(
+        total=Count('pk'),
+        # Late and half-day count as attended, as in Attendance.is_present
+        attended=Count('pk', filter=Q(status__in=Attendance.PRESENT_STATUSES)),
+        **{status: Count('pk', filter=Q(status=status)) for status in ATTENDANCE_STATUSES}
+    )
+
+
+def _fee_rows(student_ids, academic_year):
+    payments = Payment.objects.filter(student_id__in=student_ids)
+    if academic_year:
+        payments = payments.filter(academic_year=academic_year)
+    return payments.order_by().values('student_id').annotate(
+        total_due=Sum('total_amount', filter=Q(status__in=['pending', 'overdue'])),
+        total_paid=Sum('total_amount', filter=Q(status='paid')),
+        total_overdue=Sum('total_amount', filter=Q(status='overdue')),
+        pending_payments=Count('pk', filter=Q(status='pending')),
+        overdue_payments=Count('pk', filter=Q(status='overdue')),
+    )
+
+
+def _empty_attendance():
+    return {'total': 0, 'attended': 0, **dict.fromkeys(ATTENDANCE_STATUSES, 0), 'attendance_rate': 0}
+
+
+def build_report_cards(students, start_date=None, end_date=None, academic_year=None):
+    """
+    Return the report cards of ``students`` in the order given.
+
+    ``start_date``/``end_date`` bound exam dates and attendance dates;
+    ``academic_year`` restricts exams and fees.
+    """
+    students = list(students)
+    student_ids = [student.pk for student in students]
+
+    subjects = defaultdict(dict)
+
+    def subject_entry(student_id, subject_id, subject_name):
+        entry = subjects[student_id].get(subject_id)
+        if entry is None:
+            entry = subjects[student_id][subject_id] = {
+                'subject': subject_id,
+                'subject_name': subject_name,
+                'exams': [],
+                'average_percentage': None,
+                'grade': None,
+                'attendance': _empty_attendance(),
+            }
+        return entry
+
+    for row in _exam_rows(student_ids, start_date, end_date, academic_year):
+        entry = subject_entry(row['student_id'], row['exam__subject_id'], row['exam__subject__s_name'])
+        entry['exams'].append({
+            'exam': row['exam_id'],
+            'exam_name': row['exam__exam_name'],
+            'exam_type': row['exam__exam_type'],
+            'exam_date': row['exam__exam_date'],
+            'marks_obtained': row['marks_obtained'],
+            'total_marks': row['exam__total_marks'],
+            'percentage': _rate(row['marks_obtained'], row['exam__total_marks']),
+            'grade': row['grade'],
+            'is_passed': row['is_passed'],
+            'rank': row['rank'],
+        })
+
+    for row in _attendance_rows(student_ids, start_date, end_date):
+        entry = subject_entry(row['student_id'], row['subject_id'], row['subject__s_name'])
+        entry['attendance'] = {
+            'total': row['total'],
+            'attended': row['attended'],
+            **{status: row[status] for status in ATTENDANCE_STATUSES},
+            'attendance_rate': _rate(row['attended'], row['total']),
+        }
+
+    fees = {row['student_id']: row for row in _fee_rows(student_ids, academic_year)}
+
+    cards = []
+    for student in students:
+        student_subjects = sorted(
+            subjects.get(student.pk, {}).values(),
+            key=lambda entry: (entry['subject_name'] is None, entry['subject_name'] or '')
+        )
+        percentages = []
+        attendance_total = attendance_attended = 0
+        for entry in student_subjects:
+            exam_percentages = [exam['percentage'] for exam in entry['exams']]
+            if exam_percentages:
+                entry['average_percentage'] = round(sum(exam_percentages) / len(exam_percentages), 2)
+                entry['grade'] = grade_for_percentage(entry['average_percentage'])
+            percentages += exam_percentages
+            attendance_total += entry['attendance']['total']
+            attendance_attended += entry['attendance']['attended']
+
+        exams = [exam for entry in student_subjects for exam in entry['exams']]
+        average = round(sum(percentages) / len(percentages), 2) if percentages else None
+
+        fee_row = fees.get(student.pk, {})
+        total_due = fee_row.get('total_due') or Decimal('0.00')
+        total_paid = fee_row.get('total_paid') or Decimal('0.00')
+
+        cards.append({
+            'student': {
+                'id': str(student.pk),
+                'name': student.name,
+                'student_number': student.student_number,
+                'level': student.level_id,
+                'level_name': student.level.level_name if student.level_id else None,
+                'section': student.section_id,
+                'section_name': student.section.section_name if student.section_id else None,
+            },
+            'period': {
+                'start_date': start_date,
+                'end_date': end_date,
+                'academic_year': academic_year,
+            },
+            'subjects': student_subjects,
+            'overall': {
+                'average_percentage': average,
+                'grade': grade_for_percentage(average) if average is not None else None,
+                'exams_taken': len(exams),
+                'exams_passed': sum(1 for exam in exams if exam['is_passed']),
+                'attendance_rate': _rate(attendance_attended, attendance_total),
+            },
+            'fees': {
+                'total_due': total_due,
+                'total_paid': total_paid,
+                'total_overdue': fee_row.get('total_overdue') or Decimal('0.00'),
+                'pending_payments': fee_row.get('pending_payments', 0),
+                'overdue_payments': fee_row.get('overdue_payments', 0),
+                'payment_rate': _rate(float(total_paid), float(total_due + total_paid)),
+            },
+        })
+    return cards
@@ -1,3 +1,344 @@
-from django.test import TestCase
+from eschool.testing import SchoolQueryBudgetTestCase
 
-# Create your tests here.
+
+class StudentListQueryTests(SchoolQueryBudgetTestCase):
+    """List and detail endpoints load related rows up-front"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from parent.models import Parent
+        from student.models import StudentParent
+
+        for i, student in enumerate(cls.students):
+            parent = Parent.objects.create(
+                name=f'Parent {i}', email=f'parent{i}@example.com', phone='0100',
+                gender='male', occupation='employed', address='Street',
+            )
+            StudentParent.objects.create(student=student, parent=parent, relationship='father')
+
+    def test_student_list_query_budget(self):
+        self.assertQueryBudget('/api/students/', 2)
+
+    def test_student_parent_list_query_budget(self):
+        self.assertQueryBudget('/api/student-parents/', 2)
+
+
+class StudentStatisticsCacheTests(SchoolQueryBudgetTestCase):
+    """Statistics are served from the response cache until a student changes"""
+
+    url = '/api/students/statistics/'
+
+    def test_repeat_request_is_served_from_cache(self):
+        first = self.assertQueryBudget(self.url, 2)
+        self.assertEqual(first['X-Cache'], 'MISS')
+
+        second = self.assertQueryBudget(self.url, 0)
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+
+    def test_saving_a_student_invalidates_statistics(self):
+        before = self.client.get(self.url).data
+
+        student = self.students[0]
+        student.status = 'graduated'
+        student.save()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['active_students'], before['active_students'] - 1)
+
+    def test_stats_endpoint_reports_counters(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+
+        stats = self.client.get('/api/cache/stats/').data
+        endpoint = stats['endpoints']['StudentViewSet.statistics']
+        self.assertEqual((endpoint['hits'], endpoint['misses']), (1, 1))
+
+
+class StudentReportCardTests(SchoolQueryBudgetTestCase):
+    """Report cards cost the same number of queries for one student or a level"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        import datetime
+        from decimal import Decimal
+        from admission_office.models import Attendance, Exam, ExamResult
+        from parent.models import Parent, Payment
+
+        parent = Parent.objects.create(
+            name='Parent', email='report-parent@example.com', phone='0100',
+            gender='male', occupation='employed', address='Street',
+        )
+        for i, subject in enumerate(cls.subjects):
+            exam = Exam.objects.create(
+                exam_name=f'Final {i}', exam_type='final', subject=subject, level=cls.level,
+                duration=datetime.timedelta(hours=1), total_marks=100, passing_marks=40,
+                exam_date=datetime.date(2025, 3, 1 + i), start_time=datetime.time(9),
+                end_time=datetime.time(10), academic_year='2025',
+            )
+            for j, student in enumerate(cls.students):
+                ExamResult.objects.create(exam=exam, student=student, marks_obtained=60 + 10 * j)
+                Attendance.objects.create(
+                    student=student, subject=subject, date=datetime.date(2025, 2, 1 + i),
+                    status='absent' if not j else 'late' if i == 1 else 'present',
+                )
+        for student in cls.students:
+            Payment.objects.create(
+                parent=parent, student=student, payment_type='tuition', amount=Decimal('100'),
+                late_fee=Decimal('0'), discount=Decimal('0'), due_date=datetime.date(2025, 1, 10),
+                academic_year='2025', status='paid',
+            )
+
+    def test_report_card_query_budget(self):
+        response = self.assertQueryBudget(f'/api/students/{self.students[2].pk}/report_card/', 4)
+        card = response.data
+        self.assertEqual(len(card['subjects']), 3)
+        self.assertEqual(card['overall']['average_percentage'], 80.0)
+        self.assertEqual(card['overall']['grade'], 'B-')
+        self.assertEqual(card['overall']['attendance_rate'], 100.0)
+        self.assertEqual(card['fees']['payment_rate'], 100.0)
+        self.assertEqual(card['subjects'][0]['attendance']['present'], 1)
+        # Late counts as attended
+        late = card['subjects'][1]['attendance']
+        self.assertEqual((late['present'], late['late'], late['attended']), (0, 1, 1))
+
+    def test_level_report_cards_query_budget(self):
+        response = self.assertQueryBudget(f'/api/students/report_cards/?level={self.level.pk}', 4)
+        self.assertEqual(len(response.data), len(self.students))
+        self.assertEqual(response.data[0]['overall']['attendance_rate'], 0)
+
+    def test_invalid_scope_answers_400(self):
+        for query in ('section=abc', 'level=abc'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/students/report_cards/?{query}')
+                self.assertEqual(response.status_code, 400)
+
+    def test_period_filters_exams_and_attendance(self):
+        response = self.client.get(
+            f'/api/students/{self.students[0].pk}/report_card/?start_date=2025-02-02&end_date=2025-03-02'
+        )
+        subjects = {entry['subject']: entry for entry in response.data['subjects']}
+        self.assertEqual(len(subjects[self.subjects[0].pk]['exams']), 1)
+        self.assertEqual(subjects[self.subjects[0].pk]['attendance']['total'], 0)
+
+
+class TranscriptBatchTests(SchoolQueryBudgetTestCase):
+    """Transcript batches load each chunk in a fixed number of queries and resume"""
+
+    def setUp(self):
+        super().setUp()
+        import tempfile
+        from django.test import override_settings
+
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.media_root = media_root.name
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_batch_writes_archive_and_resumes(self):
+        import os
+        import zipfile
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from student.transcripts import batch_directory, generate_transcripts
+
+        with CaptureQueriesContext(connection) as queries:
+            manifest = generate_transcripts(level=self.level.pk, workers=1, chunk_size=2)
+        # Roster, then per chunk: students, exams, attendance, fees, scholarships
+        self.assertEqual(len(queries.captured_queries), 1 + 2 * 5)
+        self.assertEqual(manifest['status'], 'complete')
+        self.assertEqual((manifest['generated'], manifest['skipped']), (3, 0))
+
+        with zipfile.ZipFile(os.path.join(self.media_root, manifest['archive'])) as bundle:
+            names = sorted(bundle.namelist())
+            self.assertEqual(len(names), 3)
+            self.assertTrue(bundle.read(names[0]).startswith(b'%PDF-1.4'))
+
+        os.remove(os.path.join(batch_directory(manifest['batch']), names[0].split('/')[-1]))
+        manifest = generate_transcripts(level=self.level.pk, workers=1)
+        self.assertEqual((manifest['generated'], manifest['skipped']), (1, 2))
+
+    def test_batch_name_must_be_a_slug(self):
+        import os
+        from student.transcripts import generate_transcripts
+
+        for batch in ('..', '../../..', 'level-1/../..', '/tmp'):
+            with self.assertRaises(ValueError):
+                generate_transcripts(level=self.level.pk, workers=1, restart=True, batch=batch)
+        self.assertEqual(os.listdir(self.media_root), [])
+
+    def font_file(self, characters):
+        """Write a minimal TrueType font mapping ``characters`` to glyphs 1.. and return its path"""
+        import os
+        import struct
+
+        codes = sorted({ord(character) for character in characters})
+        segments = [(code, code, (index + 1 - code + 0x8000) % 0x10000 - 0x8000) for index, code in enumerate(codes)]
+        segments.append((0xFFFF, 0xFFFF, 1))
+        count = len(segments)
+        cmap_table = struct.pack('>7H', 4, 16 + 8 * count, 0, 2 * count, 0, 0, 0)
+        cmap_table += struct.pack(f'>{count}H', *(end for _, end, _ in segments)) + b'\0\0'
+        cmap_table += struct.pack(f'>{count}H', *(start for start, _, _ in segments))
+        cmap_table += struct.pack(f'>{count}h', *(delta for _, _, delta in segments))
+        cmap_table += struct.pack(f'>{count}H', *[0] * count)
+        tables = {
+            'cmap': struct.pack('>HHHHI', 0, 1, 3, 1, 12) + cmap_table,
+            'head': bytes(18) + struct.pack('>H', 1000) + bytes(16) + struct.pack('>4h', 0, -200, 1000, 800) + bytes(10),
+            'hhea': bytes(4) + struct.pack('>hh', 800, -200) + bytes(26) + struct.pack('>H', len(codes) + 1),
+            'hmtx': struct.pack('>hh', 500, 0) * (len(codes) + 1),
+            'maxp': struct.pack('>IH', 0x00005000, len(codes) + 1),
+        }
+        data = struct.pack('>IHHHH', 0x00010000, len(tables), 0, 0, 0)
+        offset = 12 + 16 * len(tables)
+        for tag, table in tables.items():
+            data += struct.pack('>4sIII', tag.encode(), 0, offset, len(table))
+            offset += len(table)
+        path = os.path.join(self.media_root, 'font.ttf')
+        with open(path, 'wb') as handle:
+            handle.write(data + b''.join(tables.values()))
+        return path
+
+    def test_non_latin_text_is_printed_in_the_configured_font(self):
+        import os
+        import pathlib
+        from django.test import override_settings
+        from student.transcripts import batch_directory, generate_transcripts
+
+        name = 'রহিম উদ্দিন'
+        self.students[0].name = name
+        self.students[0].save()
+        with self.assertRaises(ValueError):
+            generate_transcripts(level=self.level.pk, workers=1)
+
+        font = self.font_file(name + ''.join(map(chr, range(32, 127))))
+        with override_settings(TRANSCRIPT_FONT=font):
+            manifest = generate_transcripts(level=self.level.pk, workers=1, restart=True)
+        self.assertEqual(manifest['generated'], 3)
+        directory = batch_directory(manifest['batch'])
+        documents = [
+            pathlib.Path(directory, filename).read_bytes()
+            for filename in os.listdir(directory) if filename.endswith('.pdf')
+        ]
+        self.assertEqual(len(documents), 3)
+        self.assertTrue(all(b'/FontFile2' in document for document in documents))
+        self.assertEqual(sum(b'<09B0>' in document for document in documents), 1)
+
+    def test_command_rejects_bad_dates(self):
+        from django.core.management import CommandError, call_command
+
+        with self.assertRaisesMessage(CommandError, '--start-date and --end-date must be YYYY-MM-DD'):
+            call_command('generate_transcripts', level=self.level.pk, start_date='2025-13-01')
+
+    def test_transcript_endpoint_validates_scope(self):
+        response = self.client.post('/api/students/transcripts/', {}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/students/transcripts/?batch=level-99')
+        self.assertEqual(response.status_code, 404)
+
+
+class StudentImportTests(SchoolQueryBudgetTestCase):
+    """Student imports validate each chunk with a fixed number of queries and report bad rows"""
+
+    header = (
+        'student_number,name,email,gender,date_of_birth,address,emergency_contact_name,'
+        'emergency_contact_phone,level,section,department,parent_email,parent_name,relationship\n'
+    )
+
+    def upload(self, *lines):
+        import io
+        return io.BytesIO((self.header + ''.join(line + '\n' for line in lines)).encode())
+
+    def test_import_csv(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from parent.models import Parent
+        from student.imports import import_students, read_csv
+        from student.models import Student, StudentParent
+
+        lines = [
+            'new001,Ann Lee,Ann@Example.com,female,2015-02-01,Street 1,Mum,0100,1,A,Science,mum@example.com,Mum Lee,mother',
+            'NEW002,Ben Lee,ben@example.com,male,2016-03-01,Street 1,Mum,0100,1,b,,MUM@example.com,,mother',
+            # Taken by the fixture, and a repeat of an earlier row of the file
+            'STU000,Cat,cat@example.com,female,2015-01-01,Street,Dad,0100,,,,,,',
+            'NEW004,Dan,ann@example.com,male,2015-01-01,Street,Dad,0100,,,,,,',
+            '',
+            'NEW005,Eve,eve@example.com,robot,2015-13-01,Street,Dad,0100,9,,Nowhere,,,',
+            'NEW006,Fay,fay@example.com,female,2015-01-01,Street,Dad,0100,,,,,Fay Sr,',
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            report = import_students(read_csv(self.upload(*lines)), chunk_size=2)
+        # Lookups, then per chunk: students, parents and the writes (a savepoint and three inserts)
+        self.assertLessEqual(len(queries.captured_queries), 3 + 3 * 2 + 1 * 6)
+
+        self.assertEqual(report['rows'], 6)
+        self.assertEqual(report['students_created'], 2)
+        self.assertEqual(report['parents_created'], 1)
+        self.assertEqual(report['parent_links_created'], 2)
+        errors = {entry['row']: entry['errors'] for entry in report['errors']}
+        self.assertEqual(sorted(errors), [4, 5, 7, 8])
+        self.assertEqual(list(errors[4]), ['student_number'])
+        self.assertEqual(list(errors[5]), ['email'])
+        self.assertEqual(sorted(errors[7]), ['date_of_birth', 'gender'])
+        self.assertEqual(list(errors[8]), ['parent_email'])
+
+        ann = Student.objects.get(student_number='NEW001')
+        self.assertEqual((ann.email, ann.section, ann.department_id), ('ann@example.com', self.sections[0], 'Science'))
+        self.assertEqual(Student.objects.get(student_number='NEW002').section, self.sections[1])
+        mum = Parent.objects.get(email='mum@example.com')
+        self.assertEqual(StudentParent.objects.filter(parent=mum, relationship='mother').count(), 2)
+
+        # Levels and departments are checked once the row parses
+        report = import_students(read_csv(self.upload(
+            'NEW005,Eve,eve@example.com,female,2015-01-01,Street,Dad,0100,9,,Nowhere,,,'
+        )), dry_run=True)
+        self.assertEqual(sorted(report['errors'][0]['errors']), ['department', 'level'])
+
+    def test_import_endpoint(self):
+        import os
+        import tempfile
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from django.test import override_settings
+        from jobs.queue import run_pending
+        from student.models import Student
+
+        line = 'NEW001,Ann Lee,ann@example.com,female,2015-02-01,Street 1,Mum,0100,1,A,,,,'
+        upload = SimpleUploadedFile('students.csv', self.upload(line, 'STU000,X,x@example.com,male,,,,,,,,,,').read())
+        response = self.client.post('/api/students/import/', {'file': upload, 'dry_run': 'true'})
+        self.assertEqual(response.status_code, 207, response.data)
+        self.assertEqual(response.data['students_created'], 1)
+        self.assertFalse(Student.objects.filter(student_number='NEW001').exists())
+
+        upload = SimpleUploadedFile('students.txt', b'')
+        response = self.client.post('/api/students/import/', {'file': upload})
+        self.assertEqual(response.status_code, 400)
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            upload = SimpleUploadedFile('students.csv', self.upload(line).read())
+            response = self.client.post('/api/students/import/?async=1', {'file': upload})
+            self.assertEqual(response.status_code, 202, response.data)
+            job, = run_pending()
+            self.assertEqual(job.status, 'succeeded', job.error)
+            self.assertEqual(job.result['students_created'], 1)
+            self.assertFalse(os.listdir(os.path.join(media_root, 'imports')))
+
+    def test_import_job_only_reads_saved_uploads(self):
+        import os
+        import tempfile
+        from django.test import override_settings
+        from jobs.queue import run_pending, submit
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            target = os.path.join(media_root, 'students.csv')
+            with open(target, 'wb') as file:
+                file.write(self.upload().read())
+            for upload in (target, '../students.csv', f'{"0" * 32}.csv/../../students.csv'):
+                submit('student.import', {'upload': upload})
+            submit('student.import', {'path': target})
+            for job in run_pending():
+                self.assertEqual(job.status, 'failed')
+            self.assertTrue(os.path.exists(target))
@@ -0,0 +1,313 @@
+"""
+Transcript rendering to PDF.
+
+The transcripts are plain text pages, so they are written with a small
+PDF writer (one font, fixed line height) instead of a PDF library. Nothing
+in this module touches Django or the database: the batch generator hands
+it fully loaded report cards and the path of the font, and it runs as is
+in ``ProcessPoolExecutor`` worker processes.
+
+With a TrueType font (``TRANSCRIPT_FONT``) the font is embedded and text
+is written as glyph ids, so names and subjects in any script the font
+covers print as they are. Glyphs are drawn one per character without
+OpenType shaping, so conjuncts of scripts such as Bangla show in their
+spelled-out form. Without a font the built-in Helvetica is used, which
+only covers Latin-1. Text a font cannot show raises ValueError rather than
+printing placeholders on an official document.
+"""
+import functools
+import os
+import re
+import struct
+import zlib
+
+
+PAGE_WIDTH = 595   # A4 in points
+PAGE_HEIGHT = 842
+MARGIN = 50
+FONT_SIZE = 10
+LINE_HEIGHT = 14
+LINES_PER_PAGE = (PAGE_HEIGHT - 2 * MARGIN) // LINE_HEIGHT
+
+
+class TrueTypeFont:
+    """The parts of a TrueType font file needed to embed it and lay out text"""
+
+    def __init__(self, path):
+        try:
+            with open(path, 'rb') as handle:
+                self.data = handle.read()
+        except OSError as e:
+            raise ValueError(f'Cannot read the transcript font {path}: {e.strerror}') from e
+        self.name = re.sub(r'[^A-Za-z0-9-]', '', os.path.splitext(os.path.basename(path))[0]) or 'Font'
+        try:
+            self._parse()
+        except (struct.error, KeyError) as e:
+            raise ValueError(f'{path} is not a usable TrueType font ({e})') from e
+
+    def _parse(self):
+        data = self.data
+        version, table_count = struct.unpack_from('>IH', data, 0)
+        if version not in (0x00010000, 0x74727565):
+            # OpenType CFF outlines and font collections embed differently
+            raise ValueError('only single TrueType-outline fonts (.ttf) can be embedded')
+        self.tables = {}
+        for index in range(table_count):
+            tag, _, offset, _ = struct.unpack_from('>4sIII', data, 12 + 16 * index)
+            self.tables[tag.decode('latin-1')] = offset
+
+        head = self.tables['head']
+        units_per_em = struct.unpack_from('>H', data, head + 18)[0]
+        self.scale = 1000 / units_per_em
+        self.bbox = [round(value * self.scale) for value in struct.unpack_from('>4h', data, head + 36)]
+
+        hhea = self.tables['hhea']
+        ascent, descent = struct.unpack_from('>hh', data, hhea + 4)
+        self.ascent, self.descent = round(ascent * self.scale), round(descent * self.scale)
+        metric_count = struct.unpack_from('>H', data, hhea + 34)[0]
+        glyph_count = struct.unpack_from('>H', data, self.tables['maxp'] + 4)[0]
+        advances = struct.unpack_from(f'>{metric_count * 2}H', data, self.tables['hmtx'])[::2]
+        # Glyphs past the last metric repeat its advance
+        self.widths = list(advances) + [advances[-1]] * (glyph_count - metric_count)
+
+        self.glyphs = self._character_map()
+
+    def _character_map(self):
+        data = self.data
+        cmap = self.tables['cmap']
+        subtables = {}
+        for index in range(struct.unpack_from('>H', data, cmap + 2)[0]):
+            platform, encoding, offset = struct.unpack_from('>HHI', data, cmap + 4 + 8 * index)
+            subtables[(platform, encoding)] = cmap + offset
+        for key in ((3, 10), (0, 4), (3, 1), (0, 3)):
+            if key in subtables:
+                start = subtables[key]
+                break
+        else:
+            raise ValueError('the font has no Unicode character map')
+
+        glyphs = {}
+        table_format = struct.unpack_from('>H', data, start)[0]
+        if table_format == 12:
+            for index in range(struct.unpack_from('>I', data, start + 12)[0]):
+                first, last, glyph = struct.unpack_from('>III', data, start + 16 + 12 * index)
+                for code in range(first, last + 1):
+                    glyphs[code] = glyph + code - first
+        elif table_format == 4:
+            segments = struct.unpack_from('>H', data, start + 6)[0] // 2
+            ends = start + 14
+            starts = ends + 2 * segments + 2
+            deltas = starts + 2 * segments
+            range_offsets = deltas + 2 * segments
+            for index in range(segments):
+                last = struct.unpack_from('>H', data, ends + 2 * index)[0]
+                first = struct.unpack_from('>H', data, starts + 2 * index)[0]
+                delta = struct.unpack_from('>h', data, deltas + 2 * index)[0]
+                range_offset = struct.unpack_from('>H', data, range_offsets + 2 * index)[0]
+                for code in range(first, min(last, 0xFFFE) + 1):
+                    if range_offset:
+                        position = range_offsets + 2 * index + range_offset + 2 * (code - first)
+                        glyph = struct.unpack_from('>H', data, position)[0]
+                        glyph = (glyph + delta) & 0xFFFF if glyph else 0
+                    else:
+                        glyph = (code + delta) & 0xFFFF
+                    if glyph:
+                        glyphs[code] = glyph
+        else:
+            raise ValueError(f'unsupported character map format {table_format}')
+        return glyphs
+
+    def glyph(self, character):
+        glyph = self.glyphs.get(ord(character))
+        if not glyph:
+            raise ValueError(f'The transcript font {self.name} has no glyph for {character!r}')
+        return glyph
+
+    def width(self, glyph):
+        return round(self.widths[glyph] * self.scale) if glyph < len(self.widths) else 0
+
+
+@functools.lru_cache(maxsize=None)
+def load_font(path):
+    """Return the parsed font at ``path``, read once per process"""
+    return TrueTypeFont(path)
+
+
+def _escape(text):
+    text = str(text)
+    try:
+        text.encode('latin-1')
+    except UnicodeEncodeError as e:
+        raise ValueError(
+            f'{text!r} cannot be printed in Helvetica; set TRANSCRIPT_FONT to a font covering it'
+        ) from e
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def _value(value, suffix=''):
+    return '-' if value is None or value == '' else f'{value}{suffix}'
+
+
+def transcript_lines(card, scholarships=()):
+    """Return the text lines of one student's transcript"""
+    student = card['student']
+    period = card['period']
+    overall = card['overall']
+    fees = card['fees']
+
+    lines = [
+        'ACADEMIC TRANSCRIPT',
+        '',
+        f"Name: {student['name']}",
+        f"Student number: {student['student_number']}",
+        f"Level: {_value(student['level_name'])}    Section: {_value(student['section_name'])}",
+        f"Academic year: {_value(period['academic_year'])}    "
+        f"Period: {_value(period['start_date'])} to {_value(period['end_date'])}",
+        '',
+        'SUBJECTS',
+    ]
+    for entry in card['subjects']:
+        attendance = entry['attendance']
+        lines.append(
+            f"{_value(entry['subject_name'])}: average {_value(entry['average_percentage'], '%')}, "
+            f"grade {_value(entry['grade'])}, attendance {attendance['attendance_rate']}% "
+            f"({attendance['attended']}/{attendance['total']})"
+        )
+        for exam in entry['exams']:
+            lines.append(
+                f"    {exam['exam_date']}  {exam['exam_name']} ({exam['exam_type']}): "
+                f"{exam['marks_obtained']}/{exam['total_marks']}  {exam['grade']}  "
+                f"rank {_value(exam['rank'])}"
+            )
+    if not card['subjects']:
+        lines.append('No results or attendance recorded for this period')
+
+    lines += [
+        '',
+        'OVERALL',
+        f"Average: {_value(overall['average_percentage'], '%')}    Grade: {_value(overall['grade'])}",
+        f"Exams passed: {overall['exams_passed']} of {overall['exams_taken']}",
+        f"Attendance rate: {overall['attendance_rate']}%",
+        '',
+        'SCHOLARSHIPS',
+    ]
+    for award in scholarships:
+        lines.append(
+            f"{award['scholarship__name']} ({award['academic_year']}): "
+            f"{award['amount_awarded']} awarded {award['award_date']}"
+        )
+    if not scholarships:
+        lines.append('None')
+
+    lines += [
+        '',
+        'FEES',
+        f"Paid: {fees['total_paid']}    Due: {fees['total_due']}    Overdue: {fees['total_overdue']}",
+    ]
+    return lines
+
+
+def _font_objects(font, used):
+    """Return the font object bodies for ``font``, numbered from 3, covering the glyphs in ``used``"""
+    glyphs = sorted(used)
+    widths = ' '.join(f'{glyph} [{font.width(glyph)}]' for glyph in glyphs)
+    to_unicode = [
+        '/CIDInit /ProcSet findresource begin 12 dict begin begincmap',
+        '/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def',
+        '/CMapName /Adobe-Identity-UCS def /CMapType 2 def',
+        '1 begincodespacerange <0000> <FFFF> endcodespacerange',
+    ]
+    for offset in range(0, len(glyphs), 100):
+        block = glyphs[offset:offset + 100]
+        to_unicode.append(f'{len(block)} beginbfchar')
+        to_unicode += [f'<{glyph:04X}> <{used[glyph].encode("utf-16-be").hex().upper()}>' for glyph in block]
+        to_unicode.append('endbfchar')
+    to_unicode.append('endcmap CMapName currentdict /CMap defineresource pop end end')
+    to_unicode = '\n'.join(to_unicode).encode()
+    font_file = zlib.compress(font.data)
+    bbox = ' '.join(str(value) for value in font.bbox)
+    return [
+        f'<< /Type /Font /Subtype /Type0 /BaseFont /{font.name} /Encoding /Identity-H '
+        f'/DescendantFonts [4 0 R] /ToUnicode 5 0 R >>'.encode(),
+        f'<< /Type /Font /Subtype /CIDFontType2 /BaseFont /{font.name} '
+        f'/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> '
+        f'/FontDescriptor 6 0 R /CIDToGIDMap /Identity /W [{widths}] >>'.encode(),
+        b'<< /Length %d >>\nstream\n' % len(to_unicode) + to_unicode + b'\nendstream',
+        f'<< /Type /FontDescriptor /FontName /{font.name} /Flags 32 /FontBBox [{bbox}] '
+        f'/ItalicAngle 0 /Ascent {font.ascent} /Descent {font.descent} /CapHeight {font.ascent} '
+        f'/StemV 80 /FontFile2 7 0 R >>'.encode(),
+        b'<< /Length %d /Length1 %d /Filter /FlateDecode >>\nstream\n' % (len(font_file), len(font.data))
+        + font_file + b'\nendstream',
+    ]
+
+
+def pdf_document(lines, font=None):
+    """
+    Return the bytes of a PDF that prints ``lines`` top to bottom across pages.
+
+    ``font`` is a ``TrueTypeFont`` to embed; Helvetica is used without one.
+    """
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+
+    # Objects 1-2 are the catalog and the page tree, then come the font
+    # objects; each page then takes two objects, the page and its content
+    # stream
+    used = {}
+    streams = []
+    for page in pages:
+        text = [f'BT /F1 {FONT_SIZE} Tf {LINE_HEIGHT} TL {MARGIN} {PAGE_HEIGHT - MARGIN} Td']
+        for line in page:
+            if font is None:
+                text.append(f'({_escape(line)}) Tj T*')
+                continue
+            glyphs = []
+            for character in str(line):
+                glyph = font.glyph(character)
+                used.setdefault(glyph, character)
+                glyphs.append(f'{glyph:04X}')
+            text.append(f"<{''.join(glyphs)}> Tj T*")
+        text.append('ET')
+        streams.append('\n'.join(text).encode('latin-1'))
+
+    if font is None:
+        objects = [None, None, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>']
+    else:
+        objects = [None, None] + _font_objects(font, used)
+    page_refs = []
+    for stream in streams:
+        page_number = len(objects) + 1
+        page_refs.append(f'{page_number} 0 R')
+        objects.append(
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] '
+            f'/Resources << /Font << /F1 3 0 R >> >> /Contents {page_number + 1} 0 R >>'.encode()
+        )
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+    objects[0] = b'<< /Type /Catalog /Pages 2 0 R >>'
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(page_refs)}] /Count {len(pages)} >>".encode()
+
+    document = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(document))
+        document += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(document)
+    document += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    document += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    document += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(document)
+
+
+def write_transcript(card, scholarships, path, font_path=None):
+    """
+    Render one transcript to ``path``, in the TrueType font at ``font_path`` if given.
+
+    The PDF is written beside ``path`` and renamed into place, so a file at
+    ``path`` is always complete; a resumed batch relies on that.
+    """
+    font = load_font(font_path) if font_path else None
+    document = pdf_document(transcript_lines(card, scholarships), font)
+    partial = f'{path}.part'
+    with open(partial, 'wb') as handle:
+        handle.write(document)
+    os.replace(partial, path)
+    return path
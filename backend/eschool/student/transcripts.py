@@ -0,0 +1,220 @@
+"""
+Batch transcript generation for a level or a section.
+
+``generate_transcripts`` works through the students of a batch in
+chunks. Each chunk costs a fixed number of queries: the report cards come
+from ``build_report_cards`` (exam results, grouped attendance and fees)
+and the scholarships of the whole chunk from one more query. The loaded
+cards are then rendered to PDF across a ``ProcessPoolExecutor``, since
+rendering is CPU-bound and needs no database access. Each worker reads
+the ``TRANSCRIPT_FONT`` once and embeds it in its PDFs.
+
+Every batch has a directory under ``MEDIA_ROOT/transcripts`` holding one
+PDF per student and a ``manifest.json`` with its progress. A PDF only
+appears once it is complete, so running the same batch again resumes it:
+students whose PDF already exists are skipped. The finished PDFs are
+packed into ``MEDIA_ROOT/transcripts/<batch>.zip``.
+"""
+import json
+import multiprocessing
+import os
+import shutil
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.text import get_valid_filename, slugify
+
+from .models import Student, StudentScholarship
+from .report_cards import build_report_cards
+from .transcript_pdf import load_font, write_transcript
+
+
+DEFAULT_CHUNK_SIZE = 200
+
+
+def batch_name(level=None, section=None, academic_year=None, start_date=None, end_date=None):
+    """Return the name of the batch covering a level or section over a period"""
+    parts = [f'level-{level}' if level is not None else f'section-{section}']
+    parts += [str(value) for value in (academic_year, start_date, end_date) if value]
+    return slugify('-'.join(parts))
+
+
+def transcripts_root():
+    return os.path.join(settings.MEDIA_ROOT, 'transcripts')
+
+
+def _checked(batch):
+    # Batch names become paths that restart deletes, so only slugs are accepted
+    if not batch or batch != slugify(batch):
+        raise ValueError(f'Invalid transcript batch name "{batch}"')
+    return batch
+
+
+def batch_directory(batch):
+    return os.path.join(transcripts_root(), _checked(batch))
+
+
+def batch_archive(batch):
+    return os.path.join(transcripts_root(), f'{_checked(batch)}.zip')
+
+
+def batch_progress(batch):
+    """Return the manifest of ``batch``, or None when it was never started"""
+    try:
+        with open(os.path.join(batch_directory(batch), 'manifest.json')) as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+
+def _write_manifest(batch, manifest):
+    path = os.path.join(batch_directory(batch), 'manifest.json')
+    with open(f'{path}.part', 'w') as handle:
+        json.dump(manifest, handle, cls=DjangoJSONEncoder, indent=2)
+    os.replace(f'{path}.part', path)
+
+
+def _transcript_filename(student_number):
+    return f'{get_valid_filename(student_number)}.pdf'
+
+
+def _scholarships(student_ids, academic_year):
+    awards = StudentScholarship.objects.filter(student_id__in=student_ids, is_active=True)
+    if academic_year:
+        awards = awards.filter(academic_year=academic_year)
+    by_student = {}
+    for award in awards.values(
+        'student_id', 'scholarship__name', 'amount_awarded', 'academic_year', 'award_date'
+    ):
+        by_student.setdefault(award['student_id'], []).append(award)
+    return by_student
+
+
+def _write_archive(batch, filenames):
+    archive = batch_archive(batch)
+    directory = batch_directory(batch)
+    with zipfile.ZipFile(f'{archive}.part', 'w', zipfile.ZIP_DEFLATED) as bundle:
+        for filename in filenames:
+            bundle.write(os.path.join(directory, filename), arcname=f'{batch}/{filename}')
+    os.replace(f'{archive}.part', archive)
+    return archive
+
+
+def generate_transcripts(level=None, section=None, start_date=None, end_date=None,
+                         academic_year=None, status=None, workers=None,
+                         chunk_size=DEFAULT_CHUNK_SIZE, restart=False, batch=None):
+    """
+    Generate the transcripts of every student in ``level`` or ``section``.
+
+    ``workers`` sets the size of the rendering process pool (the CPU count
+    when None); with one worker the PDFs are rendered in this process.
+    ``restart`` discards the PDFs of an earlier run instead of resuming it.
+    ``batch`` overrides the batch name and must be a slug; ValueError otherwise.
+    ValueError is also raised when ``TRANSCRIPT_FONT`` is not a usable
+    TrueType font, or a transcript has text the font cannot show.
+    Returns the final manifest, which carries the counts and throughput.
+    """
+    if level is None and section is None:
+        raise ValueError('A level or a section is required')
+    font_path = settings.TRANSCRIPT_FONT or None
+    if font_path:
+        # Fail before the batch starts rather than in every worker
+        load_font(font_path)
+    batch = batch or batch_name(level, section, academic_year, start_date, end_date)
+    directory = batch_directory(batch)
+    if restart:
+        shutil.rmtree(directory, ignore_errors=True)
+        if os.path.exists(batch_archive(batch)):
+            os.remove(batch_archive(batch))
+    os.makedirs(directory, exist_ok=True)
+
+    students = Student.objects.order_by('name', 'pk')
+    if level is not None:
+        students = students.filter(level_id=level)
+    if section is not None:
+        students = students.filter(section_id=section)
+    if status:
+        students = students.filter(status=status)
+
+    roster = [(pk, _transcript_filename(number)) for pk, number in students.values_list('pk', 'student_number')]
+    existing = set(os.listdir(directory))
+    pending = [(pk, filename) for pk, filename in roster if filename not in existing]
+
+    manifest = {
+        'batch': batch,
+        'level': level,
+        'section': section,
+        'status_filter': status,
+        'period': {'start_date': start_date, 'end_date': end_date, 'academic_year': academic_year},
+        'status': 'running',
+        'total': len(roster),
+        'generated': 0,
+        'skipped': len(roster) - len(pending),
+        'elapsed': 0,
+        'students_per_second': 0,
+        'started_at': timezone.now(),
+        'finished_at': None,
+        'archive': None,
+    }
+    _write_manifest(batch, manifest)
+
+    workers = workers or os.cpu_count() or 1
+    # Workers are spawned rather than forked: the generator may run inside a
+    # threaded worker process, and forking a threaded process is unsafe
+    executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context('spawn')
+    ) if workers > 1 else None
+    started = time.perf_counter()
+    try:
+        for offset in range(0, len(pending), chunk_size):
+            chunk = pending[offset:offset + chunk_size]
+            filenames = dict(chunk)
+            chunk_students = list(
+                Student.objects.select_related('level', 'section')
+                .filter(pk__in=filenames).order_by('name', 'pk')
+            )
+            cards = build_report_cards(
+                chunk_students, start_date=start_date, end_date=end_date, academic_year=academic_year
+            )
+            awards = _scholarships(list(filenames), academic_year)
+            jobs = (
+                cards,
+                [awards.get(student.pk, []) for student in chunk_students],
+                [os.path.join(directory, filenames[student.pk]) for student in chunk_students],
+                [font_path] * len(cards),
+            )
+            if executor is None:
+                written = list(map(write_transcript, *jobs))
+            else:
+                written = list(executor.map(write_transcript, *jobs, chunksize=max(1, len(cards) // workers)))
+
+            elapsed = time.perf_counter() - started
+            manifest['generated'] += len(written)
+            manifest['elapsed'] = round(elapsed, 3)
+            manifest['students_per_second'] = round(manifest['generated'] / elapsed, 2) if elapsed else 0
+            _write_manifest(batch, manifest)
+
+        archive = _write_archive(batch, [filename for pk, filename in roster])
+    except Exception:
+        manifest['status'] = 'failed'
+        _write_manifest(batch, manifest)
+        raise
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    elapsed = time.perf_counter() - started
+    manifest.update(
+        status='complete',
+        elapsed=round(elapsed, 3),
+        students_per_second=round(manifest['generated'] / elapsed, 2) if elapsed else 0,
+        finished_at=timezone.now(),
+        archive=os.path.relpath(archive, settings.MEDIA_ROOT),
+    )
+    _write_manifest(batch, manifest)
+    return manifest
+
@@ -3,6 +3,9 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
+from eschool.mixins import RelatedFieldsMixin
+from eschool.cache import cached_response
+from eschool.statistics import StatisticsBuilder
 from .models import Student, StudentParent, StudentActivity, StudentDiary, Scholarship, StudentScholarship
 from .serializers import (
     StudentSerializer, StudentDetailSerializer, StudentListSerializer,
@@ -13,7 +16,7 @@ from admission_office.models import Attendance
 from admission_office.serializers import AttendanceSerializer, AttendanceListSerializer
 
 
-class StudentViewSet(viewsets.ModelViewSet):
+class StudentViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for Student model"""
     
     queryset = Student.objects.all()
@@ -296,6 +299,140 @@ class StudentViewSet(viewsets.ModelViewSet):
         
         return Response(summary)
     
+    def report_card_params(self, request, data=None):
+        """Parse the period parameters shared by the report card actions"""
+        from rest_framework import serializers
+        
+        data = request.query_params if data is None else data
+        params = {'academic_year': data.get('academic_year') or None}
+        date_field = serializers.DateField()
+        for name in ('start_date', 'end_date'):
+            value = data.get(name)
+            params[name] = date_field.run_validation(value) if value else None
+        return params
+    
+    @action(detail=True, methods=['get'])
+    def report_card(self, request, pk=None):
+        """Get a student's report card: results and attendance per subject, and fees"""
+        from rest_framework import serializers
+        from .report_cards import build_report_cards
+        
+        student = self.get_object()
+        try:
+            params = self.report_card_params(request)
+        except serializers.ValidationError as e:
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(build_report_cards([student], **params)[0])
+    
+    @action(detail=False, methods=['get'])
+    def report_cards(self, request):
+        """Get the report cards of every student in a section (?section=) or level (?level=)"""
+        from rest_framework import serializers
+        from .report_cards import build_report_cards
+        
+        section = request.query_params.get('section')
+        level = request.query_params.get('level')
+        if not section and not level:
+            return Response({'error': 'section or level parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            section = serializers.IntegerField().run_validation(section) if section else None
+            level = serializers.IntegerField().run_validation(level) if level else None
+            params = self.report_card_params(request)
+        except serializers.ValidationError as e:
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        
+        students = Student.objects.select_related('level', 'section').order_by('name')
+        if section:
+            students = students.filter(section_id=section)
+        if level:
+            students = students.filter(level_id=level)
+        if 'status' in request.query_params:
+            students = students.filter(status=request.query_params['status'])
+        
+        return Response(build_report_cards(students, **params))
+    
+    @action(detail=False, methods=['get', 'post'])
+    def transcripts(self, request):
+        """Queue a transcript batch job for a level or section (POST), or get its progress (GET ?batch=)"""
+        from rest_framework import serializers
+        from django.utils.text import slugify
+        from jobs.views import job_accepted
+        from level.models import Level, Section
+        from .transcripts import batch_name, batch_progress
+        
+        if request.method == 'GET':
+            batch = request.query_params.get('batch', '')
+            progress = batch_progress(batch) if batch and batch == slugify(batch) else None
+            if progress is None:
+                return Response({'error': 'Transcript batch not found'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(progress)
+        
+        level = request.data.get('level') or None
+        section = request.data.get('section') or None
+        if (level is None) == (section is None):
+            return Response({'error': 'Exactly one of level or section is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            params = self.report_card_params(request, request.data)
+            if level is not None:
+                level = Level.objects.only('pk').get(pk=serializers.IntegerField().run_validation(level)).pk
+            else:
+                section = Section.objects.only('pk').get(pk=serializers.IntegerField().run_validation(section)).pk
+        except serializers.ValidationError as e:
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        except (Level.DoesNotExist, Section.DoesNotExist):
+            return Response({'error': 'Level or section not found'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return job_accepted(request, 'student.transcripts', {
+            'batch': batch_name(level, section, **params),
+            'level': level,
+            'section': section,
+            'status': request.data.get('status') or None,
+            'restart': str(request.data.get('restart', '')).lower() in ('1', 'true'),
+            **params
+        })
+    
+    @action(detail=False, methods=['get'], url_path='transcripts/download')
+    def download_transcripts(self, request):
+        """Download the zip of a finished transcript batch (?batch=)"""
+        from django.http import FileResponse
+        from django.utils.text import slugify
+        from .transcripts import batch_archive, batch_progress
+        
+        batch = request.query_params.get('batch', '')
+        progress = batch_progress(batch) if batch and batch == slugify(batch) else None
+        if progress is None or progress['status'] != 'complete':
+            return Response({'error': 'No finished transcript batch found'}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(open(batch_archive(batch), 'rb'), as_attachment=True, filename=f'{batch}.zip')
+    
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_students(self, request):
+        """Import students and their parents from an uploaded CSV or XLSX file (?async=1 queues it as a job)"""
+        from jobs.views import async_requested, job_accepted
+        from .imports import file_format, import_students, read_csv, read_xlsx, save_upload
+        
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'A file upload named "file" is required'}, status=status.HTTP_400_BAD_REQUEST)
+        import_format = file_format(upload.name)
+        if import_format is None:
+            return Response({'error': 'Only .csv and .xlsx files can be imported'}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true')
+        
+        if async_requested(request):
+            # The worker reads the file back from MEDIA_ROOT/imports by its token
+            token = save_upload(upload, import_format)
+            return job_accepted(request, 'student.import', {'upload': token, 'dry_run': dry_run})
+        
+        reader = read_csv if import_format == 'csv' else read_xlsx
+        try:
+            result = import_students(reader(upload), dry_run=dry_run)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if result['errors']:
+            return Response(result, status=status.HTTP_207_MULTI_STATUS)
+        return Response(result, status=status.HTTP_200_OK if dry_run else status.HTTP_201_CREATED)
+    
     @action(detail=True, methods=['post'])
     def add_parent(self, request, pk=None):
         """Add a parent to student"""
@@ -339,27 +476,30 @@ class StudentViewSet(viewsets.ModelViewSet):
         return Response(list(departments))
     
     @action(detail=False, methods=['get'])
+    @cached_response(Student, 'level.Level', 'department.Department')
     def statistics(self, request):
         """Get student statistics"""
-        from django.db.models import Count, Avg
+        from django.db.models import Avg
+        from django.db.models.functions import ExtractYear
         from datetime import date
         
-        stats = {
-            'total_students': Student.objects.count(),
-            'active_students': Student.objects.filter(status='active').count(),
-            'by_level': list(Student.objects.values('level__level_name').annotate(count=Count('id'))),
-            'by_department': list(Student.objects.values('department__d_name').annotate(count=Count('id'))),
-            'by_gender': list(Student.objects.values('gender').annotate(count=Count('id'))),
-            'average_age': round(
-                Student.objects.aggregate(
-                    avg_age=Avg('date_of_birth')
-                )['avg_age'] or 0, 2
-            ),
-        }
+        stats = (
+            StatisticsBuilder(Student.objects.all())
+            .count('total_students')
+            .count('active_students', status='active')
+            .group_by('by_level', 'level__level_name')
+            .group_by('by_department', 'department__d_name')
+            .group_by('by_gender', 'gender')
+            .aggregate('average_age', Avg(ExtractYear('date_of_birth')))
+            .build()
+        )
+        # Averaging birth years keeps the computation in the database
+        average_birth_year = stats['average_age']
+        stats['average_age'] = round(date.today().year - average_birth_year, 2) if average_birth_year else 0
         return Response(stats)
 
 
-class StudentParentViewSet(viewsets.ModelViewSet):
+class StudentParentViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for StudentParent model"""
     
     queryset = StudentParent.objects.all()
@@ -371,7 +511,7 @@ class StudentParentViewSet(viewsets.ModelViewSet):
     ordering = ['-created_at']
 
 
-class StudentActivityViewSet(viewsets.ModelViewSet):
+class StudentActivityViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for StudentActivity model"""
     
     queryset = StudentActivity.objects.all()
@@ -383,7 +523,7 @@ class StudentActivityViewSet(viewsets.ModelViewSet):
     ordering = ['-start_date']
 
 
-class StudentDiaryViewSet(viewsets.ModelViewSet):
+class StudentDiaryViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for StudentDiary model"""
     
     queryset = StudentDiary.objects.all()
@@ -406,7 +546,7 @@ class StudentDiaryViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class ScholarshipViewSet(viewsets.ModelViewSet):
+class ScholarshipViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for Scholarship model"""
     
     queryset = Scholarship.objects.all()
@@ -418,7 +558,7 @@ class ScholarshipViewSet(viewsets.ModelViewSet):
     ordering = ['name']
 
 
-class StudentScholarshipViewSet(viewsets.ModelViewSet):
+class StudentScholarshipViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for StudentScholarship model"""
     
     queryset = StudentScholarship.objects.all()
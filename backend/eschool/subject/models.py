@@ -1,6 +1,19 @@
 from django.db import models
 from django.core.validators import MinLengthValidator
 
+from eschool.annotations import related_count
+
+
+class SubjectQuerySet(models.QuerySet):
+    """Queryset for Subject with annotated counts"""
+
+    def with_counts(self):
+        """Annotate the values read by ``teacher_count`` and ``level_count``"""
+        return self.annotate(
+            _teacher_count=related_count(self.model, 'teachers_teaching', is_active=True),
+            _level_count=related_count(self.model, 'levels', is_active=True),
+        )
+
 
 class Subject(models.Model):
     """Subject model representing academic subjects"""
@@ -72,6 +85,8 @@ class Subject(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = SubjectQuerySet.as_manager()
+    
     class Meta:
         db_table = 'subjects'
         ordering = ['s_code']
@@ -84,11 +99,15 @@ class Subject(models.Model):
     @property
     def teacher_count(self):
         """Return the number of teachers teaching this subject"""
+        if hasattr(self, '_teacher_count'):
+            return self._teacher_count
         return self.teachers_teaching.filter(is_active=True).count()
     
     @property
     def level_count(self):
         """Return the number of levels this subject is taught in"""
+        if hasattr(self, '_level_count'):
+            return self._level_count
         return self.levels.filter(is_active=True).count()
 
 
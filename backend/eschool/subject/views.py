@@ -3,6 +3,8 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
+from eschool.mixins import RelatedFieldsMixin
+from eschool.statistics import StatisticsBuilder
 from .models import Subject, SubjectSyllabus, SubjectMaterial
 from .serializers import (
     SubjectSerializer, SubjectDetailSerializer, SubjectListSerializer,
@@ -10,10 +12,10 @@ from .serializers import (
 )
 
 
-class SubjectViewSet(viewsets.ModelViewSet):
+class SubjectViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for Subject model"""
     
-    queryset = Subject.objects.all()
+    queryset = Subject.objects.with_counts()
     serializer_class = SubjectSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['subject_type', 'difficulty_level', 'department', 'is_active']
@@ -108,19 +110,19 @@ class SubjectViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Get subject statistics"""
-        from django.db.models import Count
-        
-        stats = {
-            'total_subjects': Subject.objects.count(),
-            'active_subjects': Subject.objects.filter(is_active=True).count(),
-            'by_type': list(Subject.objects.values('subject_type').annotate(count=Count('id'))),
-            'by_department': list(Subject.objects.values('department__d_name').annotate(count=Count('id'))),
-            'by_difficulty': list(Subject.objects.values('difficulty_level').annotate(count=Count('id'))),
-        }
+        stats = (
+            StatisticsBuilder(Subject.objects.all())
+            .count('total_subjects')
+            .count('active_subjects', is_active=True)
+            .group_by('by_type', 'subject_type')
+            .group_by('by_department', 'department__d_name')
+            .group_by('by_difficulty', 'difficulty_level')
+            .build()
+        )
         return Response(stats)
 
 
-class SubjectSyllabusViewSet(viewsets.ModelViewSet):
+class SubjectSyllabusViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for SubjectSyllabus model"""
     
     queryset = SubjectSyllabus.objects.all()
@@ -132,7 +134,7 @@ class SubjectSyllabusViewSet(viewsets.ModelViewSet):
     ordering = ['-academic_year', 'subject__s_name']
 
 
-class SubjectMaterialViewSet(viewsets.ModelViewSet):
+class SubjectMaterialViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for SubjectMaterial model"""
     
     queryset = SubjectMaterial.objects.all()
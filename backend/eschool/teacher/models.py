@@ -1,6 +1,18 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from eschool.annotations import related_count
+
+
+class TeacherQuerySet(models.QuerySet):
+    """Queryset for Teacher with annotated counts"""
+
+    def with_counts(self):
+        """Annotate the value read by the ``subject_count`` serializer field"""
+        return self.annotate(
+            _subject_count=related_count(self.model, 'section_subjects', is_active=True),
+        )
+
 
 class Teacher(models.Model):
     """Teacher model extending Employee with teaching-specific fields"""
@@ -106,6 +118,8 @@ class Teacher(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = TeacherQuerySet.as_manager()
+    
     class Meta:
         db_table = 'teachers'
         verbose_name = 'Teacher'
@@ -107,7 +107,9 @@ class TeacherDetailSerializer(TeacherSerializer):
         from level.models import SectionSubject
         
         # Get section subjects for this teacher
-        section_subjects = SectionSubject.objects.filter(teacher=obj, is_active=True)
+        section_subjects = SectionSubject.objects.filter(
+            teacher=obj, is_active=True
+        ).select_related('subject', 'section')
         
         # Convert to the expected format
         subjects_data = []
@@ -150,6 +152,8 @@ class TeacherListSerializer(serializers.ModelSerializer):
     
     def get_subject_count(self, obj):
         """Get number of subjects taught by teacher from section assignments"""
+        if hasattr(obj, '_subject_count'):
+            return obj._subject_count
         from level.models import SectionSubject
         return SectionSubject.objects.filter(teacher=obj, is_active=True).count()
 
@@ -1,3 +1,39 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from eschool.testing import SchoolQueryBudgetTestCase
+
+
+class TeacherListQueryTests(SchoolQueryBudgetTestCase):
+    """List and detail endpoints load related rows up-front"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        from teacher.models import TeacherSubject, TeacherClass, TeacherPerformance
+
+        for i, teacher in enumerate(cls.teachers):
+            TeacherSubject.objects.create(
+                teacher=teacher, subject=cls.subjects[i], start_date=datetime.date(2025, 1, 1)
+            )
+            TeacherClass.objects.create(
+                teacher=teacher, class_room=cls.rooms[i], subject=cls.subjects[i],
+                start_date=datetime.date(2025, 1, 1),
+            )
+            TeacherPerformance.objects.create(
+                teacher=teacher, evaluation_date=datetime.date(2025, 1, 1),
+                academic_performance='good', classroom_management='good',
+                student_interaction='good', professional_development='good',
+                overall_rating='good', evaluator=cls.employees[0],
+            )
+
+    def test_teacher_subject_list_query_budget(self):
+        self.assertQueryBudget('/api/teacher-subjects/', 2)
+
+    def test_teacher_class_list_query_budget(self):
+        self.assertQueryBudget('/api/teacher-classes/', 2)
+
+    def test_teacher_performance_list_query_budget(self):
+        self.assertQueryBudget('/api/teacher-performance/', 2)
+
+    def test_teacher_list_query_budget(self):
+        self.assertQueryBudget('/api/teachers/', 2)
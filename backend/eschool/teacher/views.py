@@ -3,6 +3,8 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
+from eschool.mixins import RelatedFieldsMixin
+from eschool.statistics import StatisticsBuilder
 from .models import Teacher, TeacherSubject, TeacherClass, TeacherPerformance
 from .serializers import (
     TeacherSerializer, TeacherDetailSerializer, TeacherListSerializer,
@@ -10,10 +12,10 @@ from .serializers import (
 )
 
 
-class TeacherViewSet(viewsets.ModelViewSet):
+class TeacherViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for Teacher model"""
     
-    queryset = Teacher.objects.all()
+    queryset = Teacher.objects.with_counts()
     serializer_class = TeacherSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['is_class_teacher', 'teacher_id__department', 'specialization']
@@ -106,31 +108,28 @@ class TeacherViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def class_teachers(self, request):
         """Get all class teachers"""
-        class_teachers = Teacher.objects.filter(is_class_teacher=True)
+        class_teachers = Teacher.objects.with_counts().filter(is_class_teacher=True)
         serializer = TeacherListSerializer(class_teachers, many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Get teacher statistics"""
-        from django.db.models import Count, Avg
+        from django.db.models import Avg
         
-        stats = {
-            'total_teachers': Teacher.objects.count(),
-            'class_teachers': Teacher.objects.filter(is_class_teacher=True).count(),
-            'by_specialization': list(
-                Teacher.objects.values('specialization').annotate(count=Count('id'))
-            ),
-            'average_experience': round(
-                Teacher.objects.aggregate(
-                    avg_exp=Avg('years_of_experience')
-                )['avg_exp'] or 0, 2
-            ),
-        }
+        stats = (
+            StatisticsBuilder(Teacher.objects.all())
+            .count('total_teachers')
+            .count('class_teachers', is_class_teacher=True)
+            .group_by('by_specialization', 'specialization')
+            .aggregate('average_experience', Avg('years_of_experience'))
+            .build()
+        )
+        stats['average_experience'] = round(stats['average_experience'] or 0, 2)
         return Response(stats)
 
 
-class TeacherSubjectViewSet(viewsets.ModelViewSet):
+class TeacherSubjectViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for TeacherSubject model"""
     
     queryset = TeacherSubject.objects.all()
@@ -142,7 +141,7 @@ class TeacherSubjectViewSet(viewsets.ModelViewSet):
     ordering = ['-start_date']
 
 
-class TeacherClassViewSet(viewsets.ModelViewSet):
+class TeacherClassViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for TeacherClass model"""
     
     queryset = TeacherClass.objects.all()
@@ -154,7 +153,7 @@ class TeacherClassViewSet(viewsets.ModelViewSet):
     ordering = ['-start_date']
 
 
-class TeacherPerformanceViewSet(viewsets.ModelViewSet):
+class TeacherPerformanceViewSet(RelatedFieldsMixin, viewsets.ModelViewSet):
     """ViewSet for TeacherPerformance model"""
     
     queryset = TeacherPerformance.objects.all()